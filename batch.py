@@ -0,0 +1,192 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import unicodedata
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import main
+import scheduler
+
+# Offline batch mode.
+# Answers a JSONL file of questions (one JSON object per line, e.g. {"id": "q1", "question": "..."})
+# without the interactive loop, for QA regression runs and pre-generated answers:
+#   - identical questions (after normalization) are answered once and the answer is fanned out;
+#   - questions run concurrently through process_user_input, at batch priority in the quota scheduler,
+#     so throughput is bounded by the API quota rather than by serial execution. Concurrent questions
+#     needing the same API data share one request (single-flight in football_api.fetch_cached) and
+#     later questions read it from the cache;
+#   - every answer is appended to the output JSONL as soon as it is ready, with per-stage timings,
+#     and a rerun with the same output file resumes after the questions already answered, replacing the
+#     records of failed and degraded answers (timeouts, network errors, exhausted API quota).
+#
+# Usage: python batch.py questions.jsonl answers.jsonl --concurrency 8
+
+logger = logging.getLogger(__name__)
+
+# Fields looked up, in order, for the question text and the record id
+QUESTION_FIELDS = ("question", "message", "body", "text")
+ID_FIELDS = ("id", "request_id")
+
+# Per-question pipeline budget; longer than interactive since batch requests may queue for quota
+BATCH_BUDGET_SECONDS = 120
+
+DEFAULT_CONCURRENCY = 8
+
+
+def normalize_question(text: str) -> str:
+    """
+    Normalizes a question for deduplication (case, accents, whitespace and trailing punctuation).
+    """
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+def read_questions(path: str, field: str = None, id_field: str = None):
+    """
+    Reads a JSONL file of questions. Returns a list of (id, question); lines without a question are skipped.
+    The id defaults to the first of ID_FIELDS present, else the line number.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("line %d: invalid JSON, skipped", n)
+                continue
+            fields = (field,) if field else QUESTION_FIELDS
+            text = next((record[k] for k in fields if isinstance(record.get(k), str) and record[k].strip()), None)
+            if text is None:
+                logger.warning("line %d: no question field, skipped", n)
+                continue
+            ids = (id_field,) if id_field else ID_FIELDS
+            record_id = next((record[k] for k in ids if record.get(k) is not None), n)
+            questions.append((str(record_id), text.strip()))
+    return questions
+
+
+def answered_ids(path: str) -> set:
+    """
+    Returns the ids already answered in an output file (records with an error, or whose answer is the
+    timeout message, are retried).
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("answer") not in (None, main.TIMEOUT_MESSAGE) and not record.get("error"):
+                done.add(str(record["id"]))
+    return done
+
+
+def drop_records(path: str, ids: set):
+    """
+    Rewrites an output file without the records of the given ids (answers about to be retried), so a resumed
+    run leaves one record per id. The file is replaced atomically.
+    """
+    if not ids or not os.path.exists(path):
+        return
+    tmp_path = f"{path}.tmp"
+    with open(path, encoding="utf-8") as f, open(tmp_path, "w", encoding="utf-8") as out:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if str(record.get("id")) not in ids:
+                out.write(line if line.endswith("\n") else line + "\n")
+    os.replace(tmp_path, path)
+
+
+def answer_question(question: str, budget: float):
+    """
+    Runs the pipeline for one question at batch priority. Returns (answer, timings, error).
+    Degraded answers (timeout, partial data, fallback without the chat model) are kept with an error,
+    so a resumed run answers them again.
+    """
+    timings = {}
+    status = {}
+    start = time.perf_counter()
+    try:
+        with scheduler.priority(scheduler.PRIORITY_BATCH):
+            answer = main.process_user_input(question, budget, timings=timings, status=status)
+        error = f"degraded answer ({status['degraded']})" if status.get("degraded") else None
+    except Exception as e:
+        logger.exception("pipeline failed for %r", question)
+        answer, error = None, str(e) or type(e).__name__
+    timings["total"] = round(time.perf_counter() - start, 4)
+    return answer, timings, error
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = DEFAULT_CONCURRENCY,
+              budget: float = BATCH_BUDGET_SECONDS, field: str = None, id_field: str = None) -> dict:
+    """
+    Answers every question of input_path not yet answered in output_path, appending one record per question:
+    {"id", "question", "answer", "timings"} plus "duplicate_of" (id whose answer was reused) or "error".
+    Returns run statistics.
+    """
+    questions = read_questions(input_path, field, id_field)
+    done = answered_ids(output_path)
+    pending = [(qid, text) for qid, text in questions if qid not in done]
+    # Failed records of the questions answered again are replaced, not kept next to the new ones
+    drop_records(output_path, {qid for qid, _ in pending})
+
+    # Group identical questions: the first id of each group is answered, the others reuse its answer
+    groups = {}
+    for qid, text in pending:
+        groups.setdefault(normalize_question(text), []).append((qid, text))
+
+    stats = {"questions": len(questions), "skipped": len(questions) - len(pending),
+             "unique": len(groups), "answered": 0, "failed": 0}
+    start = time.perf_counter()
+    with open(output_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+        futures = {
+            # copy_context so each job starts from a clean copy of the caller's context variables
+            executor.submit(contextvars.copy_context().run, answer_question, group[0][1], budget): group
+            for group in groups.values()
+        }
+        for future in as_completed(futures):
+            group = futures[future]
+            answer, timings, error = future.result()
+            first_id = group[0][0]
+            for qid, text in group:
+                record = {"id": qid, "question": text, "answer": answer, "timings": timings}
+                if qid != first_id:
+                    record["duplicate_of"] = first_id
+                if error:
+                    record["error"] = error
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            # Flush per group so an interrupted run loses at most the questions in flight
+            out.flush()
+            stats["failed" if error else "answered"] += len(group)
+            logger.info("%d/%d answered", stats["answered"] + stats["failed"], len(pending))
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions in batch")
+    parser.add_argument("input", help="JSONL file with one question per line")
+    parser.add_argument("output", help="JSONL file the answers are appended to (reruns resume from it)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="questions answered at once")
+    parser.add_argument("--budget", type=float, default=BATCH_BUDGET_SECONDS, help="time limit per question, in seconds")
+    parser.add_argument("--field", help=f"question field (default: first of {', '.join(QUESTION_FIELDS)})")
+    parser.add_argument("--id-field", help=f"id field (default: first of {', '.join(ID_FIELDS)}, else the line number)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    result = run_batch(args.input, args.output, args.concurrency, args.budget, args.field, args.id_field)
+    print(json.dumps(result), file=sys.stderr)
@@ -0,0 +1,243 @@
+import os
+import sys
+import time
+import gzip
+import json
+import struct
+import argparse
+import cache_backends
+import football_api
+
+# Cache administration for football_api._cache (any backend of cache_backends.py).
+#   python cache_admin.py stats                  per-namespace entries, bytes, stale copies and hit rate
+#   python cache_admin.py enforce [--max-bytes]  evict entries until the cache fits the byte budget
+#   python cache_admin.py export warm.snap       write a compressed snapshot of the cache
+#   python cache_admin.py import warm.snap       load a snapshot (e.g. on a new node before it takes traffic)
+#
+# Eviction policy. Entries are evicted in this order until the cache fits CACHE_MAX_BYTES:
+#   1. entries of invalidated namespace versions (left over by invalidate_namespace);
+#   2. stale copies (past their TTL, only kept to answer when the API is unavailable);
+#   3. fresh entries, by namespace tier (lowest first) and within a namespace by its policy:
+#        "expiry"  soonest expiry first (they would be refetched soon anyway),
+#        "size"    largest first (most bytes freed per entry lost).
+# Namespaces with the "keep" policy are never evicted: odds snapshots are a history built over time
+# that the API cannot give back. API payloads rank above LLM-derived entries (answers, intents,
+# embeddings), since refetching them spends the small daily API quota.
+# Run `enforce` periodically (cron, or next to the warm-up); diskcache's own size limit stays as a safety net.
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# namespace -> (tier, policy); namespaces not listed get DEFAULT_POLICY
+NAMESPACE_POLICIES = {
+    "answer": (0, "size"),
+    "intent": (0, "expiry"),
+    "embedding": (0, "expiry"),
+    "live": (0, "expiry"),
+    "predictions": (1, "expiry"),
+    "fixtures": (1, "expiry"),
+    "fixtures_by_date": (1, "expiry"),
+    "round_fixtures": (1, "expiry"),
+    "current_round": (1, "expiry"),
+    "player_profiles": (2, "size"),
+    "league_players": (2, "size"),
+    "top_players": (1, "expiry"),
+    "fixture": (2, "expiry"),
+    "team": (3, "expiry"),
+    "standings": (3, "expiry"),
+    "coach": (3, "expiry"),
+    "venue": (3, "expiry"),
+    "league_teams": (3, "expiry"),
+    "odds": (4, "keep"),
+}
+DEFAULT_POLICY = (1, "expiry")
+
+# Namespaces stored directly by main.py and guard.py, without football_api's stale grace period
+NO_GRACE_NAMESPACES = ("answer", "intent", "embedding")
+
+SNAPSHOT_MAGIC = b"CACHESNAP1\n"
+_RECORD = struct.Struct(">HI")
+
+
+def _entry_state(namespace: str, data: bytes, now: float):
+    """
+    Returns (expires_at, stale): the logical expire time (stored expiry minus the stale grace) and whether it passed.
+    """
+    expires_at = cache_backends.envelope_expiry(data)
+    if expires_at is None:
+        return None, False
+    logical = expires_at if namespace in NO_GRACE_NAMESPACES else expires_at - football_api.STALE_GRACE_SECONDS
+    return logical, logical < now
+
+
+def collect_stats(cache=None) -> dict:
+    """
+    Returns {namespace: {"entries", "bytes", "stale", "orphaned", "hit", "miss", "hit_rate", "policy"}}.
+    Hits and misses are the shared counters of every process using the cache (a stale copy found counts as a hit).
+    """
+    cache = cache or football_api._cache
+    now = time.time()
+    report = {}
+    for key, pkey, data in cache.entries():
+        namespace = pkey.split(":", 1)[0]
+        row = report.setdefault(namespace, {"entries": 0, "bytes": 0, "stale": 0, "orphaned": 0})
+        row["entries"] += 1
+        row["bytes"] += len(pkey) + len(data)
+        if key is None:
+            row["orphaned"] += 1
+        elif _entry_state(namespace, data, now)[1]:
+            row["stale"] += 1
+    for namespace, counts in cache.stats().items():
+        row = report.setdefault(namespace, {"entries": 0, "bytes": 0, "stale": 0, "orphaned": 0})
+        row.update(counts)
+    for namespace, row in report.items():
+        lookups = row.get("hit", 0) + row.get("miss", 0)
+        row["hit_rate"] = round(row.get("hit", 0) / lookups, 3) if lookups else None
+        row["policy"] = "/".join(str(p) for p in NAMESPACE_POLICIES.get(namespace, DEFAULT_POLICY))
+    return dict(sorted(report.items()))
+
+
+def eviction_order(entries, now: float = None):
+    """
+    Sorts (logical key, backend key, size, stored bytes) entries in eviction order, leaving out the "keep" namespaces.
+    """
+    now = now or time.time()
+    ranked = []
+    for key, pkey, size, data in entries:
+        namespace = pkey.split(":", 1)[0]
+        tier, policy = NAMESPACE_POLICIES.get(namespace, DEFAULT_POLICY)
+        if key is None:
+            ranked.append(((0, 0, 0), pkey, size))
+            continue
+        if policy == "keep":
+            continue
+        expires_at, stale = _entry_state(namespace, data, now)
+        if stale:
+            ranked.append(((1, 0, expires_at), pkey, size))
+        elif policy == "size":
+            ranked.append(((2, tier, -size), pkey, size))
+        else:
+            ranked.append(((2, tier, expires_at if expires_at is not None else float("inf")), pkey, size))
+    ranked.sort(key=lambda r: r[0])
+    return [(pkey, size) for _, pkey, size in ranked]
+
+
+def enforce_budget(max_bytes: int = CACHE_MAX_BYTES, cache=None) -> dict:
+    """
+    Evicts entries (see eviction_order) until the cache holds at most max_bytes.
+    Returns {"bytes_before", "bytes_after", "evicted"}.
+    """
+    cache = cache or football_api._cache
+    entries = [(key, pkey, len(pkey) + len(data), data) for key, pkey, data in cache.entries()]
+    total = sum(e[2] for e in entries)
+    report = {"bytes_before": total, "bytes_after": total, "evicted": 0}
+    if total <= max_bytes:
+        return report
+    victims = []
+    for pkey, size in eviction_order(entries):
+        if total <= max_bytes:
+            break
+        victims.append(pkey)
+        total -= size
+    cache.delete_raw(victims)
+    report.update(bytes_after=total, evicted=len(victims))
+    return report
+
+
+def export_snapshot(path: str, namespaces=None, include_stale: bool = True, cache=None) -> int:
+    """
+    Writes the current entries (optionally only some namespaces) to a gzip-compressed snapshot file.
+    Entries keep their serialized form and absolute expire times. Returns the number of entries written.
+    """
+    cache = cache or football_api._cache
+    now = time.time()
+    n = 0
+    with gzip.open(path, "wb", compresslevel=6) as f:
+        f.write(SNAPSHOT_MAGIC)
+        for key, _, data in cache.entries():
+            if key is None or (namespaces and key.split(":", 1)[0] not in namespaces):
+                continue
+            if not include_stale and _entry_state(key.split(":", 1)[0], data, now)[1]:
+                continue
+            encoded = key.encode("utf-8")
+            f.write(_RECORD.pack(len(encoded), len(data)))
+            f.write(encoded)
+            f.write(data)
+            n += 1
+    return n
+
+
+def import_snapshot(path: str, batch_size: int = 500, cache=None) -> int:
+    """
+    Loads a snapshot written by export_snapshot. Expired entries are skipped. Returns the number of entries stored.
+    """
+    cache = cache or football_api._cache
+    stored = 0
+    batch = {}
+    with gzip.open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a cache snapshot")
+        while True:
+            header = f.read(_RECORD.size)
+            if len(header) < _RECORD.size:
+                break
+            key_len, data_len = _RECORD.unpack(header)
+            key = f.read(key_len).decode("utf-8")
+            batch[key] = f.read(data_len)
+            if len(batch) >= batch_size:
+                stored += cache.restore(batch)
+                batch = {}
+    if batch:
+        stored += cache.restore(batch)
+    return stored
+
+
+def _format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect, bound and snapshot the chatbot cache.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats = commands.add_parser("stats", help="per-namespace entries, sizes and hit rates")
+    stats.add_argument("--json", action="store_true", help="print the report as JSON")
+    enforce = commands.add_parser("enforce", help="evict entries until the cache fits the byte budget")
+    enforce.add_argument("--max-bytes", type=int, default=CACHE_MAX_BYTES)
+    export = commands.add_parser("export", help="write a compressed warm snapshot")
+    export.add_argument("path")
+    export.add_argument("--namespace", action="append", help="only these namespaces (repeatable)")
+    export.add_argument("--fresh-only", action="store_true", help="leave out stale copies")
+    load = commands.add_parser("import", help="load a warm snapshot")
+    load.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        report = collect_stats()
+        if args.json:
+            print(json.dumps(report, indent=2))
+            return 0
+        print(f"{'namespace':<18}{'entries':>9}{'size':>11}{'stale':>8}{'orphan':>8}{'hits':>9}{'misses':>9}{'hit rate':>10}  policy")
+        for namespace, row in report.items():
+            rate = f"{row['hit_rate']:.1%}" if row["hit_rate"] is not None else "-"
+            print(f"{namespace:<18}{row['entries']:>9}{_format_bytes(row['bytes']):>11}{row['stale']:>8}{row['orphaned']:>8}"
+                  f"{row.get('hit', 0):>9}{row.get('miss', 0):>9}{rate:>10}  {row['policy']}")
+        total = sum(row["bytes"] for row in report.values())
+        print(f"total {_format_bytes(total)} of {_format_bytes(CACHE_MAX_BYTES)} budget")
+    elif args.command == "enforce":
+        report = enforce_budget(args.max_bytes)
+        print(f"{_format_bytes(report['bytes_before'])} -> {_format_bytes(report['bytes_after'])}, {report['evicted']} entries evicted")
+    elif args.command == "export":
+        start = time.perf_counter()
+        n = export_snapshot(args.path, namespaces=args.namespace, include_stale=not args.fresh_only)
+        print(f"{n} entries written to {args.path} ({_format_bytes(os.path.getsize(args.path))}) in {time.perf_counter() - start:.2f}s")
+    elif args.command == "import":
+        start = time.perf_counter()
+        n = import_snapshot(args.path)
+        print(f"{n} entries loaded from {args.path} in {time.perf_counter() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
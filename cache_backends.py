@@ -0,0 +1,613 @@
+import os
+import time
+import json
+import zlib
+import queue
+import array
+import atexit
+import pickle
+import socket
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import circuit_breaker
+
+# Pluggable cache backends.
+# Every cache in the chatbot (football data, odds snapshots, embeddings, intents, answers) goes through
+# a Cache, which adds to a plain byte store (the backend):
+#   - namespaces: the key prefix before the first ":" ("team:benfica" is in namespace "team"), each
+#     with its own serializer (register_serializer) and a version number; invalidate_namespace bumps
+#     the version, so every node stops seeing the old entries at once, and then deletes them;
+#   - an expiry envelope: the absolute expire time travels with the value, so readers can tell fresh
+#     from stale entries on every backend (diskcache-style get(key, expire_time=True));
+#   - batched get_many/set_many (one round trip on Redis);
+#   - atomic shared counters (incr), e.g. to append to a history without a read-modify-write.
+# Backends (CACHE_BACKEND env):
+#   memory  per-process LRU dict bounded by CACHE_MEMORY_BYTES;
+#   disk    diskcache directory CACHE_DIR (default "cache"), shared by processes of one machine;
+#   redis   any Redis-protocol server at REDIS_URL (redis://[:password@]host:port/db), shared by all
+#           nodes of a horizontally scaled deployment. A minimal RESP client is included, so no extra
+#           dependency is needed.
+# Backend errors (e.g. Redis unreachable) are logged and treated as misses: the cache never fails a request.
+# Redis calls go through a circuit breaker (circuit_breaker.py): during an outage they fail fast instead of
+# each waiting out the socket timeout.
+# Hits and misses per namespace are counted locally and added to shared counters in the backend every
+# STATS_FLUSH_SECONDS, so cache_admin.py can report hit rates across all processes and nodes.
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "disk")
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+CACHE_MEMORY_BYTES = int(os.environ.get("CACHE_MEMORY_BYTES", str(256 * 1024 * 1024)))
+
+# How long a node trusts its copy of a namespace version before re-reading it from the backend
+NAMESPACE_VERSION_TTL = 5
+
+STATS_FLUSH_SECONDS = 30
+
+# Backend keys starting with "__" hold counters (namespace versions, statistics), not entries
+_INTERNAL_PREFIX = "__"
+_VERSION_PREFIX = "__ns__:"
+_STATS_PREFIX = "__stats__:"
+_COUNTER_PREFIX = "__counter__:"
+_NO_EXPIRY = -1.0
+_ENVELOPE = struct.Struct(">d")
+
+
+class CacheBackendError(Exception):
+    """
+    A backend could not serve a request (connection lost, protocol error).
+    """
+
+
+# Serializers: dumps(value) -> bytes and loads(bytes) -> value
+
+class PickleSerializer:
+    """
+    Any picklable value (default).
+    """
+
+    def dumps(self, value) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+class JsonSerializer:
+    """
+    JSON values (API payloads), zlib-compressed above compress_over bytes. Portable across languages.
+    """
+
+    def __init__(self, compress_over: int = 1024):
+        self.compress_over = compress_over
+
+    def dumps(self, value) -> bytes:
+        data = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if len(data) > self.compress_over:
+            return b"z" + zlib.compress(data, 6)
+        return b"j" + data
+
+    def loads(self, data: bytes):
+        body = zlib.decompress(data[1:]) if data[:1] == b"z" else data[1:]
+        return json.loads(body)
+
+
+class RecordListSerializer:
+    """
+    API payloads whose "response" is a list of NamedTuple records (records.py): one JSON array per record
+    under the field list, zlib-compressed, loaded back as records. Entries written with other fields, or by
+    another serializer, fail to decode and are refetched.
+    """
+
+    def __init__(self, record_type):
+        self.record_type = record_type
+        self.fields = list(record_type._fields)
+
+    def dumps(self, value) -> bytes:
+        body = {**value, "fields": self.fields, "response": [list(r) for r in value.get("response", [])]}
+        return b"r" + zlib.compress(json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+
+    def loads(self, data: bytes):
+        if data[:1] != b"r":
+            raise ValueError("not a record list")
+        body = json.loads(zlib.decompress(data[1:]))
+        if body.pop("fields", None) != self.fields:
+            raise ValueError(f"record fields of {self.record_type.__name__} changed")
+        body["response"] = [self.record_type(*row) for row in body["response"]]
+        return body
+
+
+class Float32Serializer:
+    """
+    Lists of floats (embeddings) as packed float32, 4 bytes per value.
+    """
+
+    def dumps(self, value) -> bytes:
+        return array.array("f", value).tobytes()
+
+    def loads(self, data: bytes):
+        values = array.array("f")
+        values.frombytes(data)
+        return values.tolist()
+
+
+# Backends: byte stores with per-key TTL in seconds (None = no expiry)
+
+class MemoryBackend:
+    """
+    In-process LRU store bounded by total value size.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MEMORY_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()   # key -> (data, expires_at or None)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys) -> dict:
+        now = time.time()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._items.get(key)
+                if item is None:
+                    continue
+                if item[1] is not None and item[1] <= now:
+                    self._drop(key)
+                    continue
+                self._items.move_to_end(key)
+                found[key] = item[0]
+        return found
+
+    def set_many(self, items: dict):
+        now = time.time()
+        with self._lock:
+            for key, (data, ttl) in items.items():
+                self._drop(key)
+                self._items[key] = (data, now + ttl if ttl is not None else None)
+                self.size += len(data)
+            while self.size > self.max_bytes and self._items:
+                self._drop(next(iter(self._items)))
+
+    def _drop(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._drop(key)
+
+    def counter(self, key) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key, amount: int = 1) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+            return self._counters[key]
+
+    def scan_prefix(self, prefix: str):
+        with self._lock:
+            return [key for key in (*self._items, *self._counters) if key.startswith(prefix)]
+
+
+class DiskBackend:
+    """
+    diskcache directory, shared by the processes of one machine.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR):
+        import diskcache
+        self._cache = diskcache.Cache(directory)
+
+    def get_many(self, keys) -> dict:
+        found = {}
+        for key in keys:
+            data = self._cache.get(key)
+            if data is not None:
+                found[key] = data
+        return found
+
+    def set_many(self, items: dict):
+        with self._cache.transact():
+            for key, (data, ttl) in items.items():
+                self._cache.set(key, data, expire=ttl)
+
+    def delete_many(self, keys):
+        for key in keys:
+            self._cache.delete(key)
+
+    def counter(self, key) -> int:
+        return self._cache.get(key, 0)
+
+    def incr(self, key, amount: int = 1) -> int:
+        return self._cache.incr(key, amount, default=0)
+
+    def scan_prefix(self, prefix: str):
+        return [key for key in self._cache.iterkeys() if isinstance(key, str) and key.startswith(prefix)]
+
+
+class RedisBackend:
+    """
+    Redis-protocol (RESP2) server, with a small pool of pipelined connections.
+    Connection failures count towards the "redis:<host>:<port>" circuit breaker; while it is open, every
+    call raises CacheBackendError at once.
+    """
+
+    def __init__(self, url: str = REDIS_URL, pool_size: int = 16, timeout: float = 2.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = parts.password
+        self.db = int(parts.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self.circuit = circuit_breaker.breaker(f"redis:{self.host}:{self.port}")
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        setup = ([("AUTH", self.password)] if self.password else []) + ([("SELECT", self.db)] if self.db else [])
+        if setup:
+            self._send(conn, setup)
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        except BaseException:
+            # The connection may be left mid-reply: never reuse it
+            conn[0].close()
+            raise
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn[0].close()
+
+    @staticmethod
+    def _encode(command) -> bytes:
+        out = [b"*%d\r\n" % len(command)]
+        for arg in command:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(out)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line:
+            raise ConnectionError("connection closed by server")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest
+        if kind == b"-":
+            raise CacheBackendError(rest.decode("utf-8", "replace"))
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            n = int(rest)
+            if n < 0:
+                return None
+            data = reader.read(n + 2)
+            return data[:-2]
+        if kind == b"*":
+            n = int(rest)
+            return None if n < 0 else [self._read(reader) for _ in range(n)]
+        raise CacheBackendError(f"unexpected reply {line[:20]!r}")
+
+    def _send(self, conn, commands) -> list:
+        sock, reader = conn
+        sock.sendall(b"".join(self._encode(c) for c in commands))
+        return [self._read(reader) for _ in commands]
+
+    def execute(self, *commands) -> list:
+        """
+        Sends the commands in one pipeline and returns their replies.
+        """
+        if not self.circuit.allow():
+            raise CacheBackendError(f"circuit open for {self.circuit.name}")
+        try:
+            with self._connection() as conn:
+                replies = self._send(conn, commands)
+        except OSError as e:
+            self.circuit.record_failure()
+            raise CacheBackendError(str(e)) from e
+        except BaseException:
+            # An error reply: the server itself is reachable
+            self.circuit.record_success()
+            raise
+        self.circuit.record_success()
+        return replies
+
+    def get_many(self, keys) -> dict:
+        keys = list(keys)
+        if not keys:
+            return {}
+        values = self.execute(("MGET", *keys))[0]
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, items: dict):
+        commands = [("SET", key, data, "PX", max(1, int(ttl * 1000))) if ttl is not None else ("SET", key, data)
+                    for key, (data, ttl) in items.items()]
+        if commands:
+            self.execute(*commands)
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        for i in range(0, len(keys), 500):
+            self.execute(("DEL", *keys[i:i + 500]))
+
+    def counter(self, key) -> int:
+        value = self.execute(("GET", key))[0]
+        return int(value) if value is not None else 0
+
+    def incr(self, key, amount: int = 1) -> int:
+        return self.execute(("INCRBY", key, amount))[0]
+
+    def scan_prefix(self, prefix: str):
+        pattern = "".join("\\" + c if c in "*?[]\\" else c for c in prefix) + "*"
+        keys, cursor = [], b"0"
+        while True:
+            cursor, batch = self.execute(("SCAN", cursor, "MATCH", pattern, "COUNT", 1000))[0]
+            keys.extend(k.decode("utf-8") for k in batch)
+            if cursor == b"0":
+                return keys
+
+
+def namespace_of(key: str) -> str:
+    return key.split(":", 1)[0]
+
+
+def envelope_expiry(data: bytes):
+    """
+    Absolute expire time stored in an entry (None = no expiry).
+    """
+    expires_at = _ENVELOPE.unpack_from(data)[0]
+    return None if expires_at == _NO_EXPIRY else expires_at
+
+
+class Cache:
+    """
+    Namespaced, serializing cache over a backend. get/set follow diskcache's signatures
+    (expire in seconds; get(..., expire_time=True) returns (value, absolute expire time or None)).
+    With backend=None, the CACHE_BACKEND backend is created on first use, so importing a module that
+    holds a Cache opens no files or connections.
+    """
+
+    def __init__(self, backend=None, default_serializer=None):
+        self._backend = backend
+        self._backend_lock = threading.Lock()
+        self.default_serializer = default_serializer or PickleSerializer()
+        self._serializers = {}
+        self._versions = {}   # namespace -> (version, read at)
+        self._lock = threading.Lock()
+        self._stats = {}      # (namespace, "hit" or "miss") -> count not yet added to the backend
+        self._stats_flushed = time.monotonic()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = create_backend()
+        return self._backend
+
+    def register_serializer(self, namespace: str, serializer):
+        """
+        Uses `serializer` for every key of the namespace.
+        """
+        self._serializers[namespace] = serializer
+
+    def _version(self, namespace: str) -> int:
+        now = time.monotonic()
+        cached = self._versions.get(namespace)
+        if cached is not None and now - cached[1] < NAMESPACE_VERSION_TTL:
+            return cached[0]
+        version = self.backend.counter(_VERSION_PREFIX + namespace)
+        self._versions[namespace] = (version, now)
+        return version
+
+    def _physical(self, key: str) -> str:
+        namespace = namespace_of(key)
+        return f"{namespace}:{self._version(namespace)}:{key[len(namespace) + 1:]}"
+
+    def _unpack(self, key: str, data: bytes, expire_time: bool):
+        value = self._serializers.get(namespace_of(key), self.default_serializer).loads(data[_ENVELOPE.size:])
+        if not expire_time:
+            return value
+        return value, envelope_expiry(data)
+
+    def _pack(self, key: str, value, expire) -> bytes:
+        expires_at = time.time() + expire if expire is not None else _NO_EXPIRY
+        return _ENVELOPE.pack(expires_at) + self._serializers.get(namespace_of(key), self.default_serializer).dumps(value)
+
+    def get_many(self, keys, expire_time: bool = False) -> dict:
+        """
+        Returns {key: value} (or {key: (value, expire_time)}) for the keys found, in one backend round trip.
+        """
+        try:
+            physical = {self._physical(key): key for key in keys}
+            found = self.backend.get_many(list(physical))
+        except CacheBackendError as e:
+            logger.warning("cache read failed: %s", e)
+            return {}
+        result = {}
+        for pkey, data in found.items():
+            key = physical[pkey]
+            try:
+                result[key] = self._unpack(key, data, expire_time)
+            except Exception:
+                logger.warning("cache entry %s could not be decoded, ignored", key)
+        self._count(keys, result)
+        return result
+
+    def _count(self, keys, found: dict):
+        with self._lock:
+            for key in keys:
+                stat = (namespace_of(key), "hit" if key in found else "miss")
+                self._stats[stat] = self._stats.get(stat, 0) + 1
+            due = time.monotonic() - self._stats_flushed >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """
+        Adds the hits and misses counted by this process to the shared counters in the backend.
+        """
+        with self._lock:
+            pending, self._stats = self._stats, {}
+            self._stats_flushed = time.monotonic()
+        try:
+            for (namespace, result), n in pending.items():
+                self.backend.incr(f"{_STATS_PREFIX}{namespace}:{result}", n)
+        except CacheBackendError as e:
+            logger.warning("cache statistics not saved: %s", e)
+
+    def stats(self) -> dict:
+        """
+        Returns {namespace: {"hit": n, "miss": n}} from the shared counters (every process and node).
+        """
+        self.flush_stats()
+        totals = {}
+        for key in self.backend.scan_prefix(_STATS_PREFIX):
+            namespace, result = key[len(_STATS_PREFIX):].rsplit(":", 1)
+            totals.setdefault(namespace, {"hit": 0, "miss": 0})[result] = self.backend.counter(key)
+        return totals
+
+    def incr(self, key: str, amount: int = 1):
+        """
+        Atomically adds to a shared counter and returns its new value (None if the backend failed).
+        Counters are not entries: they never expire and are not exported or evicted.
+        """
+        try:
+            return self.backend.incr(_COUNTER_PREFIX + key, amount)
+        except CacheBackendError as e:
+            logger.warning("cache counter update failed: %s", e)
+            return None
+
+    def counter(self, key: str) -> int:
+        """
+        Returns the value of a shared counter (0 if it was never incremented or the backend failed).
+        """
+        try:
+            return self.backend.counter(_COUNTER_PREFIX + key)
+        except CacheBackendError as e:
+            logger.warning("cache counter read failed: %s", e)
+            return 0
+
+    def get(self, key: str, default=None, expire_time: bool = False):
+        found = self.get_many([key], expire_time)
+        if key in found:
+            return found[key]
+        return (default, None) if expire_time else default
+
+    def set_many(self, mapping: dict, expire=None):
+        """
+        Stores every key -> value with the same expiry (seconds, None = no expiry) in one backend round trip.
+        """
+        try:
+            self.backend.set_many({self._physical(key): (self._pack(key, value, expire), expire)
+                                   for key, value in mapping.items()})
+        except CacheBackendError as e:
+            logger.warning("cache write failed: %s", e)
+
+    def set(self, key: str, value, expire=None):
+        self.set_many({key: value}, expire)
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete_many([self._physical(key)])
+        except CacheBackendError as e:
+            logger.warning("cache delete failed: %s", e)
+
+    def entries(self, batch_size: int = 500):
+        """
+        Yields (logical key or None for an entry of an invalidated version, backend key, stored bytes) for
+        every entry. The bytes include the expiry envelope (see envelope_expiry).
+        """
+        keys = [key for key in self.backend.scan_prefix("") if not key.startswith(_INTERNAL_PREFIX)]
+        for i in range(0, len(keys), batch_size):
+            batch = keys[i:i + batch_size]
+            for pkey, data in self.backend.get_many(batch).items():
+                namespace, version, rest = pkey.split(":", 2) if pkey.count(":") >= 2 else (pkey, "", "")
+                current = version.isdigit() and int(version) == self._version(namespace)
+                yield (f"{namespace}:{rest}" if current else None), pkey, data
+
+    def restore(self, items: dict):
+        """
+        Stores entries exported with entries() ({logical key: stored bytes}) under the current namespace
+        versions, keeping their absolute expire times. Entries already past them are skipped.
+        Returns the number of entries stored.
+        """
+        now = time.time()
+        batch = {}
+        for key, data in items.items():
+            expires_at = envelope_expiry(data)
+            if expires_at is not None and expires_at <= now:
+                continue
+            batch[self._physical(key)] = (data, expires_at - now if expires_at is not None else None)
+        self.backend.set_many(batch)
+        return len(batch)
+
+    def delete_raw(self, backend_keys):
+        """
+        Deletes entries by backend key (as yielded by entries()).
+        """
+        self.backend.delete_many(backend_keys)
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """
+        Invalidates every entry of a namespace on all nodes (new version; other nodes notice within
+        NAMESPACE_VERSION_TTL) and deletes the old entries. Returns the new version.
+        """
+        version = self.backend.incr(_VERSION_PREFIX + namespace)
+        self._versions[namespace] = (version, time.monotonic())
+        current = f"{namespace}:{version}:"
+        stale = [key for key in self.backend.scan_prefix(f"{namespace}:") if not key.startswith(current)]
+        self.backend.delete_many(stale)
+        return version
+
+
+def create_backend(name: str = None):
+    """
+    Returns a backend by name ("memory", "disk" or "redis"), CACHE_BACKEND by default.
+    """
+    name = name or CACHE_BACKEND
+    if name == "memory":
+        return MemoryBackend()
+    if name == "redis":
+        return RedisBackend(REDIS_URL)
+    if name == "disk":
+        return DiskBackend(CACHE_DIR)
+    raise ValueError(f"Unknown cache backend {name!r} (expected memory, disk or redis)")
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> Cache:
+    """
+    Returns the process-wide Cache on the configured backend, shared by every caching call site.
+    The backend itself is opened on first use (see Cache).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            _default = Cache()
+            atexit.register(_default.flush_stats)
+        return _default
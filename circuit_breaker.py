@@ -0,0 +1,125 @@
+import time
+import threading
+
+# Per-endpoint circuit breakers for upstream services (API-Football endpoints, OpenAI chat and embeddings).
+# After FAILURE_THRESHOLD consecutive failures a breaker opens and calls fail fast for RESET_TIMEOUT_SECONDS,
+# instead of every user waiting out the timeout of a degraded service. Then a single trial call is let
+# through (half-open): success closes the breaker again, failure re-opens it.
+# A timeout only counts as a failure if the call had its full timeout: when the request deadline cut the
+# timeout short, the request ran out of time, which says nothing about the upstream (see record_error).
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT_SECONDS = 30
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised (or reported) when a call is rejected because its circuit is open.
+    """
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker for one upstream endpoint.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def is_open(self) -> bool:
+        """
+        Returns True if calls are currently being rejected (without claiming the half-open trial).
+        """
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self) -> bool:
+        """
+        Returns True if a call may go through now.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        """
+        Records a successful call (closes the breaker).
+        """
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        """
+        Records a failed call (opens the breaker after too many consecutive failures, or a failed trial).
+        """
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_error(self, error: BaseException, cut_short: bool = False):
+        """
+        Records a call that raised `error`: a failure, unless it timed out with a timeout the request deadline
+        cut short (cut_short), in which case the call is released without an outcome.
+        """
+        if cut_short and is_timeout(error):
+            self.release()
+        else:
+            self.record_failure()
+
+    def release(self):
+        """
+        Gives back a call allowed by allow() but not made or without an outcome, so the half-open trial is free again.
+        """
+        with self._lock:
+            self._trial_running = False
+
+
+def is_timeout(error: BaseException) -> bool:
+    """
+    True for timeout errors (TimeoutError, requests/httpx timeouts, openai.APITimeoutError), by class name so
+    that neither client library has to be imported here.
+    """
+    return isinstance(error, TimeoutError) or any("Timeout" in cls.__name__ for cls in type(error).__mro__)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """
+    Returns the process-wide breaker for an endpoint name (created on first use).
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def states() -> dict:
+    """
+    Returns {endpoint: {"state", "failures"}} for every breaker in use.
+    """
+    with _breakers_lock:
+        return {name: {"state": b.state, "failures": b.failures} for name, b in _breakers.items()}
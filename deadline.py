@@ -0,0 +1,66 @@
+import time
+import contextvars
+from contextlib import contextmanager
+
+# Request-scoped deadlines.
+# process_user_input opens a deadline scope for the whole request; every upstream call
+# (football_api.fetch_from_api, the OpenAI calls in main.py and guard.py) asks for its timeout with
+# timeout_for(), so it only gets the time that is left. Nested scopes can only shorten the deadline,
+# e.g. the handlers run under a scope that keeps time in reserve for generate_response.
+# The deadline lives in a context variable: code running in worker threads must be submitted
+# with contextvars.copy_context().run to see it.
+
+_current = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when an upstream call is skipped because the request has no time left.
+    """
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Runs the block with a deadline `seconds` from now (or the enclosing deadline, if sooner).
+    """
+    expires_at = time.monotonic() + max(0.0, seconds)
+    outer = _current.get()
+    if outer is not None:
+        expires_at = min(expires_at, outer)
+    token = _current.set(expires_at)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def remaining() -> float | None:
+    """
+    Returns the seconds left before the current deadline, or None outside any deadline scope.
+    """
+    expires_at = _current.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
+
+
+def expired() -> bool:
+    """
+    Returns True if the current deadline has passed.
+    """
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def timeout_for(default: float, minimum: float = 0.5) -> float:
+    """
+    Returns the timeout for an upstream call: the default, capped by the time left on the deadline.
+    Raises DeadlineExceeded if less than `minimum` seconds are left (not worth starting the call).
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left < minimum:
+        raise DeadlineExceeded(f"only {left:.2f}s left")
+    return min(default, left)
@@ -0,0 +1,696 @@
+import json
+import time
+import base64
+import random
+import struct
+import hashlib
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+# Local stand-ins for API-Football and the OpenAI API, used by benchmark.py.
+# FakeFootballAPI serves the endpoints used by football_api.py from a deterministic synthetic world
+# (two leagues with teams, venues, coaches, squads, a full season of fixtures with events, lineups and
+# statistics, predictions and odds) in API-Football's response format and payload shapes.
+# FakeOpenAI serves /v1/chat/completions and /v1/embeddings: intent extraction answers with the intent
+# registered for the question (FakeOpenAI.register), other chat calls with a Portuguese filler answer,
+# and embeddings are deterministic vectors clustered by topic, so the guard behaves as with real ones.
+# Both servers have configurable latency, jitter and error rate, and count the calls they receive.
+#
+# Point the chatbot at them with FOOTBALL_API_URL=http://127.0.0.1:<port> and
+# OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 (see benchmark.py).
+
+LEAGUE_TEAMS = {
+    94: ("Primeira Liga", "Portugal", [
+        "Benfica", "FC Porto", "Sporting CP", "SC Braga", "Vitoria Guimaraes", "Boavista", "Famalicao",
+        "Estoril", "Gil Vicente", "Casa Pia", "Arouca", "Moreirense", "Rio Ave", "Santa Clara",
+        "Estrela", "Nacional", "AVS", "Farense"]),
+    39: ("Premier League", "England", [
+        "Arsenal", "Chelsea", "Liverpool", "Manchester City", "Manchester United", "Tottenham",
+        "Newcastle", "Aston Villa", "Brighton", "West Ham", "Brentford", "Fulham", "Crystal Palace",
+        "Everton", "Wolves", "Nottingham Forest", "Bournemouth", "Leicester", "Ipswich", "Southampton"]),
+}
+
+FIRST_NAMES = ["Joao", "Pedro", "Rui", "Diogo", "Bruno", "Tiago", "Andre", "Nuno", "Ricardo", "Miguel",
+               "James", "Harry", "Jack", "Oliver", "Thomas", "Daniel", "Lucas", "Mateus", "Rafael", "Gabriel"]
+LAST_NAMES = ["Silva", "Santos", "Ferreira", "Pereira", "Costa", "Oliveira", "Rodrigues", "Martins", "Sousa",
+              "Gomes", "Smith", "Jones", "Taylor", "Brown", "Walker", "Wilson", "Carvalho", "Mendes", "Lopes", "Ramos"]
+POSITIONS = ["G"] * 2 + ["D"] * 6 + ["M"] * 6 + ["F"] * 4
+
+BOOKMAKERS = ["Bet365", "Betfair", "Unibet", "Bwin", "William Hill", "1xBet", "Pinnacle", "Marathonbet",
+              "10Bet", "Betway", "888Sport", "Betano"]
+
+STATISTIC_TYPES = ["Shots on Goal", "Shots off Goal", "Total Shots", "Blocked Shots", "Shots insidebox",
+                   "Shots outsidebox", "Fouls", "Corner Kicks", "Offsides", "Ball Possession", "Yellow Cards",
+                   "Red Cards", "Goalkeeper Saves", "Total passes", "Passes accurate", "Passes %", "expected_goals"]
+
+# Words that make a fake embedding land in the injection or "coming soon sports" clusters
+# Endpoints paged by the API (PAGE_SIZE results per page)
+PAGED_PATHS = ("/players",)
+PAGE_SIZE = 20
+
+INJECTION_WORDS = ("ignore", "prompt", "instructions", "bypass", "reveal", "api key", "admin", "developer mode",
+                   "reset", "config", "code", "leak", "rules")
+COMING_SOON_WORDS = ("basket", "basquetebol", "rugby", "formula 1")
+OTHER_TOPIC_WORDS = ("tenis", "ténis", "golfe", "receita", "tempo amanhã", "bolsa", "ciclismo")
+
+
+def _seeded(*parts) -> random.Random:
+    """
+    Random generator seeded by the given values (same parts, same data).
+    """
+    digest = hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
+
+
+def _poisson(rng: random.Random, lam: float) -> int:
+    n, p, threshold = 0, 1.0, pow(2.718281828459045, -lam)
+    while True:
+        p *= rng.random()
+        if p <= threshold:
+            return n
+        n += 1
+
+
+class FootballWorld:
+    """
+    Deterministic synthetic football data for one season, built in memory.
+    Fixtures are spread over weekly rounds around `now`, so there are finished, live and upcoming matches.
+    """
+
+    def __init__(self, season: int = 2025, seed: int = 7, payload_scale: int = 1, now: float = None):
+        self.season = season
+        self.seed = seed
+        self.payload_scale = max(1, int(payload_scale))
+        self.now = now or time.time()
+        self.leagues = {}
+        self.teams = {}
+        self.players = {}
+        self.coaches = {}
+        self.venues = {}
+        self.fixtures = {}
+        for league_id, (name, country, team_names) in LEAGUE_TEAMS.items():
+            self.leagues[league_id] = {"id": league_id, "name": name, "country": country, "type": "League",
+                                       "logo": f"https://media.api-sports.io/football/leagues/{league_id}.png"}
+            ids = [self._add_team(league_id, country, n, team_name) for n, team_name in enumerate(team_names)]
+            self._add_season(league_id, ids)
+
+    def _add_team(self, league_id: int, country: str, n: int, name: str) -> int:
+        team_id = league_id * 100 + n + 1
+        rng = _seeded(self.seed, "team", team_id)
+        venue_id = team_id * 10
+        city = name.split()[-1]
+        self.venues[venue_id] = {
+            "id": venue_id, "name": f"Estadio {name}" if country == "Portugal" else f"{name} Stadium",
+            "address": f"Avenida {rng.randint(1, 300)}", "city": city, "country": country,
+            "capacity": rng.randrange(5000, 65000, 500), "surface": "grass",
+            "image": f"https://media.api-sports.io/football/venues/{venue_id}.png",
+        }
+        coach_first, coach_last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        self.coaches[team_id] = {
+            "id": team_id * 10 + 1, "name": f"{coach_first[0]}. {coach_last}", "firstname": coach_first,
+            "lastname": coach_last, "age": rng.randint(35, 68), "nationality": country,
+            "photo": f"https://media.api-sports.io/football/coachs/{team_id * 10 + 1}.png",
+            "team": {"id": team_id, "name": name, "logo": f"https://media.api-sports.io/football/teams/{team_id}.png"},
+            "career": [{"team": {"id": team_id, "name": name}, "start": f"{self.season - rng.randint(0, 4)}-07-01", "end": None}]
+            + [{"team": {"id": rng.randint(1000, 9999), "name": f"{rng.choice(LAST_NAMES)} FC"},
+                "start": f"{self.season - 6 - k}-07-01", "end": f"{self.season - 5 - k}-06-30"} for k in range(3)],
+        }
+        squad = []
+        for k, position in enumerate(POSITIONS):
+            player_id = team_id * 100 + k + 1
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            self.players[player_id] = {
+                "id": player_id, "name": f"{first} {last}", "firstname": first, "lastname": last,
+                "age": rng.randint(18, 36), "nationality": country, "height": f"{rng.randint(168, 198)} cm",
+                "weight": f"{rng.randint(62, 92)} kg", "position": position, "number": k + 1, "team_id": team_id,
+                "photo": f"https://media.api-sports.io/football/players/{player_id}.png",
+            }
+            squad.append(player_id)
+        self.teams[team_id] = {
+            "team": {"id": team_id, "name": name, "code": name[:3].upper(), "country": country,
+                     "founded": rng.randint(1880, 1950), "national": False,
+                     "logo": f"https://media.api-sports.io/football/teams/{team_id}.png"},
+            "venue": self.venues[venue_id],
+            "league_id": league_id,
+            "strength": rng.uniform(0.7, 1.4),
+            "squad": squad,
+        }
+        return team_id
+
+    def _add_season(self, league_id: int, team_ids: list):
+        """
+        Double round robin (circle method), one round per week; the current week is round 10.
+        """
+        teams = list(team_ids)
+        rounds = []
+        for r in range(len(teams) - 1):
+            pairs = [(teams[i], teams[-1 - i]) for i in range(len(teams) // 2)]
+            rounds.append([(a, b) if r % 2 else (b, a) for a, b in pairs])
+            teams = [teams[0]] + [teams[-1]] + teams[1:-1]
+        rounds += [[(b, a) for a, b in pairs] for pairs in rounds]
+        week = 7 * 24 * 3600
+        base = int(self.now // 3600 * 3600) - 9 * week - 3600
+        for r, pairs in enumerate(rounds):
+            for n, (home, away) in enumerate(pairs):
+                fixture_id = league_id * 100000 + r * 100 + n + 1
+                # Matches of a round are spread over three days; the first ones of the current round are live
+                kickoff = base + r * week + (n % 3) * 24 * 3600 + (n // 3) * 2 * 3600
+                self.fixtures[fixture_id] = self._make_fixture(fixture_id, league_id, r + 1, home, away, kickoff)
+
+    def _make_fixture(self, fixture_id: int, league_id: int, round_no: int, home: int, away: int, kickoff: int) -> dict:
+        rng = _seeded(self.seed, "fixture", fixture_id)
+        elapsed = (self.now - kickoff) / 60
+        if elapsed >= 115:
+            status, minute = ("FT", "Match Finished"), 90
+        elif elapsed >= 0:
+            minute = min(90, int(elapsed) if elapsed < 45 else max(45, int(elapsed) - 15))
+            status = ("1H", "First Half") if elapsed < 45 else ("HT", "Halftime") if elapsed < 60 else ("2H", "Second Half")
+        else:
+            status, minute = ("NS", "Not Started"), None
+        home_team, away_team = self.teams[home], self.teams[away]
+        goals = {"home": None, "away": None}
+        events = []
+        if minute is not None:
+            share = minute / 90
+            goals = {"home": _poisson(rng, 1.5 * home_team["strength"] / away_team["strength"] * share),
+                     "away": _poisson(rng, 1.1 * away_team["strength"] / home_team["strength"] * share)}
+            events = self._make_events(rng, home, away, goals, minute)
+        date = datetime.fromtimestamp(kickoff, timezone.utc)
+        venue = home_team["venue"]
+        return {
+            "fixture": {
+                "id": fixture_id, "referee": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", "timezone": "UTC",
+                "date": date.isoformat(), "timestamp": kickoff,
+                "periods": {"first": kickoff if minute is not None else None, "second": kickoff + 3600 if (minute or 0) > 45 else None},
+                "venue": {"id": venue["id"], "name": venue["name"], "city": venue["city"]},
+                "status": {"long": status[1], "short": status[0], "elapsed": minute, "extra": None},
+            },
+            "league": {**self.leagues[league_id], "season": self.season, "round": f"Regular Season - {round_no}"},
+            "teams": {
+                "home": {"id": home, "name": home_team["team"]["name"], "logo": home_team["team"]["logo"],
+                         "winner": None if status[0] != "FT" or goals["home"] == goals["away"] else goals["home"] > goals["away"]},
+                "away": {"id": away, "name": away_team["team"]["name"], "logo": away_team["team"]["logo"],
+                         "winner": None if status[0] != "FT" or goals["home"] == goals["away"] else goals["away"] > goals["home"]},
+            },
+            "goals": goals,
+            "score": {"halftime": {"home": None, "away": None}, "fulltime": dict(goals) if status[0] == "FT" else {"home": None, "away": None},
+                      "extratime": {"home": None, "away": None}, "penalty": {"home": None, "away": None}},
+            "_events": events,
+        }
+
+    def _make_events(self, rng: random.Random, home: int, away: int, goals: dict, minute: int) -> list:
+        events = []
+        for side, team_id in (("home", home), ("away", away)):
+            team = self.teams[team_id]
+            outfield = [p for p in team["squad"] if self.players[p]["position"] != "G"]
+            ref = {"id": team_id, "name": team["team"]["name"], "logo": team["team"]["logo"]}
+            for _ in range(goals[side]):
+                scorer, assist = rng.sample(outfield, 2)
+                events.append(self._event(rng.randint(1, minute), ref, scorer, assist, "Goal", "Normal Goal"))
+            for _ in range(rng.randint(0, 3) * self.payload_scale):
+                events.append(self._event(rng.randint(1, minute), ref, rng.choice(outfield), None, "Card", "Yellow Card"))
+            for _ in range(min(5, minute // 20) * self.payload_scale):
+                off, on = rng.sample(outfield, 2)
+                events.append(self._event(rng.randint(46, max(46, minute)), ref, off, on, "subst", "Substitution 1"))
+        if rng.random() < 0.3:
+            events.append(self._event(rng.randint(1, minute), events[0]["team"] if events else {"id": home}, None, None, "Var", "Goal cancelled"))
+        return sorted(events, key=lambda e: e["time"]["elapsed"])
+
+    def _event(self, minute: int, team: dict, player_id, assist_id, kind: str, detail: str) -> dict:
+        player = self.players.get(player_id, {})
+        assist = self.players.get(assist_id, {})
+        return {"time": {"elapsed": minute, "extra": None}, "team": team,
+                "player": {"id": player.get("id"), "name": player.get("name")},
+                "assist": {"id": assist.get("id"), "name": assist.get("name")},
+                "type": kind, "detail": detail, "comments": None}
+
+    # Response builders, one per endpoint
+
+    def public_fixture(self, fixture: dict) -> dict:
+        return {k: v for k, v in fixture.items() if not k.startswith("_")}
+
+    def fixture_details(self, fixture: dict) -> dict:
+        """
+        Fixture with events, lineups, statistics and player ratings, as returned by /fixtures?ids=.
+        """
+        rng = _seeded(self.seed, "details", fixture["fixture"]["id"])
+        detailed = {**self.public_fixture(fixture), "events": fixture["_events"], "lineups": [], "statistics": [], "players": []}
+        if fixture["fixture"]["status"]["short"] == "NS":
+            return detailed
+        for side in ("home", "away"):
+            team = self.teams[fixture["teams"][side]["id"]]
+            ref = {"id": team["team"]["id"], "name": team["team"]["name"], "logo": team["team"]["logo"]}
+            squad = [self.players[p] for p in team["squad"]]
+            detailed["lineups"].append({
+                "team": ref, "formation": "4-3-3", "coach": {"id": self.coaches[team["team"]["id"]]["id"], "name": self.coaches[team["team"]["id"]]["name"]},
+                "startXI": [{"player": {"id": p["id"], "name": p["name"], "number": p["number"], "pos": p["position"], "grid": None}} for p in squad[:11]],
+                "substitutes": [{"player": {"id": p["id"], "name": p["name"], "number": p["number"], "pos": p["position"], "grid": None}} for p in squad[11:]],
+            })
+            detailed["statistics"].append({"team": ref, "statistics": [{"type": t, "value": rng.randint(0, 20)} for t in STATISTIC_TYPES]})
+            detailed["players"].append({"team": ref, "players": [
+                {"player": {"id": p["id"], "name": p["name"], "photo": p["photo"]},
+                 "statistics": [{"games": {"minutes": 90 if n < 11 else rng.choice([None, 15, 30]), "number": p["number"],
+                                           "position": p["position"], "rating": f"{rng.uniform(5.5, 8.5):.1f}", "captain": n == 0, "substitute": n >= 11},
+                                 "shots": {"total": rng.randint(0, 5), "on": rng.randint(0, 3)},
+                                 "passes": {"total": rng.randint(10, 80), "key": rng.randint(0, 4), "accuracy": str(rng.randint(60, 95))},
+                                 "tackles": {"total": rng.randint(0, 5), "blocks": None, "interceptions": rng.randint(0, 3)},
+                                 "duels": {"total": rng.randint(0, 15), "won": rng.randint(0, 8)},
+                                 "cards": {"yellow": 0, "red": 0}}]}
+                for n, p in enumerate(squad)]})
+        return detailed
+
+    def find_teams(self, search: str) -> list:
+        search = search.lower()
+        return [t for t in self.teams.values() if search in t["team"]["name"].lower()]
+
+    def standings(self, league_id: int) -> list:
+        rows = {t: {"played": 0, "win": 0, "draw": 0, "lose": 0, "for": 0, "against": 0}
+                for t, team in self.teams.items() if team["league_id"] == league_id}
+        if not rows:
+            return []
+        for f in self.fixtures.values():
+            if f["league"]["id"] != league_id or f["fixture"]["status"]["short"] != "FT":
+                continue
+            for side, other in (("home", "away"), ("away", "home")):
+                row = rows[f["teams"][side]["id"]]
+                gf, ga = f["goals"][side], f["goals"][other]
+                row["played"] += 1
+                row["for"] += gf
+                row["against"] += ga
+                row["win" if gf > ga else "lose" if gf < ga else "draw"] += 1
+        table = sorted(rows.items(), key=lambda kv: (-(3 * kv[1]["win"] + kv[1]["draw"]), -(kv[1]["for"] - kv[1]["against"]), -kv[1]["for"]))
+        standings = []
+        for rank, (team_id, row) in enumerate(table, start=1):
+            team = self.teams[team_id]["team"]
+            record = {"played": row["played"], "win": row["win"], "draw": row["draw"], "lose": row["lose"],
+                      "goals": {"for": row["for"], "against": row["against"]}}
+            standings.append({
+                "rank": rank, "team": {"id": team_id, "name": team["name"], "logo": team["logo"]},
+                "points": 3 * row["win"] + row["draw"], "goalsDiff": row["for"] - row["against"],
+                "group": self.leagues[league_id]["name"], "form": "WDLWW"[: min(5, row["played"])], "status": "same",
+                "description": "Promotion - Champions League" if rank <= 2 else None,
+                "all": record, "home": record, "away": record, "update": datetime.fromtimestamp(self.now, timezone.utc).isoformat(),
+            })
+        return [{"league": {**self.leagues[league_id], "season": self.season, "standings": [standings]}}]
+
+    def player_statistics(self, player: dict) -> dict:
+        team = self.teams[player["team_id"]]
+        league = self.leagues[team["league_id"]]
+        rng = _seeded(self.seed, "player_stats", player["id"])
+        games = rng.randint(3, 10)
+        attacking = {"G": 0, "D": 0.05, "M": 0.15, "F": 0.4}[player["position"]]
+        return {
+            "player": {k: v for k, v in player.items() if k != "team_id"},
+            "statistics": [{
+                "team": {"id": player["team_id"], "name": team["team"]["name"], "logo": team["team"]["logo"]},
+                "league": {**league, "season": self.season},
+                "games": {"appearences": games, "lineups": games - rng.randint(0, 2), "minutes": games * rng.randint(45, 90),
+                          "number": player["number"], "position": {"G": "Goalkeeper", "D": "Defender", "M": "Midfielder", "F": "Attacker"}[player["position"]],
+                          "rating": f"{rng.uniform(6.2, 7.8):.6f}", "captain": False},
+                "substitutes": {"in": rng.randint(0, 2), "out": rng.randint(0, 3), "bench": rng.randint(0, 3)},
+                "shots": {"total": int(games * attacking * 8), "on": int(games * attacking * 4)},
+                "goals": {"total": _poisson(rng, games * attacking), "conceded": 0, "assists": _poisson(rng, games * attacking / 2), "saves": None},
+                "passes": {"total": games * rng.randint(15, 60), "key": rng.randint(0, 12), "accuracy": rng.randint(60, 92)},
+                "tackles": {"total": rng.randint(0, 25), "blocks": rng.randint(0, 5), "interceptions": rng.randint(0, 15)},
+                "duels": {"total": rng.randint(10, 120), "won": rng.randint(5, 60)},
+                "dribbles": {"attempts": rng.randint(0, 30), "success": rng.randint(0, 15), "past": None},
+                "fouls": {"drawn": rng.randint(0, 15), "committed": rng.randint(0, 15)},
+                "cards": {"yellow": rng.randint(0, 3), "yellowred": 0, "red": int(rng.random() < 0.05)},
+                "penalty": {"won": None, "commited": None, "scored": 0, "missed": 0, "saved": None},
+            }],
+        }
+
+    def predictions(self, fixture: dict) -> list:
+        home = self.teams[fixture["teams"]["home"]["id"]]["strength"] * 1.15
+        away = self.teams[fixture["teams"]["away"]["id"]]["strength"]
+        p_home = round(100 * home / (home + away + 0.6))
+        p_away = round(100 * away / (home + away + 0.6))
+        return [{
+            "predictions": {"winner": fixture["teams"]["home" if p_home >= p_away else "away"], "win_or_draw": True,
+                            "under_over": "-2.5", "goals": {"home": "-2.5", "away": "-1.5"}, "advice": "Double chance",
+                            "percent": {"home": f"{p_home}%", "draw": f"{100 - p_home - p_away}%", "away": f"{p_away}%"}},
+            "league": fixture["league"], "teams": fixture["teams"],
+            "comparison": {k: {"home": f"{p_home}%", "away": f"{p_away}%"} for k in ("form", "att", "def", "poisson_distribution", "h2h", "goals", "total")},
+            "h2h": [self.public_fixture(f) for f in self.head_to_head(fixture["teams"]["home"]["id"], fixture["teams"]["away"]["id"])[:5]],
+        }]
+
+    def odds(self, fixture: dict, bet_id: int = None, bookmaker_id: int = None) -> list:
+        home = self.teams[fixture["teams"]["home"]["id"]]["strength"] * 1.15
+        away = self.teams[fixture["teams"]["away"]["id"]]["strength"]
+        p_home, p_away = home / (home + away + 0.6), away / (home + away + 0.6)
+        p_draw = 1 - p_home - p_away
+        markets = {
+            1: ("Match Winner", [("Home", p_home), ("Draw", p_draw), ("Away", p_away)]),
+            4: ("Asian Handicap", [(f"{side} {line:+}", 0.5) for line in (-1.5, -0.5, 0.5) for side in ("Home", "Away")]),
+            5: ("Goals Over/Under", [(f"{side} {line}", 0.5) for line in (0.5, 1.5, 2.5, 3.5, 4.5) for side in ("Over", "Under")]),
+            8: ("Both Teams Score", [("Yes", 0.55), ("No", 0.45)]),
+            12: ("Double Chance", [("Home/Draw", p_home + p_draw), ("Home/Away", p_home + p_away), ("Draw/Away", p_draw + p_away)]),
+            10: ("Exact Score", [(f"{h}:{a}", 0.04) for h in range(5) for a in range(5)]),
+            13: ("First Half Winner", [("Home", p_home), ("Draw", 0.4), ("Away", p_away)]),
+        }
+        bookmakers = []
+        for n in range(len(BOOKMAKERS) * self.payload_scale):
+            if bookmaker_id and n + 1 != bookmaker_id:
+                continue
+            rng = _seeded(self.seed, "odds", fixture["fixture"]["id"], n, int(self.now // 600))
+            margin = rng.uniform(1.03, 1.08)
+            bets = [{"id": b, "name": name, "values": [{"value": v, "odd": f"{max(1.01, 1 / (p * margin) * rng.uniform(0.97, 1.03)):.2f}"} for v, p in values]}
+                    for b, (name, values) in markets.items() if not bet_id or b == bet_id]
+            bookmakers.append({"id": n + 1, "name": BOOKMAKERS[n % len(BOOKMAKERS)] + ("" if n < len(BOOKMAKERS) else f" {n // len(BOOKMAKERS)}"), "bets": bets})
+        return [{"league": fixture["league"], "fixture": {"id": fixture["fixture"]["id"], "timezone": "UTC",
+                                                          "date": fixture["fixture"]["date"], "timestamp": fixture["fixture"]["timestamp"]},
+                 "update": datetime.fromtimestamp(self.now, timezone.utc).isoformat(), "bookmakers": bookmakers}]
+
+    def head_to_head(self, team1: int, team2: int) -> list:
+        pair = {team1, team2}
+        return sorted((f for f in self.fixtures.values() if {f["teams"]["home"]["id"], f["teams"]["away"]["id"]} == pair),
+                      key=lambda f: f["fixture"]["timestamp"])
+
+    def fixtures_query(self, params: dict) -> list:
+        """
+        /fixtures by team, league, date or round, optionally limited to a from/to date range.
+        """
+        selected = self.fixtures.values()
+        if "team" in params:
+            team = int(params["team"])
+            selected = [f for f in selected if team in (f["teams"]["home"]["id"], f["teams"]["away"]["id"])]
+        if "league" in params:
+            selected = [f for f in selected if f["league"]["id"] == int(params["league"])]
+        if "round" in params:
+            selected = [f for f in selected if f["league"]["round"] == params["round"]]
+        if "date" in params:
+            selected = [f for f in selected if f["fixture"]["date"][:10] == params["date"]]
+        if "from" in params:
+            selected = [f for f in selected if f["fixture"]["date"][:10] >= params["from"]]
+        if "to" in params:
+            selected = [f for f in selected if f["fixture"]["date"][:10] <= params["to"]]
+        return [self.public_fixture(f) for f in sorted(selected, key=lambda f: f["fixture"]["timestamp"])]
+
+    def rounds(self, league_id: int, current: bool = False) -> list:
+        """
+        /fixtures/rounds: round names of a league in order; with current=true, the round of the latest kick-off.
+        """
+        fixtures = sorted((f for f in self.fixtures.values() if f["league"]["id"] == league_id),
+                          key=lambda f: f["fixture"]["timestamp"])
+        if current:
+            started = [f for f in fixtures if f["fixture"]["timestamp"] <= self.now] or fixtures[:1]
+            return [started[-1]["league"]["round"]] if started else []
+        return list(dict.fromkeys(f["league"]["round"] for f in fixtures))
+
+    def respond(self, path: str, params: dict):
+        """
+        Returns the "response" list for an API-Football request, or None for an unknown endpoint.
+        """
+        if "season" in params and int(params["season"]) != self.season and path != "/players/profiles":
+            return []
+        if path == "/teams":
+            if "id" in params:
+                teams = [self.teams[int(params["id"])]] if int(params["id"]) in self.teams else []
+            elif "league" in params:
+                teams = [t for t in self.teams.values() if t["league_id"] == int(params["league"])]
+            else:
+                teams = self.find_teams(params.get("search", ""))
+            return [{"team": t["team"], "venue": t["venue"]} for t in teams]
+        if path == "/standings":
+            return self.standings(int(params.get("league", 0)))
+        if path == "/fixtures/headtohead":
+            team1, team2 = (int(x) for x in params["h2h"].split("-"))
+            league = int(params["league"]) if "league" in params else None
+            return [self.public_fixture(f) for f in self.head_to_head(team1, team2) if league is None or f["league"]["id"] == league]
+        if path == "/fixtures":
+            if "ids" in params:
+                ids = [int(x) for x in params["ids"].split("-")][:20]
+                return [self.fixture_details(self.fixtures[i]) for i in ids if i in self.fixtures]
+            if "id" in params:
+                fixture = self.fixtures.get(int(params["id"]))
+                return [self.fixture_details(fixture)] if fixture else []
+            return self.fixtures_query(params)
+        if path == "/fixtures/rounds":
+            return self.rounds(int(params.get("league", 0)), params.get("current") == "true")
+        if path == "/predictions":
+            fixture = self.fixtures.get(int(params.get("fixture", 0)))
+            return self.predictions(fixture) if fixture else []
+        if path == "/odds":
+            fixture = self.fixtures.get(int(params.get("fixture", 0)))
+            if not fixture:
+                return []
+            return self.odds(fixture, int(params.get("bet") or 0), int(params.get("bookmaker") or 0))
+        if path == "/players/profiles":
+            search = params.get("search", "").lower()
+            return [{"player": {k: v for k, v in p.items() if k != "team_id"}} for p in self.players.values()
+                    if search and search in p["lastname"].lower()][:250]
+        if path == "/players":
+            players = self.players.values()
+            if "id" in params:
+                players = [self.players[int(params["id"])]] if int(params["id"]) in self.players else []
+            if "search" in params:
+                players = [p for p in players if params["search"].lower() in p["name"].lower()]
+            if "team" in params:
+                players = [p for p in players if p["team_id"] == int(params["team"])]
+            if "league" in params:
+                players = [p for p in players if self.teams[p["team_id"]]["league_id"] == int(params["league"])]
+            return [self.player_statistics(p) for p in players]
+        if path == "/coachs":
+            coaches = self.coaches.values()
+            if "team" in params:
+                coaches = [self.coaches[int(params["team"])]] if int(params["team"]) in self.coaches else []
+            if "id" in params:
+                coaches = [c for c in coaches if c["id"] == int(params["id"])]
+            if "search" in params:
+                coaches = [c for c in coaches if params["search"].lower() in f"{c['firstname']} {c['lastname']}".lower()]
+            return list(coaches)
+        if path == "/venues":
+            venues = self.venues.values()
+            if "id" in params:
+                venues = [self.venues[int(params["id"])]] if int(params["id"]) in self.venues else []
+            if "search" in params:
+                venues = [v for v in venues if params["search"].lower() in v["name"].lower()]
+            return list(venues)
+        return None
+
+
+class _FakeServer:
+    """
+    ThreadingHTTPServer running in a daemon thread, with injected latency and errors and per-path call counts.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, seed: int = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = {}
+        self.errors = 0
+        self.bytes_sent = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _inject(self, path: str) -> bool:
+        """
+        Counts the call, sleeps for the configured latency and returns True if this call should fail.
+        """
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def _count_bytes(self, n: int):
+        with self._lock:
+            self.bytes_sent += n
+
+    def handle(self, method: str, path: str, params: dict, body: bytes):
+        """
+        Returns (status, payload dict, extra headers). Implemented by subclasses.
+        """
+        raise NotImplementedError
+
+    def start(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        Starts serving in a background thread (port 0 picks a free port) and returns self.
+        """
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self, method):
+                parts = urlsplit(self.path)
+                params = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload, headers = server.handle(method, parts.path, params, body)
+                data = json.dumps(payload).encode("utf-8")
+                server._count_bytes(len(data))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeFootballAPI(_FakeServer):
+    """
+    API-Football stand-in serving a FootballWorld. Quota headers report a large remaining budget.
+    """
+
+    def __init__(self, world: FootballWorld = None, daily_limit: int = 1_000_000, **kwargs):
+        super().__init__(**kwargs)
+        self.world = world or FootballWorld()
+        self.daily_limit = daily_limit
+
+    def handle(self, method, path, params, body):
+        with self._lock:
+            used = sum(self.calls.values())
+        headers = {"x-ratelimit-requests-limit": str(self.daily_limit),
+                   "x-ratelimit-requests-remaining": str(max(0, self.daily_limit - used - 1)),
+                   "X-RateLimit-Limit": "100000", "X-RateLimit-Remaining": "99999"}
+        if self._inject(path):
+            return 500, {"message": "Injected failure"}, headers
+        try:
+            response = self.world.respond(path, params)
+        except (KeyError, ValueError) as e:
+            return 200, {"get": path.lstrip("/"), "parameters": params, "errors": {"params": str(e)}, "results": 0, "response": []}, headers
+        if response is None:
+            return 404, {"message": f"Endpoint '{path}' does not exist"}, headers
+        page, pages = 1, 1
+        if path in PAGED_PATHS:
+            # Paged like the real API: PAGE_SIZE results per page, "page" parameter from 1
+            page = max(1, int(params.get("page", 1)))
+            pages = max(1, -(-len(response) // PAGE_SIZE))
+            response = response[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        return 200, {"get": path.lstrip("/"), "parameters": params, "errors": [], "results": len(response),
+                     "paging": {"current": page, "total": pages}, "response": response}, headers
+
+
+class FakeOpenAI(_FakeServer):
+    """
+    OpenAI stand-in for chat completions and embeddings.
+    - JSON-mode chat calls (intent extraction) return the intent registered for the user query, or "unknown".
+    - Other chat calls return a Portuguese filler answer of about answer_tokens tokens.
+    - Embeddings are deterministic unit vectors around one direction per topic (football, injection,
+      coming-soon sports, other) plus per-text noise.
+    """
+
+    def __init__(self, answer_tokens: int = 120, dimensions: int = 1536, **kwargs):
+        super().__init__(**kwargs)
+        self.answer_tokens = answer_tokens
+        self.dimensions = dimensions
+        self.intents = {}
+        self.tokens = {"prompt": 0, "completion": 0}
+
+    def register(self, question: str, intent):
+        """
+        Sets the intent (dict or list of dicts) returned when this question is extracted.
+        """
+        self.intents[question.strip()] = intent
+
+    def _usage(self, prompt: str, completion: str = "") -> dict:
+        prompt_tokens, completion_tokens = max(1, len(prompt) // 4), len(completion) // 4
+        with self._lock:
+            self.tokens["prompt"] += prompt_tokens
+            self.tokens["completion"] += completion_tokens
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+    def embedding(self, text: str) -> list:
+        lowered = text.lower()
+        if any(w in lowered for w in INJECTION_WORDS):
+            topic = 1
+        elif any(w in lowered for w in COMING_SOON_WORDS):
+            topic = 2
+        elif any(w in lowered for w in OTHER_TOPIC_WORDS):
+            topic = 3
+        else:
+            topic = 0
+        rng = _seeded("embedding", text)
+        sigma = 0.5 / self.dimensions ** 0.5
+        vector = [rng.gauss(0, sigma) for _ in range(self.dimensions)]
+        vector[topic] += 1.0
+        norm = sum(v * v for v in vector) ** 0.5
+        return [v / norm for v in vector]
+
+    def handle(self, method, path, params, body):
+        if self._inject(path):
+            return 500, {"error": {"message": "Injected failure", "type": "server_error"}}, {}
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": {"message": "Invalid JSON", "type": "invalid_request_error"}}, {}
+        if path.endswith("/embeddings"):
+            inputs = request.get("input")
+            inputs = [inputs] if isinstance(inputs, str) else inputs or []
+            data = []
+            for n, text in enumerate(inputs):
+                vector = self.embedding(text)
+                if request.get("encoding_format") == "base64":
+                    vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+                data.append({"object": "embedding", "index": n, "embedding": vector})
+            return 200, {"object": "list", "data": data, "model": request.get("model"),
+                         "usage": self._usage(" ".join(inputs))}, {}
+        if path.endswith("/chat/completions"):
+            messages = request.get("messages") or []
+            prompt = "\n".join(str(m.get("content", "")) for m in messages)
+            if (request.get("response_format") or {}).get("type") == "json_object":
+                question = prompt.rsplit("User query:", 1)[-1].strip()
+                content = json.dumps(self.intents.get(question, {"intent": "unknown"}), ensure_ascii=False)
+            else:
+                filler = "De acordo com os dados disponíveis, a equipa apresenta um desempenho consistente nesta época. "
+                content = (filler * (self.answer_tokens * 4 // len(filler) + 1))[: self.answer_tokens * 4].strip()
+            return 200, {
+                "id": f"chatcmpl-{hashlib.blake2b(prompt.encode('utf-8'), digest_size=6).hexdigest()}",
+                "object": "chat.completion", "created": int(time.time()), "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": self._usage(prompt, content),
+            }, {}
+        return 404, {"error": {"message": f"Unknown endpoint {path}", "type": "invalid_request_error"}}, {}
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the fake API-Football and OpenAI servers")
+    parser.add_argument("--football-port", type=int, default=8801)
+    parser.add_argument("--openai-port", type=int, default=8802)
+    parser.add_argument("--latency", type=float, default=0.05, help="football API latency in seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="OpenAI latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--payload-scale", type=int, default=1)
+    args = parser.parse_args()
+
+    football = FakeFootballAPI(FootballWorld(payload_scale=args.payload_scale), latency=args.latency,
+                               jitter=args.latency / 2, error_rate=args.error_rate).start(port=args.football_port)
+    llm = FakeOpenAI(latency=args.llm_latency, jitter=args.llm_latency / 2, error_rate=args.error_rate).start(port=args.openai_port)
+    print(f"FOOTBALL_API_URL={football.url}\nOPENAI_BASE_URL={llm.url}/v1")
+    threading.Event().wait()
@@ -1,7 +1,14 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
-import diskcache as dc
-import requests
+import cache_backends
+import circuit_breaker
+import deadline
+import records
+import scheduler
+import tracing
+import transport
 
 load_dotenv()
 
@@ -22,34 +29,98 @@ LEAGUES = {
     "uecl": {"name": "UEFA Europa Conference League", "id": 848},
 }
 
+_LEAGUE_IDS = {league["id"] for league in LEAGUES.values()}
+
 HEADERS = {"x-apisports-key": FOOTBALL_API_KEY}
 
+# Fixture statuses after which a fixture's data no longer changes
+FINISHED_STATUSES = {"FT", "AET", "PEN", "AWD", "WO"}
+
+# Fixture statuses of a match in progress
+LIVE_STATUSES = {"1H", "HT", "2H", "ET", "BT", "P", "SUSP", "INT", "LIVE"}
+
+# Maximum number of ids accepted by /fixtures?ids=
+MAX_FIXTURE_IDS_PER_REQUEST = 20
+
+# Fixture statuses of a match that will not be played on its date (its entry no longer changes either)
+CALLED_OFF_STATUSES = {"PST", "CANC", "ABD"}
+
+# Time zone of the dates of the date-wide fixture feed (what "hoje" means for the users)
+FIXTURE_TIMEZONE = os.environ.get("FIXTURE_TIMEZONE", "Europe/Lisbon")
+
 # Note on caching:
-# Some endpoints (get_team_standings, get_match_result, get_fixture_events, get_player_stats, get_fixture_odds) are NOT cached.
+# Some endpoints (get_match_result, get_player_stats, get_fixture_odds) are NOT cached.
 # This is because users may expect real-time or near real-time data for these endpoints (e.g., live scores, stats, or events).
+# get_team_standings serves a table fetched in the last STANDINGS_FRESH_SECONDS (tables only change when a
+# match ends; warmup.py refreshes them just before kick-off) and keeps older snapshots for the local ratings
+# model (ratings.py), which reads them with cache_only=True without spending API calls.
+# Fixture details (events, lineups, statistics) are cached per fixture by get_fixtures_details:
+# permanently once the fixture is finished, and only briefly while it is live.
+# Odds are stored as compact timestamped snapshots by odds.py rather than as raw payloads.
+# Whole days and league rounds (get_fixtures_by_date, get_round_fixtures) are cached with a TTL that follows
+# the status of their matches (fixture_list_ttl): a minute while one is live, for good once all are over.
+# Fixture lists (team, league, day and round fixtures) are streamed into records.FixtureRecord tuples as the
+# response arrives, and cached as such; see records.py.
 #
 # A possible solution: only cache data for past seasons (not the current season),
 # and always fetch fresh data for the current season. This would reduce API calls for historical queries
 # while keeping live data accurate.
 #
-# For better scalability and real-time needs, consider using a distributed cache like Redis, 
-# which supports cache invalidation and sharing across multiple servers.
+# The cache lives on the backend chosen with CACHE_BACKEND (see cache_backends.py): the diskcache in ./cache
+# by default, or a Redis server shared by every node when the chatbot is scaled out horizontally.
+# Whole namespaces can be dropped on all nodes with _cache.invalidate_namespace("standings").
+
+_cache = cache_backends.default_cache()
 
-# Persistent cache stored in ./cache folder
-_cache = dc.Cache("cache")
+# Raw API payloads are stored as compressed JSON (a few times smaller than pickles on the wire and in Redis)
+for _namespace in ("team", "standings", "predictions", "fixture",
+                   "player_profiles", "coach", "venue", "league_teams",
+                   "league_players", "top_players", "current_round"):
+    _cache.register_serializer(_namespace, cache_backends.JsonSerializer())
+for _namespace in ("fixtures", "fixtures_by_date", "round_fixtures"):
+    _cache.register_serializer(_namespace, cache_backends.RecordListSerializer(records.FixtureRecord))
 
-def cache_get(key: str):
+# Standings younger than this are served without calling the API
+STANDINGS_FRESH_SECONDS = int(os.environ.get("STANDINGS_FRESH_SECONDS", "1800"))
+
+# Entries are kept this long past their TTL so they can still be served (stale)
+# when the API quota runs out or the API is unreachable.
+STALE_GRACE_SECONDS = 7 * 24 * 3600
+
+def cache_get(key: str, allow_stale: bool = False):
     """
-    Get cached value if not expired (diskcache handles expiration).
+    Get cached value if not expired (the backend handles expiration of the stale copy).
+    Hit/miss statistics are recorded by the callers (see tracing.record_cache), since a stale read is not a miss.
+    With allow_stale=True, values past their TTL but within STALE_GRACE_SECONDS are returned too.
     """
-    value = _cache.get(key)
+    value, expire_time = _cache.get(key, expire_time=True)
+    if value is None:
+        return None
+    if not allow_stale and expire_time is not None and time.time() > expire_time - STALE_GRACE_SECONDS:
+        return None
     return value
 
 def cache_set(key: str, value, ttl: int):
     """
-    Store value in cache with expiration.
+    Store value in cache with expiration (ttl=None keeps it forever).
+    """
+    _cache.set(key, value, expire=ttl + STALE_GRACE_SECONDS if ttl is not None else None)
+
+def cache_get_many(keys, allow_stale: bool = False) -> dict:
+    """
+    Batched cache_get: returns {key: value} for the keys found, in one backend round trip.
+    """
+    now = time.time()
+    found = _cache.get_many(keys, expire_time=True)
+    return {key: value for key, (value, expire_time) in found.items()
+            if value is not None and (allow_stale or expire_time is None or now <= expire_time - STALE_GRACE_SECONDS)}
+
+def cache_set_many(mapping: dict, ttl: int):
+    """
+    Batched cache_set: stores every key -> value with the same ttl in one backend round trip.
     """
-    _cache.set(key, value, expire=ttl)
+    if mapping:
+        _cache.set_many(mapping, expire=ttl + STALE_GRACE_SECONDS if ttl is not None else None)
 
 
 def normalize_key(s: str) -> str:
@@ -59,15 +130,148 @@ def normalize_key(s: str) -> str:
     return str(s).strip().lower().replace(" ", "_")
 
 
-def fetch_from_api(url, headers, params, timeout=5):
+def fetch_from_api(url, headers, params, timeout=5, parse_item=None):
     """
     Fetch data from the API using requests with a simple timeout.
+    - With parse_item, the body is streamed and parsed incrementally: each item of "response" is replaced by
+      parse_item(item) (e.g. records.fixture_record) as it arrives, or left out when that returns None.
+    - The timeout is capped by the time left on the request deadline (deadline.py); with no time left,
+      {"error": ..., "timed_out": True, "response": []} is returned without calling the API.
+    - Each endpoint has a circuit breaker (circuit_breaker.py): while it is open, calls fail fast.
+    - Every request takes a token from the quota scheduler (scheduler.py), at the priority of the calling
+      context. Quota exhaustion (no token, HTTP 429 or a rate-limit error in the body)
+      is returned as {"error": ..., "rate_limited": True, "response": []}.
+    - Each call is traced as a "football_api" span (endpoint, params hash, status, bytes, error).
+    - The HTTP call goes through transport.py (record/replay). Replayed calls skip the quota scheduler,
+      since they spend no quota; a request missing from the cassettes is returned as an error.
+    """
+    endpoint = url[len(FOOTBALL_API_URL):] if FOOTBALL_API_URL and url.startswith(FOOTBALL_API_URL) else url
+    with tracing.span("football_api", endpoint=endpoint, params=tracing.params_hash(params)) as span:
+        data = _request(url, endpoint, headers, params, timeout, parse_item)
+        if isinstance(data, dict) and data.get("error"):
+            span.set(error=data["error"])
+        return data
+
+
+def _request(url, endpoint: str, headers, params, timeout, parse_item=None):
     """
+    Request step of fetch_from_api: breaker, deadline and quota checks, then the HTTP call.
+    """
+    circuit = circuit_breaker.breaker(f"football:{endpoint}")
+    if circuit.is_open():
+        return {"error": f"Circuit open for {endpoint}", "response": []}
+    try:
+        full_timeout, timeout = timeout, deadline.timeout_for(timeout)
+    except deadline.DeadlineExceeded as e:
+        return {"error": f"Deadline exceeded ({e})", "timed_out": True, "response": []}
+    # Checked before taking a quota token, so a call the breaker rejects does not spend one
+    if not circuit.allow():
+        return {"error": f"Circuit open for {endpoint}", "response": []}
+    replaying = transport.replaying()
+    if not replaying and not scheduler.acquire():
+        circuit.release()
+        if deadline.expired():
+            return {"error": "Deadline exceeded while waiting for quota", "timed_out": True, "response": []}
+        return {"error": "API quota budget exhausted", "rate_limited": True, "response": []}
     try:
-        r = requests.get(url, headers=headers, params=params, timeout=timeout)
-        return r.json()
+        r = transport.http_get("football", endpoint, url, headers=headers, params=params, timeout=timeout,
+                               stream=parse_item is not None)
+        if not replaying:
+            scheduler.update_from_headers(r.headers, r.status_code)
+        tracing.annotate(status=r.status_code)
+        tracing.count("upstream_requests_total", endpoint=endpoint, status=r.status_code)
+        if r.status_code >= 500 or r.status_code == 429:
+            data, received = None, len(r.content)
+        elif parse_item is None:
+            data, received = r.json(), len(r.content)
+        else:
+            chunks = records.ByteCounter(r.iter_content(records.CHUNK_BYTES))
+            data = records.parse_stream(chunks, parse_item)
+            received = chunks.bytes
+        tracing.annotate(bytes=received)
+        tracing.count("upstream_bytes_total", received, endpoint=endpoint)
+        if r.status_code >= 500:
+            circuit.record_failure()
+            return {"error": f"HTTP {r.status_code}", "response": []}
+        circuit.record_success()
+        if r.status_code == 429:
+            return {"error": "Too many requests", "rate_limited": True, "response": []}
+    except transport.CassetteMiss as e:
+        circuit.release()
+        return {"error": str(e), "response": []}
     except Exception as e:
+        circuit.record_error(e, cut_short=timeout < full_timeout)
         return {"error": str(e), "response": []}
+    # API-Football reports quota errors with HTTP 200 and an "errors" object
+    errors = data.get("errors") if isinstance(data, dict) else None
+    if isinstance(errors, dict) and ("rateLimit" in errors or "requests" in errors):
+        return {"error": str(errors.get("rateLimit") or errors.get("requests")), "rate_limited": True, "response": []}
+    return data
+
+
+# Cache keys being fetched right now in this process (single-flight, see fetch_cached)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def fetch_cached(cache_key: str, url, params, ttl, parse_item=None):
+    """
+    Cache-aside fetch shared by the cached endpoints.
+    Serves the fresh cached value if any; otherwise fetches and caches successful non-empty responses.
+    ttl is in seconds, or a function of the response returning them (e.g. fixture_list_ttl); parse_item is passed
+    to fetch_from_api (streamed records; a response whose items were all left out is cached too).
+    Concurrent misses on the same key share one request: the first caller fetches, the others wait for it.
+    If the fetch fails (quota budget, rate limit, network), a stale cached value is served instead.
+    The lookup is traced as a "cache" span tagged hit/miss/stale, with the upstream call as its child.
+    """
+    with tracing.span("cache", endpoint=cache_key.split(":", 1)[0], params=tracing.params_hash(params)):
+        cached = cache_get(cache_key)
+        if cached is not None:
+            tracing.record_cache(cache_key, "hit")
+            return cached
+        return _fetch_single_flight(cache_key, url, params, ttl, parse_item)
+
+
+def _fetch_single_flight(cache_key: str, url, params, ttl, parse_item=None):
+    """
+    Miss path of fetch_cached: one fetch per key at a time within the process.
+    """
+    with _inflight_lock:
+        leader = _inflight.get(cache_key)
+        if leader is None:
+            done = _inflight[cache_key] = threading.Event()
+    if leader is not None:
+        remaining = deadline.remaining()
+        # With no time left, _fetch_and_cache serves stale data or the deadline error without calling the API
+        if remaining is None or remaining > 0:
+            leader.wait(10 if remaining is None else remaining)
+            cached = cache_get(cache_key)
+            if cached is not None:
+                tracing.record_cache(cache_key, "hit")
+                return cached
+        return _fetch_and_cache(cache_key, url, params, ttl, parse_item)
+    try:
+        return _fetch_and_cache(cache_key, url, params, ttl, parse_item)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cache_key, None)
+        done.set()
+
+
+def _fetch_and_cache(cache_key: str, url, params, ttl, parse_item=None):
+    """
+    Fetch step of fetch_cached: fetch, cache on success, fall back to stale data on failure.
+    """
+    data = fetch_from_api(url, HEADERS, params, parse_item=parse_item)
+    if data and not data.get("error") and (data.get("response") or (parse_item is not None and data.get("results"))):
+        cache_set(cache_key, data, ttl(data) if callable(ttl) else ttl)
+    elif data.get("error"):
+        stale = cache_get(cache_key, allow_stale=True)
+        if stale is not None:
+            tracing.record_cache(cache_key, "stale")
+            return stale
+    tracing.record_cache(cache_key, "miss")
+    return data
 
 
 def search_team(name: str):
@@ -75,24 +279,22 @@ def search_team(name: str):
     Search for a team by name.
     """
     cache_key = f"team:{normalize_key(name)}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
     url = f"{FOOTBALL_API_URL}/teams"
     params = {"search": name}
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 30 * 24 * 3600)  # 30 days
-    return data
+    return fetch_cached(cache_key, url, params, 30 * 24 * 3600)  # 30 days
 
-def get_team_standings(league_id: int, season: int):
+def get_team_standings(league_id: int, season: int, cache_only: bool = False):
     """
-    Get the standings for a specific league and season.
+    Get the standings for a specific league and season (cached for STANDINGS_FRESH_SECONDS).
+    With cache_only=True, only the last stored snapshot is returned, however old (no API call).
+    If the API cannot be reached (or the quota is exhausted), the last snapshot is served instead.
     """
+    cache_key = f"standings:{league_id}:{season}"
+    if cache_only:
+        return cache_get(cache_key, allow_stale=True) or {"response": []}
     url = f"{FOOTBALL_API_URL}/standings"
     params = {"league": league_id, "season": season}
-    data = fetch_from_api(url, HEADERS, params)
-    return data
+    return fetch_cached(cache_key, url, params, STANDINGS_FRESH_SECONDS)
 
 def get_match_result(team1: str, team2: str, season: int, league_id: int):
     """
@@ -107,52 +309,197 @@ def get_match_result(team1: str, team2: str, season: int, league_id: int):
 
 def get_team_fixtures(team_id: int, season: int, from_date: str = None, to_date: str = None):
     """
-    Get fixtures for a team by date range.
+    Get fixtures for a team by date range, as records.FixtureRecord tuples.
     """
     cache_key = f"fixtures:{team_id}:{season}:{normalize_key(from_date) if from_date else ''}:{normalize_key(to_date) if to_date else ''}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
-
     url = f"{FOOTBALL_API_URL}/fixtures"
     params = {"team": team_id, "season": season}
     if from_date:
         params["from"] = from_date
     if to_date:
         params["to"] = to_date
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 86400)  # 1 day
-    return data
+    return fetch_cached(cache_key, url, params, 86400, parse_item=records.fixture_record)  # 1 day
+
+def fixture_list_ttl(data: dict, now: float = None) -> int:
+    """
+    TTL of a cached list of FixtureRecord (a day or a round), from the status of its matches:
+    1 minute while a match is live or due to start, until shortly before the next kick-off (at most 1 hour)
+    while matches are still to be played, and 7 days once they are all over or called off.
+    """
+    now = now or time.time()
+    fixtures = data.get("response", [])
+    if not fixtures:
+        return 6 * 3600
+    ttl = 7 * 24 * 3600
+    for f in fixtures:
+        if f.status in FINISHED_STATUSES or f.status in CALLED_OFF_STATUSES:
+            continue
+        kickoff = f.timestamp or 0
+        if f.status in LIVE_STATUSES or kickoff <= now + 60:
+            return 60
+        ttl = min(ttl, 3600, int(kickoff - now))
+    return ttl
+
+def _known_league_fixture(item: dict):
+    """
+    FixtureRecord of a fixture of the LEAGUES competitions, None for the others
+    (a date holds the fixtures of every competition in the world).
+    """
+    if (item.get("league") or {}).get("id") not in _LEAGUE_IDS:
+        return None
+    return records.fixture_record(item)
+
+def get_fixtures_by_date(date: str, league_ids=None):
+    """
+    Get the fixtures (FixtureRecord) of all LEAGUES competitions on a date (YYYY-MM-DD, in FIXTURE_TIMEZONE),
+    or only those of league_ids. One /fixtures?date= request covers every competition: the day is
+    streamed keeping only the LEAGUES fixtures, cached once (TTL from fixture_list_ttl) and filtered by league locally.
+    """
+    cache_key = f"fixtures_by_date:{date}"
+    url = f"{FOOTBALL_API_URL}/fixtures"
+    params = {"date": date, "timezone": FIXTURE_TIMEZONE}
+    data = fetch_cached(cache_key, url, params, fixture_list_ttl, parse_item=_known_league_fixture)
+    if league_ids is None or "error" in data:
+        return data
+    return {**data, "response": [f for f in data.get("response", []) if f.league_id in league_ids]}
+
+def get_current_round(league_id: int, season: int):
+    """
+    Get the name of the current round of a league (e.g. "Regular Season - 10").
+    """
+    cache_key = f"current_round:{league_id}:{season}"
+    url = f"{FOOTBALL_API_URL}/fixtures/rounds"
+    params = {"league": league_id, "season": season, "current": "true"}
+    return fetch_cached(cache_key, url, params, 3600)  # 1 hour
 
-def get_fixture_predictions(fixture_id: int):
+def get_round_fixtures(league_id: int, season: int, round_name: str):
+    """
+    Get every fixture (FixtureRecord) of a league round (a matchday) in one request; cached with fixture_list_ttl.
+    """
+    cache_key = f"round_fixtures:{league_id}:{season}:{normalize_key(round_name)}"
+    url = f"{FOOTBALL_API_URL}/fixtures"
+    params = {"league": league_id, "season": season, "round": round_name, "timezone": FIXTURE_TIMEZONE}
+    return fetch_cached(cache_key, url, params, fixture_list_ttl, parse_item=records.fixture_record)
+
+def get_fixture_predictions(fixture_id: int, cache_only: bool = False):
     """
     Get pre-match predictions for a given fixture.
+    With cache_only=True, returns the cached prediction or an empty response (no API call).
     """
     cache_key = f"predictions:{fixture_id}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
+    if cache_only:
+        cached = cache_get(cache_key)
+        return cached if cached is not None else {"response": []}
 
     url = f"{FOOTBALL_API_URL}/predictions"
     params = {"fixture": fixture_id}
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 300)  # 5 minutes
-    return data
-    
+    return fetch_cached(cache_key, url, params, 300)  # 5 minutes
+
+
+def fixture_detail_ttl(fixture: dict, now: float = None):
+    """
+    TTL of cached fixture details: permanent once finished, 30 seconds while live, and up to 10 minutes before
+    the match, but never past kick-off (so "not started" details are not served once it is under way).
+    """
+    now = now or time.time()
+    status = fixture["fixture"].get("status", {}).get("short")
+    if status in FINISHED_STATUSES:
+        return None
+    if status != "NS":
+        return 30
+    kickoff = fixture["fixture"].get("timestamp")
+    if kickoff is None:
+        return 600
+    return max(30, min(600, int(kickoff - now)))
+
+
+def get_fixtures_details(fixture_ids, refresh: bool = False):
+    """
+    Fetch full fixture details (events, lineups, statistics, players) for several fixtures.
+    Uncached ids are grouped into /fixtures?ids= requests of up to MAX_FIXTURE_IDS_PER_REQUEST ids,
+    and each fixture is cached individually (permanently once finished).
+    With refresh=True, cached entries are ignored (used by the live tracker to poll in-progress fixtures).
+    Returns {"response": [fixtures in the order of fixture_ids]}, plus "error" if a batch request failed.
+    """
+    fixtures = {}
+    pending = []
+    cached_details = {} if refresh else cache_get_many([f"fixture:{fixture_id}" for fixture_id in dict.fromkeys(fixture_ids)])
+    for fixture_id in dict.fromkeys(fixture_ids):
+        cached = cached_details.get(f"fixture:{fixture_id}")
+        if cached is not None:
+            fixtures[fixture_id] = cached
+        else:
+            pending.append(fixture_id)
+        if not refresh:
+            tracing.record_cache("fixture:", "hit" if cached is not None else "miss")
+
+    error = None
+    url = f"{FOOTBALL_API_URL}/fixtures"
+    for i in range(0, len(pending), MAX_FIXTURE_IDS_PER_REQUEST):
+        batch = pending[i:i + MAX_FIXTURE_IDS_PER_REQUEST]
+        params = {"ids": "-".join(str(fixture_id) for fixture_id in batch)}
+        data = fetch_from_api(url, HEADERS, params)
+        if not data or data.get("error"):
+            error = (data or {}).get("error") or "empty response"
+            # Serve stale details for this batch if we have them
+            stale = cache_get_many([f"fixture:{fixture_id}" for fixture_id in batch], allow_stale=True)
+            for fixture_id in batch:
+                if f"fixture:{fixture_id}" in stale:
+                    tracing.record_cache("fixture:", "stale")
+                    fixtures[fixture_id] = stale[f"fixture:{fixture_id}"]
+            continue
+        # Grouped by TTL so each group is stored in one round trip
+        by_ttl = {}
+        for fixture in data.get("response", []):
+            fixture_id = fixture["fixture"]["id"]
+            by_ttl.setdefault(fixture_detail_ttl(fixture), {})[f"fixture:{fixture_id}"] = fixture
+            fixtures[fixture_id] = fixture
+        for ttl, mapping in by_ttl.items():
+            cache_set_many(mapping, ttl)
+
+    result = {"response": [fixtures[fixture_id] for fixture_id in dict.fromkeys(fixture_ids) if fixture_id in fixtures]}
+    if error:
+        result["error"] = error
+    return result
+
+
+def _get_fixture_detail(fixture_id: int, field: str):
+    """
+    Returns {"response": <field of the fixture details>} served from the fixture details cache.
+    """
+    details = get_fixtures_details([fixture_id])
+    if not details["response"]:
+        return details
+    return {"response": details["response"][0].get(field, [])}
+
+
 def get_fixture_events(fixture_id: int, team_id: int = None, player_id: int = None):
     """
-    Fetch events for a specific fixture.
+    Fetch events for a specific fixture, optionally filtered by team or player.
     """
-    url = f"{FOOTBALL_API_URL}/fixtures/events"
-    params = {"fixture": fixture_id}
+    data = _get_fixture_detail(fixture_id, "events")
+    if "error" in data:
+        return data
+    events = data["response"]
     if team_id:
-        params["team"] = team_id
+        events = [e for e in events if e.get("team", {}).get("id") == team_id]
     if player_id:
-        params["player"] = player_id
-    data = fetch_from_api(url, HEADERS, params)
-    return data
+        events = [e for e in events if e.get("player", {}).get("id") == player_id]
+    return {"response": events}
+
+
+def get_fixture_lineups(fixture_id: int):
+    """
+    Fetch lineups (formation, starting XI, substitutes, coach) for a specific fixture.
+    """
+    return _get_fixture_detail(fixture_id, "lineups")
+
+
+def get_fixture_statistics(fixture_id: int):
+    """
+    Fetch team statistics (shots, possession, corners, ...) for a specific fixture.
+    """
+    return _get_fixture_detail(fixture_id, "statistics")
 
 
 def get_player_profiles(lastname: str, page: int = 1):
@@ -160,15 +507,9 @@ def get_player_profiles(lastname: str, page: int = 1):
     Fetch players by last name using the /players/profiles endpoint.
     """
     cache_key = f"player_profiles:{normalize_key(lastname)}:{page}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
     url = f"{FOOTBALL_API_URL}/players/profiles"
     params = {"search": lastname, "page": page}
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 604800)  # 1 week
-    return data
+    return fetch_cached(cache_key, url, params, 604800)  # 1 week
 
 def get_player_stats(player_name: str = None, player_id: int = None, season: int = None, league: int = None, team: int = None):
     """
@@ -189,14 +530,39 @@ def get_player_stats(player_name: str = None, player_id: int = None, season: int
     data = fetch_from_api(url, HEADERS, params)
     return data
 
+def get_league_players(league_id: int, season: int, page: int = 1):
+    """
+    Fetch one page (20 players) of the season statistics of every player of a league (see player_stats.py).
+    The response "paging" gives the number of pages.
+    """
+    cache_key = f"league_players:{league_id}:{season}:{page}"
+    url = f"{FOOTBALL_API_URL}/players"
+    params = {"league": league_id, "season": season, "page": page}
+    return fetch_cached(cache_key, url, params, 24 * 3600)  # 1 day
+
+def get_top_players(kind: str, league_id: int, season: int):
+    """
+    Fetch a league's top 20 players for kind "topscorers", "topassists", "topyellowcards" or "topredcards".
+    """
+    cache_key = f"top_players:{kind}:{league_id}:{season}"
+    url = f"{FOOTBALL_API_URL}/players/{kind}"
+    params = {"league": league_id, "season": season}
+    return fetch_cached(cache_key, url, params, 3600)  # 1 hour
+
+def get_league_teams(league_id: int, season: int):
+    """
+    Fetch every team of a league season, with its venue (used to build the reference bundle, see reference.py).
+    """
+    cache_key = f"league_teams:{league_id}:{season}"
+    url = f"{FOOTBALL_API_URL}/teams"
+    params = {"league": league_id, "season": season}
+    return fetch_cached(cache_key, url, params, 7 * 24 * 3600)  # 7 days
+
 def get_coach(coach_id: int = None, team_id: int = None, search: str = None):
     """
     Fetch coach information by coach ID, team ID, or name search.
     """
     cache_key = f"coach:{coach_id}:{team_id}:{normalize_key(search) if search else ''}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
     url = f"{FOOTBALL_API_URL}/coachs"
     params = {}
     if coach_id:
@@ -205,10 +571,7 @@ def get_coach(coach_id: int = None, team_id: int = None, search: str = None):
         params["team"] = team_id
     if search:
         params["search"] = search
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 7 * 24 * 3600)  # 7 days
-    return data
+    return fetch_cached(cache_key, url, params, 7 * 24 * 3600)  # 7 days
 
 def get_venue(search: str = None, venue_id: int = None):
     """
@@ -216,27 +579,25 @@ def get_venue(search: str = None, venue_id: int = None):
     """
     # Cache: 30 days
     cache_key = f"venue:{venue_id}:{normalize_key(search) if search else ''}"
-    cached = cache_get(cache_key)
-    if cached is not None:
-        return cached
     url = f"{FOOTBALL_API_URL}/venues"
     params = {}
     if search:
         params["search"] = search
     if venue_id:
         params["id"] = venue_id
-    data = fetch_from_api(url, HEADERS, params)
-    if data and not data.get("error") and data.get("response"):
-        cache_set(cache_key, data, 30 * 24 * 3600) # 30 days
-    return data
+    return fetch_cached(cache_key, url, params, 30 * 24 * 3600) # 30 days
 
 
-def get_fixture_odds(fixture_id: int):
+def get_fixture_odds(fixture_id: int, bet_id: int = None, bookmaker_id: int = None):
     """
     Fetch betting odds for a specific fixture.
-    Optionally filter by bookmaker or bet type (rarely needed for main chatbot use cases).
+    Optionally filter by bet type or bookmaker server-side, which shrinks the payload considerably.
     """
     url = f"{FOOTBALL_API_URL}/odds"
     params = {"fixture": fixture_id}
+    if bet_id:
+        params["bet"] = bet_id
+    if bookmaker_id:
+        params["bookmaker"] = bookmaker_id
     data = fetch_from_api(url, HEADERS, params)
     return data
\ No newline at end of file
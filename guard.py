@@ -1,4 +1,13 @@
 import re
+import time
+import hashlib
+import contextvars
+import cache_backends
+import circuit_breaker
+import deadline
+import llm_gateway
+import tracing
+import transport
 
 SPORTS_COMING_SOON = ["basket", "basquetebol", "rugby", "formula 1"]
 
@@ -21,12 +30,77 @@ INJECTION_PATTERNS = [
 # we could skip the embedding step if it takes more than x time and rely solely on
 # the LLM respecting the prompt.
 # Or we could use a self hosted model.
+# Embedding calls get the time left on the request deadline (at most EMBEDDING_TIMEOUT_SECONDS)
+# and fail fast while the embeddings circuit breaker is open.
+EMBEDDING_TIMEOUT_SECONDS = 5
 
 # _REFERENCE_EMBEDDINGS is an in-memory cache for static reference embeddings.
 # We don't save to disk cache because embeddings are static, fast to compute, 
 # only needed in memory, and saving to disk risks unauthorized modification of sensitive injection phrases and patterns.
 _REFERENCE_EMBEDDINGS = {}
 
+# User input embeddings are cached on the shared cache backend (packed float32, keyed by a hash of the
+# text), so repeated questions skip the embeddings call on every node.
+USER_EMBEDDING_TTL_SECONDS = 7 * 24 * 3600
+
+_cache = cache_backends.default_cache()
+_cache.register_serializer("embedding", cache_backends.Float32Serializer())
+
+# (user input, embedding) of the last guard_query in this context, reused by the semantic intent cache
+_query_embedding = contextvars.ContextVar("query_embedding", default=(None, None))
+
+def _embed(embeddings_client, inputs):
+    """
+    Computes embeddings for a list of strings with deadline-aware timeout and circuit breaker.
+    Traced as an "openai" span and accounted by llm_gateway; the call goes through transport.py (record/replay).
+    """
+    from openai.types import CreateEmbeddingResponse
+    timeout = deadline.timeout_for(EMBEDDING_TIMEOUT_SECONDS)
+    circuit = circuit_breaker.breaker("openai:embeddings")
+    if not circuit.allow():
+        raise circuit_breaker.CircuitOpenError("openai:embeddings")
+    start = time.perf_counter()
+    with tracing.span("openai", endpoint="embeddings", inputs=len(inputs)) as span:
+        try:
+            response = transport.model_call("openai", "embeddings", embeddings_client.embeddings.create, CreateEmbeddingResponse,
+                                            input=inputs, model="text-embedding-3-small", timeout=timeout)
+        except transport.CassetteMiss:
+            circuit.release()
+            raise
+        except Exception as e:
+            circuit.record_error(e, cut_short=timeout < EMBEDDING_TIMEOUT_SECONDS)
+            raise
+        circuit.record_success()
+        llm_gateway.record_usage("embeddings", "text-embedding-3-small", getattr(response, "usage", None),
+                                 time.perf_counter() - start, span)
+    return response.data
+
+
+def _embedding_key(user_input: str) -> str:
+    return "embedding:" + hashlib.blake2b(user_input.strip().encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cached_embedding(user_input: str):
+    """
+    Embedding of the user input if the same text was embedded before, else None (no embeddings call).
+    """
+    return _cache.get(_embedding_key(user_input))
+
+
+def _user_embedding(embeddings_client, user_input: str):
+    """
+    Embedding of the user input, from the cache when the same text was embedded before.
+    """
+    key = _embedding_key(user_input)
+    cached = _cache.get(key)
+    tracing.record_cache(key, "hit" if cached is not None else "miss")
+    if cached is not None:
+        return cached
+    embedding = _embed(embeddings_client, [user_input])[0].embedding
+    _cache.set(key, embedding, expire=USER_EMBEDDING_TTL_SECONDS)
+    return embedding
+
+
 def _get_reference_embeddings(embeddings_client):
     """
     Returns a dict with cached embeddings for all reference topics and phrases.
@@ -42,7 +116,7 @@ def _get_reference_embeddings(embeddings_client):
     all_phrases += INJECTION_PHRASES
 
     # Get embeddings in a single batch call
-    embs = embeddings_client.embeddings.create(input=all_phrases, model="text-embedding-3-small").data
+    embs = _embed(embeddings_client, all_phrases)
 
     # Map back
     idx = 0
@@ -88,7 +162,7 @@ def is_semantically_about(
     
     try:
         if user_emb is None:
-            user_emb = embeddings_client.embeddings.create(input=[user_input], model="text-embedding-3-small").data[0].embedding
+            user_emb = _user_embedding(embeddings_client, user_input)
         ref_embs = _get_reference_embeddings(embeddings_client)[reference_key]
 
         # If reference is a list of floats (single embedding), treat as single; if list of lists, treat as multiple
@@ -111,6 +185,30 @@ def is_semantically_about(
         return False
 
 
+def query_embedding(user_input: str):
+    """
+    Embedding of user_input computed by guard_query in the current context, or None (not guarded here,
+    or the embeddings call failed).
+    """
+    text, embedding = _query_embedding.get()
+    return embedding if text == user_input else None
+
+
+def embed_query(user_input: str, embeddings_client, user_emb=None):
+    """
+    Embeds user_input (None if the embeddings call fails) and keeps it for guard_query and query_embedding in the
+    current context, so the semantic intent cache can be checked before the guard runs without a second call.
+    user_emb is an embedding already read with cached_embedding, kept as is.
+    """
+    try:
+        if user_emb is None:
+            user_emb = _user_embedding(embeddings_client, user_input)
+    except Exception:
+        user_emb = None
+    _query_embedding.set((user_input, user_emb))
+    return user_emb
+
+
 def guard_query(user_input: str, embeddings_client) -> str | None:
     """
     Determines if the user input is safe and relevant for football queries using semantic similarity and pattern matching.
@@ -119,12 +217,11 @@ def guard_query(user_input: str, embeddings_client) -> str | None:
     it checks if the input is about a sport that is marked as "coming soon" and returns a corresponding message.
     If the input is about an unsupported sport or completely unrelated, it returns a message indicating so.
     If the input is valid and about football, it returns None, allowing further processing.
-
+    The embedding already computed by embed_query for the same input in this context is reused.
     """
-    try:
-        user_emb = embeddings_client.embeddings.create(input=[user_input], model="text-embedding-3-small").data[0].embedding
-    except Exception:
-        user_emb = None
+    text, user_emb = _query_embedding.get()
+    if text != user_input:
+        user_emb = embed_query(user_input, embeddings_client)
 
     # Injection detection (regex + embedding) FIRST
     if is_semantically_about(user_input, embeddings_client, "injection_phrases", threshold=0.25, regex_patterns=INJECTION_PATTERNS, user_emb=user_emb):
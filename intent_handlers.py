@@ -1,5 +1,21 @@
 import football_api
+import live
+import odds
+import player_stats
+import ratings
+import reference
+import session
 import unicodedata
+from datetime import datetime, timedelta
+
+NETWORK_ERROR_MESSAGE = "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+RATE_LIMIT_MESSAGE = "O limite de pedidos à API de futebol foi atingido. Tente novamente dentro de alguns minutos."
+
+def api_error_message(res):
+    """
+    Return the user-friendly message for a failed API response (quota exhaustion or network error).
+    """
+    return RATE_LIMIT_MESSAGE if res.get("rate_limited") else NETWORK_ERROR_MESSAGE
 
 def get_default_season(season):
     """
@@ -10,15 +26,22 @@ def get_default_season(season):
 def search_team_or_error(team_name):
     """
     Search for a team and return (team, error_message).
+    Teams already resolved in the current conversation session are reused without a lookup.
     """
     if not team_name:
         return None, "Não consegui identificar a equipa."
+    current = session.current()
+    if current and current.resolve_team(team_name):
+        return current.resolve_team(team_name), None
     team_res = football_api.search_team(team_name)
     if "error" in team_res:
-        return None, "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+        return None, api_error_message(team_res)
     if not team_res.get("response"):
         return None, f"Não encontrei a equipa {team_name}."
-    return team_res["response"][0]["team"], None
+    team = team_res["response"][0]["team"]
+    if current:
+        current.remember_team(team_name, team)
+    return team, None
 
 def search_teams_or_error(team1, team2):
     """S
@@ -26,22 +49,36 @@ def search_teams_or_error(team1, team2):
     """
     if not team1 or not team2:
         return None, None, "Não consegui identificar as equipas."
-    t1 = football_api.search_team(team1)
-    if "error" in t1:
-        return None, None, "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
-    t2 = football_api.search_team(team2)
-    if "error" in t2:
-        return None, None, "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
-    if not t1.get("response") or not t2.get("response"):
-        return None, None, "Não encontrei uma das equipas."
-    return t1["response"][0]["team"]["id"], t2["response"][0]["team"]["id"], None
+    found = []
+    for name in (team1, team2):
+        team, err = search_team_or_error(name)
+        if err and err.startswith("Não encontrei"):
+            return None, None, "Não encontrei uma das equipas."
+        if err:
+            return None, None, err
+        found.append(team["id"])
+    return found[0], found[1], None
+
+def reference_team_or_error(team_name):
+    """
+    Look a team up in the coach/venue reference bundle: by name first, then by the id found by search_team_or_error.
+    Return (TeamReference or None, team, error_message).
+    """
+    bundle = reference.current_bundle()
+    ref = bundle.find_team(team_name) if bundle and team_name else None
+    if ref is not None:
+        return ref, {"id": ref.team_id, "name": ref.team_name}, None
+    team, err = search_team_or_error(team_name)
+    if err:
+        return None, None, err
+    return (bundle.team(team["id"]) if bundle else None), team, None
 
 def handle_api_error(res, not_found_msg=None):
     """
     Handle API errors and return a user-friendly message.
     """
     if "error" in res:
-        return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+        return api_error_message(res)
     if not res.get("response"):
         return not_found_msg or "Não encontrei resultados."
     return None
@@ -124,7 +161,7 @@ def handle_match_result_intent(intent: dict):
     # If no competition specified or not found, league_id remains None and will be omitted from API call
     match_res = football_api.get_match_result(id1, id2, season.split("/")[0], league_id)
     if "error" in match_res:
-        return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+        return api_error_message(match_res)
     if not match_res.get("response"):
         if competition:
             return f"Não encontrei resultados entre {team1} e {team2} em {season} para {competition}."
@@ -157,7 +194,8 @@ def handle_team_fixtures_intent(intent: dict):
     - If the user does not provide a season, the function assumes the current season (2025/2026).
     - If fixture_period is not specified, all fixtures for the season are returned.
     - If fixture_type is not specified, all fixtures are returned sorted by date.
-    - If fixture_type is "hardest" or "easiest", only fixtures with win probability are returned, sorted by lowest or highest win probability, respectively.
+    - Win probabilities come from the local ratings model (no extra API calls), blended with the API-Football prediction when one is cached.
+    - If fixture_type is "hardest" or "easiest", fixtures are sorted by lowest or highest win probability, respectively.
     Returns a dictionary with team, season, fixture type, fixture period, and a list of fixtures (with date, teams, league, and win probability), or a user-friendly error message.
     """
     team_name = intent.get("team1")
@@ -179,27 +217,28 @@ def handle_team_fixtures_intent(intent: dict):
     fixtures_res = football_api.get_team_fixtures(team_id, season.split("/")[0], from_date=from_date, to_date=to_date)
 
     if "error" in fixtures_res:
-        return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+        return api_error_message(fixtures_res)
     fixtures = fixtures_res.get("response", [])
     if not fixtures:
         return f"Não encontrei jogos para o {team_name} em {season}."
 
-    # Annotate fixtures with win probability (if available)
-    for f in fixtures:
-        prob = compute_difficulty(f, team_name)
-        f["win_probability"] = prob if prob is not None else None
+    # Win probability of each fixture from the local model, blended with cached API predictions
+    # (fixtures are FixtureRecord tuples, so the probabilities are kept alongside them)
+    model_probs = ratings.win_probabilities(fixtures, team_id, season.split("/")[0])
+    rated = [(f, ratings.blend(model_prob, compute_difficulty(f, team_name, team_id=team_id, cache_only=True)))
+             for f, model_prob in zip(fixtures, model_probs)]
 
     # Handle fixture_type: if not specified, return all fixtures sorted by date
-    fixtures_to_return = fixtures
+    fixtures_to_return = rated
     if fixture_type == "hardest":
-        fixtures_to_return = [f for f in fixtures if f["win_probability"] is not None]
-        fixtures_to_return.sort(key=lambda x: x["win_probability"])
+        fixtures_to_return = [r for r in rated if r[1] is not None]
+        fixtures_to_return.sort(key=lambda r: r[1])
     elif fixture_type == "easiest":
-        fixtures_to_return = [f for f in fixtures if f["win_probability"] is not None]
-        fixtures_to_return.sort(key=lambda x: x["win_probability"], reverse=True)
+        fixtures_to_return = [r for r in rated if r[1] is not None]
+        fixtures_to_return.sort(key=lambda r: r[1], reverse=True)
     else:
         # No fixture_type: sort all fixtures by date
-        fixtures_to_return.sort(key=lambda x: x["fixture"]["date"])
+        fixtures_to_return.sort(key=lambda r: r[0].date)
 
     if fixture_type in ("hardest", "easiest") and not fixtures_to_return:
         return f"Não há jogos com probabilidade prevista para o {team_name} em {season}."
@@ -211,26 +250,146 @@ def handle_team_fixtures_intent(intent: dict):
         "fixture_period": fixture_period,
         "fixtures": [
             {
-                "date": f["fixture"]["date"],
-                "home": f["teams"]["home"]["name"],
-                "away": f["teams"]["away"]["name"],
-                "league": f["league"]["name"],
-                "win_probability": f.get("win_probability")
+                "date": f.date,
+                "home": f.home_name,
+                "away": f.away_name,
+                "league": f.league_name,
+                "win_probability": win_probability
             }
-            for f in fixtures_to_return
+            for f, win_probability in fixtures_to_return
         ]
     }
 
 
-def compute_difficulty(fixture, team_name):
+# Longest period listed by handle_fixtures_by_date_intent (one request per day)
+MAX_DATE_RANGE_DAYS = 7
+
+
+def summarize_fixture(f):
+    """
+    Compact record of a fixture (FixtureRecord) for day and round listings (kick-off, teams, status and score).
+    """
+    return {
+        "date": f.date,
+        "league": f.league_name,
+        "round": f.round,
+        "home": f.home_name,
+        "away": f.away_name,
+        "status": f.status,
+        "minute": f.elapsed if f.status in football_api.LIVE_STATUSES else None,
+        "goals_home": f.goals_home,
+        "goals_away": f.goals_away
+    }
+
+
+def handle_fixtures_by_date_intent(intent: dict):
+    """
+    Handles the intent to list the games of a day (or of a few days) across the supported competitions.
+    Example: "Que jogos há hoje?", "Resultados de ontem na Premier League"
+    - The days come from fixture_period (today if not given), at most MAX_DATE_RANGE_DAYS of them.
+    - If a competition is given, only its games are listed.
+    Each day is a single cached request for every competition (football_api.get_fixtures_by_date).
+    Returns a dictionary with the dates, competition and games, or a user-friendly error message.
+    """
+    competition = intent.get("competition")
+    fixture_period = intent.get("fixture_period") or {}
+    league_id, league_name = get_league_info_from_competition(competition)
+    if competition and not league_id:
+        return f"Não tenho jogos da competição {competition}."
+
+    today = datetime.now().strftime("%Y-%m-%d")
+    try:
+        start = datetime.strptime((fixture_period.get("start") or today)[:10], "%Y-%m-%d")
+        end = datetime.strptime((fixture_period.get("end") or fixture_period.get("start") or today)[:10], "%Y-%m-%d")
+    except ValueError:
+        return "Não consegui identificar a data dos jogos."
+    days = max(1, min((end - start).days + 1, MAX_DATE_RANGE_DAYS))
+    dates = [(start + timedelta(days=n)).strftime("%Y-%m-%d") for n in range(days)]
+
+    fixtures = []
+    for date in dates:
+        res = football_api.get_fixtures_by_date(date, {league_id} if league_id else None)
+        if "error" in res:
+            return api_error_message(res)
+        fixtures += res.get("response", [])
+    if not fixtures:
+        where = f" da {league_name}" if league_name else ""
+        return f"Não há jogos{where} em {dates[0]}." if days == 1 else f"Não há jogos{where} entre {dates[0]} e {dates[-1]}."
+
+    fixtures.sort(key=lambda f: f.timestamp)
+    return {
+        "dates": dates,
+        "competition": league_name,
+        "fixtures": [summarize_fixture(f) for f in fixtures]
+    }
+
+
+def round_name_of(current_round: str, number: int) -> str:
+    """
+    Name of round `number` in the naming of the league's current round ("Regular Season - 10" -> "Regular Season - 12").
+    """
+    prefix, sep, _ = (current_round or "").rpartition(" - ")
+    return f"{prefix} - {number}" if sep else f"Regular Season - {number}"
+
+
+def handle_round_fixtures_intent(intent: dict):
     """
-    Computes the win probability for the given team in a specific fixture using prediction data from the API.
+    Handles the intent to list the games and results of a league round (matchday).
+    Example: "Resultados da jornada da Premier League", "Jogos da jornada 12 da Primeira Liga"
+    - The competition is required; round is a round number, "previous" or "next" (relative to the current round),
+      or null for the current round.
+    - If the user does not provide a season, the function assumes the current season (2025/2026).
+    The whole round is a single cached request (football_api.get_round_fixtures).
+    Returns a dictionary with competition, season, round and games, or a user-friendly error message.
+    """
+    competition = intent.get("competition")
+    season = get_default_season(intent.get("season"))
+    round_no = intent.get("round")
+    league_id, league_name = get_league_info_from_competition(competition)
+    if not league_id:
+        return "Não consegui identificar a competição da jornada."
+    year = season.split("/")[0]
+
+    current_res = football_api.get_current_round(league_id, year)
+    current = None if "error" in current_res else (current_res.get("response") or [None])[0]
+    if isinstance(round_no, str) and round_no.isdigit():
+        round_no = int(round_no)
+    if isinstance(round_no, int):
+        round_name = round_name_of(current, round_no)
+    elif "error" in current_res:
+        return api_error_message(current_res)
+    elif current is None:
+        return f"Não encontrei a jornada atual da {league_name} em {season}."
+    elif round_no in ("previous", "next"):
+        number = current.rpartition(" - ")[2]
+        if not number.isdigit():
+            return f"Não consegui identificar a jornada pedida da {league_name}."
+        round_name = round_name_of(current, int(number) + (1 if round_no == "next" else -1))
+    else:
+        round_name = current
+
+    fixtures_res = football_api.get_round_fixtures(league_id, year, round_name)
+    err = handle_api_error(fixtures_res, f"Não encontrei jogos da jornada {round_name} da {league_name} em {season}.")
+    if err:
+        return err
+    fixtures = sorted(fixtures_res["response"], key=lambda f: f.timestamp)
+    return {
+        "competition": league_name,
+        "season": season,
+        "round": round_name,
+        "fixtures": [summarize_fixture(f) for f in fixtures]
+    }
+
+
+def compute_difficulty(fixture, team_name, team_id=None, cache_only=False):
+    """
+    Computes the win probability for the given team in a specific fixture (FixtureRecord) using prediction data from the API.
     - If prediction data is unavailable or an error occurs, returns None.
-    - team_name is matched against the home and away teams to select the correct probability.
+    - team_id (if given) or team_name is matched against the home and away teams to select the correct probability.
+    - With cache_only=True, only an already cached prediction is used (no API call).
     Returns a float between 0 and 1 representing the win probability, or None if not available.
     """
-    fixture_id = fixture["fixture"]["id"]
-    pred_res = football_api.get_fixture_predictions(fixture_id)
+    pred_res = football_api.get_fixture_predictions(fixture.fixture_id, cache_only=cache_only)
     if "error" in pred_res:
         return None
     preds = pred_res.get("response", [])
@@ -240,12 +399,10 @@ def compute_difficulty(fixture, team_name):
     # Take first prediction object
     prediction = preds[0].get("predictions", {})
     percent = prediction.get("percent", {})
-    home_team = fixture["teams"]["home"]["name"]
-    away_team = fixture["teams"]["away"]["name"]
     team_prob_str = None
-    if team_name.lower() == home_team.lower():
+    if team_id == fixture.home_id or team_name.lower() == fixture.home_name.lower():
         team_prob_str = percent.get("home")
-    elif team_name.lower() == away_team.lower():
+    elif team_id == fixture.away_id or team_name.lower() == fixture.away_name.lower():
         team_prob_str = percent.get("away")
 
     if not team_prob_str or not team_prob_str.endswith("%"):
@@ -268,30 +425,88 @@ def handle_match_events_intent(intent: dict):
     - If the user provides a competition, the function tries to map it to a league ID; if not found or not provided, the search is performed across all competitions.
     - Returns a dictionary with teams, season, competition, event types, and filtered events, or a user-friendly error message.
     """
+    return handle_match_events_intents([intent])[0]
+
+
+def handle_match_events_intents(intents: list):
+    """
+    Batch version of handle_match_events_intent for multi-match questions.
+    Resolves the fixture of every intent first, then loads the events of all fixtures with
+    a single football_api.get_fixtures_details call (one /fixtures?ids= request for up to 20 matches).
+    Matches in progress are read from the shared live tracker's event log instead.
+    Returns a list of results aligned with intents.
+    """
+    resolved = [resolve_match_fixture(intent) for intent in intents]
+    live_ids = {
+        fixture["fixture"]["id"] for fixture, err in resolved
+        if not err and fixture["fixture"].get("status", {}).get("short") in football_api.LIVE_STATUSES
+    }
+    fixture_ids = [fixture["fixture"]["id"] for fixture, err in resolved if not err and fixture["fixture"]["id"] not in live_ids]
+    details = football_api.get_fixtures_details(fixture_ids) if fixture_ids else {"response": []}
+    fixtures_by_id = {f["fixture"]["id"]: f for f in details["response"]}
+
+    results = []
+    for intent, (fixture, err) in zip(intents, resolved):
+        fixture_id = fixture["fixture"]["id"] if fixture else None
+        if err:
+            results.append(err)
+        elif fixture_id in live_ids:
+            events, _, live_err = live.tracker.events(fixture_id)
+            results.append(NETWORK_ERROR_MESSAGE if live_err else format_match_events(intent, events))
+        elif fixture_id not in fixtures_by_id and "error" in details:
+            results.append(api_error_message(details))
+        else:
+            events = fixtures_by_id.get(fixture_id, {}).get("events", [])
+            results.append(format_match_events(intent, events))
+    return results
+
+
+def resolve_match_fixture(intent: dict, not_found_msg=None):
+    """
+    Finds the fixture between the intent's two teams and return (fixture, error_message).
+    Fixtures already resolved in the current conversation session are reused without a head-to-head lookup;
+    unless the match was already over, their status and score are read again from the fixture details
+    (cached per football_api.fixture_detail_ttl), so a match that has kicked off since is seen as live.
+    """
     team1 = intent.get("team1")
     team2 = intent.get("team2")
     season = get_default_season(intent.get("season"))
-    competition = intent.get("competition")
-    event = intent.get("event")
 
     id1, id2, err = search_teams_or_error(team1, team2)
     if err:
-        return err
+        return None, err
+
+    league_id, _ = get_league_info_from_competition(intent.get("competition"))
+
+    current = session.current()
+    session_key = (id1, id2, season, league_id)
+    remembered = current.resolve_fixture(session_key) if current else None
+    if remembered:
+        status = remembered["fixture"].get("status", {}).get("short")
+        if status in football_api.FINISHED_STATUSES:
+            return remembered, None
+        details = football_api.get_fixtures_details([remembered["fixture"]["id"]])
+        if not details["response"]:
+            return remembered, None
+        fixture = {k: details["response"][0].get(k) for k in ("fixture", "league", "teams", "goals")}
+        current.remember_fixture(session_key, fixture)
+        return fixture, None
 
-    league_id, _ = get_league_info_from_competition(competition)
-
-    # Get fixture id for the match
     fixtures_res = football_api.get_match_result(id1, id2, season.split("/")[0], league_id)
-    err = handle_api_error(fixtures_res, f"Não encontrei o jogo entre {team1} e {team2} em {season}.")
+    err = handle_api_error(fixtures_res, not_found_msg or f"Não encontrei o jogo entre {team1} e {team2} em {season}.")
     if err:
-        return err
-    fixture_id = fixtures_res["response"][0]["fixture"]["id"]
+        return None, err
+    fixture = fixtures_res["response"][0]
+    if current:
+        current.remember_fixture(session_key, {k: fixture.get(k) for k in ("fixture", "league", "teams", "goals")})
+    return fixture, None
 
-    # Get events for that fixture
-    events_res = football_api.get_fixture_events(fixture_id)
-    if "error" in events_res:
-        return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
-    events = events_res.get("response", [])
+
+def format_match_events(intent: dict, events: list):
+    """
+    Filters a fixture's events by the event types requested in the intent.
+    """
+    event = intent.get("event")
 
     # Support event as list or string (compact)
     if event is None:
@@ -328,10 +543,10 @@ def handle_match_events_intent(intent: dict):
             filtered_events[ev] = filtered
 
     return {
-        "team1": team1,
-        "team2": team2,
-        "season": season,
-        "competition": competition,
+        "team1": intent.get("team1"),
+        "team2": intent.get("team2"),
+        "season": get_default_season(intent.get("season")),
+        "competition": intent.get("competition"),
         "event_types": event_types,
         "events": filtered_events
     }
@@ -346,7 +561,9 @@ def handle_player_stats_intent(intent: dict):
     - If neither competition nor team is provided, the function searches by player name across all teams.
     - If multiple players match the query, the function asks for clarification.
     - If a team or competition is specified, the statistics returned are only for that team or competition; otherwise, the statistics are the sum across all teams/competitions for the player in that season.
-    Returns a dictionary with player, season, team, competition, requested stats, and statistics, or a user-friendly error message.
+    - Players of the current season table (player_stats.py) are answered from memory, without API calls.
+    Returns a dictionary with player, season, team, competition, requested stats, totals and the per team/competition
+    breakdown, or a user-friendly error message.
     """
     player_name = intent.get("player")
     season = get_default_season(intent.get("season"))
@@ -359,14 +576,43 @@ def handle_player_stats_intent(intent: dict):
     season_start = season.split("/")[0]
     search_res = None
     player_id = None
+    current = session.current()
+    requested = ([stats_requested] if isinstance(stats_requested, str) else stats_requested) or list(player_stats.STATS)
 
-    if competition:
+    table = player_stats.current_table()
+    if table and str(table.season) == season_start and not team_name and all(s in player_stats.STATS for s in requested):
+        league_id, _ = get_league_info_from_competition(competition)
+        if current and current.resolve_player(player_name) in table.by_player_id:
+            matches = [table.by_player_id[current.resolve_player(player_name)]]
+        else:
+            matches = table.find_players(player_name)
+        if len(matches) == 1 and (league_id or not competition):
+            summary = table.player_summary(matches[0], requested, league_id)
+            if summary["by_competition"]:
+                if current:
+                    current.remember_player(player_name, summary["player_id"])
+                return {
+                    "player": summary["player"],
+                    "season": season,
+                    "team": team_name,
+                    "competition": competition,
+                    "stats_requested": requested,
+                    "totals": summary["totals"],
+                    "by_competition": summary["by_competition"],
+                }
+
+    if not competition and not team_name and current and current.resolve_player(player_name):
+        # Player already resolved earlier in the conversation
+        search_res = football_api.get_player_stats(player_id=current.resolve_player(player_name), season=season_start)
+        if "error" in search_res:
+            return api_error_message(search_res)
+    elif competition:
         league_id, _ = get_league_info_from_competition(competition)
         if not league_id:
             return f"Não reconheço a competição {competition}."
         search_res = football_api.get_player_stats(player_name=player_name, season=season_start, league=league_id)
         if "error" in search_res:
-            return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+            return api_error_message(search_res)
     elif team_name:
         team, err = search_team_or_error(team_name)
         if err:
@@ -374,13 +620,13 @@ def handle_player_stats_intent(intent: dict):
         team_id = team["id"]
         search_res = football_api.get_player_stats(player_name=player_name, season=season_start, team=team_id)
         if "error" in search_res:
-            return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+            return api_error_message(search_res)
     else:
         # Fallback → search by profiles using last name
         lastname = player_name.split()[-1]
         profiles_res = football_api.get_player_profiles(lastname)
         if "error" in profiles_res:
-            return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+            return api_error_message(profiles_res)
         candidates = profiles_res.get("response", [])
         if not candidates:
             return f"Não encontrei o jogador {player_name}."
@@ -408,66 +654,110 @@ def handle_player_stats_intent(intent: dict):
                 names = [c["player"]["name"] for c in (filtered if filtered else candidates)[:5]]
                 return f"Encontrei vários jogadores chamados {lastname}: {', '.join(names)}. Qual deles pretende?"
 
+        if current:
+            current.remember_player(player_name, player_id)
+
         # Now get stats by player_id
         search_res = football_api.get_player_stats(player_id=player_id, season=season_start)
         if "error" in search_res:
-            return "Ocorreu um erro de rede ao aceder aos dados de futebol. Tente novamente mais tarde."
+            return api_error_message(search_res)
 
-    player_stats = search_res.get("response", []) if search_res else []
-    if not player_stats:
+    players_found = search_res.get("response", []) if search_res else []
+    if not players_found:
         return f"Não encontrei estatísticas para {player_name} na época {season}."
 
     # Take first player
-    player_data = player_stats[0]
+    player_data = players_found[0]
     statistics = player_data.get("statistics", [])
     if not statistics:
         return f"Não encontrei estatísticas para {player_name} na época {season}."
 
-    # Filter statistics if requested
-    if stats_requested:
-        requested = [stats_requested] if isinstance(stats_requested, str) else stats_requested
-        filtered_stats = []
-        for stat in statistics:
-            filtered = {}
-            if "team" in stat:
-                filtered["team"] = stat["team"]
-            if "league" in stat:
-                filtered["league"] = stat["league"]
-            for req in requested:
-                parts = req.split(".")
-                value = stat
-                for p in parts:
-                    if isinstance(value, dict) and p in value:
-                        value = value[p]
-                    else:
-                        value = None
-                        break
-                filtered[req] = value
-            filtered_stats.append(filtered)
-        statistics = filtered_stats
-
+    # Exact totals are computed here; the response model only gets the requested stats
     return {
-        "player": player_name,
+        "player": player_data.get("player", {}).get("name") or player_name,
         "season": season,
         "team": team_name,
         "competition": competition,
-        "stats_requested": stats_requested,
-        "statistics": statistics
+        "stats_requested": requested,
+        "totals": player_stats.aggregate_statistics(statistics, requested),
+        "by_competition": [{"team": (stat.get("team") or {}).get("name"), "league": (stat.get("league") or {}).get("name"),
+                            **player_stats.aggregate_statistics([stat], requested)} for stat in statistics],
     }
 
 
+LEADERBOARD_DEFAULT_LIMIT = 10
+
+# API endpoints with a competition's top 20 players, used for rankings when the season table is not available
+TOP_PLAYERS_ENDPOINTS = {"goals.total": "topscorers", "goals.assists": "topassists",
+                         "cards.yellow": "topyellowcards", "cards.red": "topredcards"}
+
+
+def handle_leaderboard_intent(intent: dict):
+    """
+    Handles player rankings by a stat, in a competition or across all of them
+    ("Quem são os melhores marcadores da Liga?", "Quem fez mais assistências esta época?").
+    Served from the precomputed leaderboards of the season table (player_stats.py); without it, goals, assists
+    and cards rankings of one competition come from the API's top players endpoints.
+    Returns a dictionary with competition, season, stat and the ranked players, or a user-friendly error message.
+    """
+    stat = intent.get("stat") or "goals.total"
+    if isinstance(stat, list):
+        stat = stat[0] if stat else "goals.total"
+    competition = intent.get("competition")
+    season = get_default_season(intent.get("season"))
+    season_start = season.split("/")[0]
+    limit = intent.get("limit") if isinstance(intent.get("limit"), int) and intent.get("limit") > 0 else LEADERBOARD_DEFAULT_LIMIT
+    limit = min(limit, player_stats.LEADERBOARD_SIZE)
+
+    league_id, league_name = get_league_info_from_competition(competition)
+    if competition and not league_id:
+        return f"Não reconheço a competição {competition}."
+    if stat not in player_stats.STATS:
+        return f"Ainda não sei ordenar jogadores por {stat}."
+
+    table = player_stats.current_table()
+    if table and str(table.season) == season_start:
+        return {
+            "competition": league_name or "todas as competições",
+            "season": season,
+            "stat": stat,
+            "leaderboard": table.leaderboard(stat, league_id, limit),
+        }
+
+    endpoint = TOP_PLAYERS_ENDPOINTS.get(stat)
+    if not league_id or not endpoint:
+        return "Ainda não tenho esta classificação de jogadores disponível."
+    res = football_api.get_top_players(endpoint, league_id, int(season_start))
+    err = handle_api_error(res, f"Não encontrei a classificação de jogadores da {league_name} na época {season}.")
+    if err:
+        return err
+    leaderboard = []
+    for rank, item in enumerate(res["response"][:limit], start=1):
+        statistics = [s for s in item.get("statistics", []) if (s.get("league") or {}).get("id") == league_id]
+        leaderboard.append({
+            "rank": rank,
+            "player": item["player"]["name"],
+            "team": ", ".join(dict.fromkeys((s.get("team") or {}).get("name") for s in statistics)),
+            "value": player_stats.aggregate_statistics(statistics, [stat])[stat],
+        })
+    return {"competition": league_name, "season": season, "stat": stat, "leaderboard": leaderboard}
+
+
 def handle_coach_intent(intent: dict):
     """
     Handles the intent to retrieve coach info for a team ("Quem é o treinador do PSG?")
     or to find which team a coach manages ("Quem é que o Raul Henrique treina?").
+    Answered from the reference bundle (reference.py) when it covers the team or coach, else from the API.
     """
     team1 = intent.get("team1")
     coach_name = intent.get("coach")
 
     if team1:
-        team, err = search_team_or_error(team1)
+        ref, team, err = reference_team_or_error(team1)
         if err:
             return err
+        if ref is not None and ref.coach_name:
+            return ref.coach()
         team_id = team["id"]
         coach_res = football_api.get_coach(team_id=team_id)
         err = handle_api_error(coach_res, f"Não encontrei informações sobre o treinador do {team1}.")
@@ -476,6 +766,10 @@ def handle_coach_intent(intent: dict):
         return coach_res["response"]
     elif coach_name:
         # Which team does this coach manage?
+        bundle = reference.current_bundle()
+        found = bundle.find_coaches(coach_name) if bundle else []
+        if found:
+            return [t.coach() for t in found]
         coach_res = football_api.get_coach(search=coach_name)
         err = handle_api_error(coach_res, f"Não encontrei informações sobre o treinador {coach_name}.")
         if err:
@@ -489,9 +783,14 @@ def handle_venue_intent(intent: dict):
     """
     Handles the intent to retrieve venue (stadium) info for a team.
     Example: "Qual é a lotação do estádio do Benfica?"
+    Answered from the reference bundle (reference.py) when it covers the venue or team, else from the API.
     """
     venue_name = intent.get("venue")
     if venue_name:
+        bundle = reference.current_bundle()
+        found = bundle.find_venues(venue_name) if bundle else []
+        if found:
+            return found[0].venue()
         normalized_venue = ''.join(c for c in unicodedata.normalize('NFD', venue_name) if c.isalnum() or c.isspace()).strip()
         venue_res = football_api.get_venue(search=normalized_venue)
         err = handle_api_error(venue_res, f"Não encontrei informações sobre o estádio {venue_name}.")
@@ -503,10 +802,12 @@ def handle_venue_intent(intent: dict):
     team1 = intent.get("team1")
     if not team1:
         return "Não consegui identificar a equipa nem o estádio."
-    team, err = search_team_or_error(team1)
+    ref, team, err = reference_team_or_error(team1)
     if err:
         return err
-    venue_id = team.get("venue", {}).get("id")
+    if ref is not None and ref.venue_name:
+        return ref.venue()
+    venue_id = ref.venue_id if ref is not None else team.get("venue", {}).get("id")
     venue_res = football_api.get_venue(venue_id=venue_id)
     err = handle_api_error(venue_res, f"Não encontrei informações sobre o estádio do {team1}.")
     if err:
@@ -519,55 +820,42 @@ def handle_odds_intent(intent: dict):
     """
     Handles the intent to retrieve betting odds for a specific fixture and market.
     Example: "Qual é a odd do Benfica ganhar ao Sporting no próximo jogo?"
+    Odds are served from the odds snapshot store (odds.py): best price across all bookmakers, implied
+    probability and margin per market, plus the line movement of the requested market if it has history.
     """
     team1 = intent.get("team1")
     team2 = intent.get("team2")
     competition = intent.get("competition")
     season = get_default_season(intent.get("season"))
+    market = intent.get("market")
 
-    id1, id2, err = search_teams_or_error(team1, team2)
+    match, err = resolve_match_fixture(intent, "Não encontrei o jogo para calcular odds.")
     if err:
         return err
-
-    league_id, _ = get_league_info_from_competition(competition)
-    match_res = football_api.get_match_result(id1, id2, season.split("/")[0], league_id)
-    err = handle_api_error(match_res, "Não encontrei o jogo para calcular odds.")
-    if err:
-        return err
-    fixture_id = match_res["response"][0]["fixture"]["id"]
-    odds_res = football_api.get_fixture_odds(fixture_id)
-    err = handle_api_error(odds_res, "Não encontrei odds para o jogo.")
-    if err:
-        return err
-    SELECTED_MARKETS = {
-        "Match Winner",
-        "Double Chance",
-        "Goals Over/Under",
-        "Both Teams Score",
-        "Asian Handicap"
-    }
-    filtered_odds = []
-    bookmaker_count = 0
-    for bookmaker in odds_res["response"]:
-        for bet in bookmaker.get("bookmakers", []):
-            if bookmaker_count >= 3:
-                break
-            for bet_type in bet.get("bets", []):
-                if bet_type.get("name") in SELECTED_MARKETS:
-                    filtered_odds.append({
-                        "bookmaker": bet.get("name"),
-                        "market": bet_type.get("name"),
-                        "values": bet_type.get("values", [])
-                    })
-            if filtered_odds:
-                bookmaker_count += 1
-    all_odds = filtered_odds
+    fixture = match["fixture"]
+    fixture_id = fixture["id"]
+
+    markets = [market] if market in odds.SELECTED_MARKETS else None
+    odds_summary = odds.get_odds_summary(fixture_id, fixture.get("timestamp"), markets)
+    if "error" in odds_summary:
+        return api_error_message(odds_summary)
+    all_odds = {m: summary for m, summary in odds_summary["markets"].items() if summary["outcomes"]}
     if not all_odds:
         return "Não encontrei odds relevantes para o jogo ou mercado pedido."
-    return {
+
+    result = {
         "team1": team1,
         "team2": team2,
         "competition": competition,
         "season": season,
+        "updated_at": datetime.fromtimestamp(odds_summary["updated_at"]).strftime("%Y-%m-%d %H:%M"),
         "odds": all_odds
     }
+    if markets:
+        movement = odds.line_movement(fixture_id, market)
+        if len(movement) > 1:
+            result["line_movement"] = [
+                {"time": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M"), "best_odds": best_odds}
+                for ts, best_odds in movement
+            ]
+    return result
@@ -0,0 +1,178 @@
+import time
+import logging
+import threading
+import cache_backends
+import football_api
+import scheduler
+
+# Live-match event tracker shared by every user of the process, and through the cache backend by every worker.
+# Each in-progress fixture is polled at most once per POLL_INTERVAL_SECONDS, whatever the number of
+# questions about it, and all due fixtures are polled together in one /fixtures?ids= request.
+# The API returns the whole event list of a fixture on every poll and amends events already reported (a player
+# filled in, a goal cancelled by VAR, a corrected minute), so each poll replaces the fixture's events.
+# Every poll is also stored on the cache backend ("live:<fixture id>"), and a worker whose copy is out of date
+# reads it from there before polling: with --workers N and the background poller in one worker only, upstream
+# traffic still grows with live fixtures, not with questions or workers.
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = 15
+
+# Fixtures no longer asked about are dropped after this long
+IDLE_EVICT_SECONDS = 3 * 3600
+
+# Upper bound on tracked fixtures (the least recently read ones are dropped first)
+MAX_TRACKED_FIXTURES = 500
+
+# How long a shared poll is kept on the cache backend
+SHARED_SNAPSHOT_SECONDS = 10 * POLL_INTERVAL_SECONDS
+
+
+class LiveFixture:
+    """
+    Latest event list and polling state of one fixture.
+    """
+    __slots__ = ("fixture_id", "events", "status", "last_poll", "last_read")
+
+    def __init__(self, fixture_id: int):
+        self.fixture_id = fixture_id
+        self.events = []
+        self.status = None
+        self.last_poll = 0.0          # time.time() of the poll the data comes from (any worker's)
+        self.last_read = time.monotonic()
+
+    def apply(self, fixture: dict, polled_at: float):
+        """
+        Replaces events and status with those of a fixture polled at `polled_at` (unless older than ours).
+        """
+        if polled_at <= self.last_poll:
+            return
+        self.status = fixture["fixture"].get("status", {}).get("short")
+        self.events = list(fixture.get("events") or [])
+        self.last_poll = polled_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in football_api.FINISHED_STATUSES
+
+
+class LiveTracker:
+    """
+    Polls tracked fixtures in batches and serves their event logs from memory.
+    """
+
+    def __init__(self, interval: float = POLL_INTERVAL_SECONDS, cache: cache_backends.Cache = None):
+        self.interval = interval
+        self._cache = cache or cache_backends.default_cache()
+        self._cache.register_serializer("live", cache_backends.JsonSerializer())
+        self._fixtures = {}
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.polls = 0
+
+    def _get_or_track(self, fixture_id: int) -> LiveFixture:
+        with self._lock:
+            live = self._fixtures.get(fixture_id)
+            if live is None:
+                if len(self._fixtures) >= MAX_TRACKED_FIXTURES:
+                    oldest = min(self._fixtures.values(), key=lambda f: f.last_read)
+                    del self._fixtures[oldest.fixture_id]
+                live = self._fixtures[fixture_id] = LiveFixture(fixture_id)
+            live.last_read = time.monotonic()
+            return live
+
+    def _due(self) -> list:
+        now = time.time()
+        with self._lock:
+            return [f.fixture_id for f in self._fixtures.values() if not f.finished and now - f.last_poll >= self.interval]
+
+    def _load_shared(self, fixture_ids):
+        """
+        Takes the polls other workers stored for these fixtures, when newer than ours.
+        """
+        shared = self._cache.get_many([f"live:{fixture_id}" for fixture_id in fixture_ids])
+        with self._lock:
+            for snapshot in shared.values():
+                live = self._fixtures.get(snapshot["fixture"]["fixture"]["id"])
+                if live is not None:
+                    live.apply(snapshot["fixture"], snapshot["polled_at"])
+
+    def poll_due(self):
+        """
+        Polls, in one batch request, every tracked unfinished fixture whose data is older than the interval
+        and was not polled recently by another worker. Only one poll runs at a time; concurrent callers wait for it.
+        Returns the error of the batch request, or None.
+        """
+        with self._poll_lock:
+            due = self._due()
+            if due:
+                self._load_shared(due)
+                due = self._due()
+            if not due:
+                return None
+            details = football_api.get_fixtures_details(due, refresh=True)
+            self.polls += 1
+            polled_at = time.time()
+            with self._lock:
+                for fixture in details["response"]:
+                    live = self._fixtures.get(fixture["fixture"]["id"])
+                    if live is not None:
+                        live.apply(fixture, polled_at)
+            self._cache.set_many({f"live:{fixture['fixture']['id']}": {"polled_at": polled_at, "fixture": fixture}
+                                  for fixture in details["response"]}, expire=SHARED_SNAPSHOT_SECONDS)
+            return details.get("error")
+
+    def events(self, fixture_id: int):
+        """
+        Returns (events, status, error) for a fixture.
+        The fixture is tracked from its first read; a synchronous poll only happens when its data is
+        older than the interval and neither a background poller nor another worker refreshed it.
+        """
+        live = self._get_or_track(fixture_id)
+        error = None
+        if not live.finished and time.time() - live.last_poll >= self.interval:
+            error = self.poll_due()
+        with self._lock:
+            return list(live.events), live.status, error if live.last_poll == 0.0 else None
+
+    def evict_idle(self):
+        """
+        Drops fixtures that nobody has read for IDLE_EVICT_SECONDS.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for fixture_id in [i for i, f in self._fixtures.items() if now - f.last_read > IDLE_EVICT_SECONDS]:
+                del self._fixtures[fixture_id]
+
+    def run(self):
+        """
+        Background loop: poll every due live fixture each interval, so readers never wait on the API.
+        """
+        while not self._stop.is_set():
+            try:
+                with scheduler.priority(scheduler.PRIORITY_PREFETCH):
+                    self.poll_due()
+                self.evict_idle()
+            except Exception:
+                logger.exception("live tracker: poll failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """
+        Starts the background poller thread and returns it.
+        """
+        self._thread = threading.Thread(target=self.run, name="live-tracker", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """
+        Stops the background poller thread.
+        """
+        self._stop.set()
+
+
+# Process-wide tracker used by the handlers
+tracker = LiveTracker()
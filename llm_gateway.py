@@ -0,0 +1,297 @@
+import os
+import time
+import random
+import hashlib
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import circuit_breaker
+import deadline
+import tracing
+import transport
+
+# LLM gateway: every chat model call (intent extraction and answer generation in main.py) goes through
+# chat_completion, which adds to the bare client call:
+#   - a timeout capped by the request deadline, and the chat circuit breaker;
+#   - retries of transient errors (connection, timeout, 429, 5xx) with jittered exponential backoff, while
+#     the deadline allows (the SDK's own retries are turned off so the two do not multiply);
+#   - hedging: if no answer came after LLM_HEDGE_AFTER_SECONDS, a duplicate request is sent and the first
+#     answer wins. Chat calls run at temperature 0, so duplicates are interchangeable; this cuts the tail
+#     latency of the slowest few percent of calls at the price of their tokens;
+#   - accounting: tokens (prompt, cached prompt, completion), latency and cost per call, as tracing spans and
+#     counters, and per request (request_usage), written to the pipeline trace.
+#
+# Prompts are built with prompt_messages: the static instructions form the system message and everything that
+# changes per request (date, season, conversation context, user query, data) goes in the user message at
+# the end. The provider caches prompt prefixes (OpenAI: prompts of 1024+ tokens, cached tokens billed at half
+# price and served faster), so any volatile value early in the prompt would disable the cache for the rest.
+#
+# The openai SDK takes about a second to import, so it is only imported when the client is first needed
+# (get_client); `sos`/`sair` in the REPL and worker start-up do not wait for it. Its error classes are
+# available as llm_gateway.APIError etc. for except clauses, resolved on first access.
+
+load_dotenv()
+
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = 0.25
+
+# Send a duplicate request when a call has not answered after this long (0 disables hedging)
+LLM_HEDGE_AFTER_SECONDS = float(os.environ.get("LLM_HEDGE_AFTER_SECONDS", "3"))
+
+# A retry or hedge is only started if at least this much time is left for it
+MIN_ATTEMPT_SECONDS = 1
+
+DEFAULT_TIMEOUT_SECONDS = 8
+
+# USD per 1M tokens: (input, cached input, output)
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "text-embedding-3-small": (0.02, 0.02, 0.0),
+}
+
+# SDK errors worth retrying: connection errors, timeouts, 429 and 5xx
+RETRYABLE_ERRORS = ("APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError")
+
+_client = None
+_client_lock = threading.Lock()
+
+_hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+_request_usage = contextvars.ContextVar("llm_request_usage", default=None)
+
+
+def get_client():
+    """
+    Returns the OpenAI client shared by the chat and embeddings calls, importing the SDK and building it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+    return _client
+
+
+def preload() -> threading.Thread:
+    """
+    Builds the client in a background thread (e.g. while the REPL waits for the first question) and returns the thread.
+    """
+    thread = threading.Thread(target=get_client, name="llm-preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def __getattr__(name: str):
+    # llm_gateway.client and the SDK error classes (llm_gateway.APIError, ...), resolved on first access
+    if name == "client":
+        return get_client()
+    if name == "APIError" or name in RETRYABLE_ERRORS:
+        import openai
+        return getattr(openai, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class Usage:
+    """
+    LLM usage of one request.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.seconds = 0.0
+        self.retries = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def add(self, prompt_tokens: int = 0, cached_tokens: int = 0, completion_tokens: int = 0, cost_usd: float = 0.0,
+            seconds: float = 0.0, calls: int = 0, retries: int = 0, hedges: int = 0):
+        with self._lock:
+            self.calls += calls
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+            self.completion_tokens += completion_tokens
+            self.cost_usd += cost_usd
+            self.seconds += seconds
+            self.retries += retries
+            self.hedges += hedges
+
+    def as_dict(self) -> dict:
+        return {"llm_calls": self.calls, "llm_prompt_tokens": self.prompt_tokens, "llm_cached_tokens": self.cached_tokens,
+                "llm_completion_tokens": self.completion_tokens, "llm_cost_usd": round(self.cost_usd, 6),
+                "llm_seconds": round(self.seconds, 4), "llm_retries": self.retries, "llm_hedges": self.hedges}
+
+
+@contextmanager
+def request_usage():
+    """
+    Accounts the LLM calls made inside the block (worker threads included, when submitted with
+    contextvars.copy_context) to one Usage, yielded, and adds it to the current trace span on exit.
+    """
+    usage = Usage()
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+        tracing.annotate(**usage.as_dict())
+
+
+def price(model: str):
+    """
+    (input, cached input, output) USD per 1M tokens of a model; dated snapshots ("gpt-4o-mini-2024-07-18")
+    use the price of their family.
+    """
+    for name in sorted(PRICES, key=len, reverse=True):
+        if (model or "").startswith(name):
+            return PRICES[name]
+    return None
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int = 0, cached_tokens: int = 0) -> float:
+    prices = price(model)
+    if prices is None:
+        return 0.0
+    return ((prompt_tokens - cached_tokens) * prices[0] + cached_tokens * prices[1] + completion_tokens * prices[2]) / 1e6
+
+
+def record_usage(call: str, model: str, usage, seconds: float = 0.0, span=None) -> float:
+    """
+    Accounts one finished model call (usage is the SDK usage object, or None): tracing counters, the
+    current request's Usage and the span attributes. Returns its cost in USD.
+    """
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    cost = cost_usd(model, prompt, completion, cached)
+    tracing.count("llm_tokens_total", prompt, call=call, kind="prompt")
+    if cached:
+        tracing.count("llm_tokens_total", cached, call=call, kind="cached")
+    if completion:
+        tracing.count("llm_tokens_total", completion, call=call, kind="completion")
+    tracing.count("llm_cost_usd_total", cost, call=call)
+    if span is not None:
+        span.set(prompt_tokens=prompt, cached_tokens=cached, completion_tokens=completion, cost_usd=round(cost, 6))
+    current = _request_usage.get()
+    if current is not None:
+        current.add(prompt, cached, completion, cost, seconds, calls=1)
+    return cost
+
+
+def prompt_messages(static_prefix: str, volatile: str) -> list:
+    """
+    Chat messages with the static, cacheable instructions first (system) and the per-request values last (user).
+    """
+    return [{"role": "system", "content": static_prefix}, {"role": "user", "content": volatile}]
+
+
+def prefix_id(static_prefix: str) -> str:
+    """
+    Short id of a static prompt, for cache keys that must change whenever the prompt does.
+    """
+    return hashlib.blake2b(static_prefix.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _single_call(call: str, timeout: float, kwargs: dict, hedge: bool = False):
+    """
+    One chat request through transport.py, traced and accounted.
+    """
+    from openai import APIError
+    from openai.types.chat import ChatCompletion
+    start = time.perf_counter()
+    with tracing.span("openai", endpoint="chat", model=kwargs.get("model"), call=call, hedge=hedge) as span:
+        try:
+            response = transport.model_call("openai", "chat", get_client().with_options(max_retries=0).chat.completions.create,
+                                            ChatCompletion, timeout=timeout, **kwargs)
+        except transport.CassetteMiss as e:
+            raise APIError(str(e), request=None, body=None) from e
+        record_usage(call, getattr(response, "model", None) or kwargs.get("model"), getattr(response, "usage", None),
+                     time.perf_counter() - start, span)
+    return response
+
+
+def _hedged_call(call: str, timeout: float, kwargs: dict):
+    """
+    Runs the request and, if it has not answered after LLM_HEDGE_AFTER_SECONDS, a duplicate; returns the
+    first successful answer (the other one finishes in the background and is only accounted).
+    Hedging is skipped while recording or replaying cassettes, so they stay one interaction per call.
+    """
+    hedge_after = LLM_HEDGE_AFTER_SECONDS
+    if hedge_after <= 0 or transport.mode() != "passthrough" or timeout - hedge_after < MIN_ATTEMPT_SECONDS:
+        return _single_call(call, timeout, kwargs)
+    first = _hedge_executor.submit(contextvars.copy_context().run, _single_call, call, timeout, kwargs)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+    tracing.count("llm_hedges_total", call=call)
+    current = _request_usage.get()
+    if current is not None:
+        current.add(hedges=1)
+    second = _hedge_executor.submit(contextvars.copy_context().run, _single_call, call, timeout - hedge_after, kwargs, True)
+    pending = {first, second}
+    error = None
+    while pending:
+        # Both requests carry their own timeout, so this wait is bounded too
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def chat_completion(call: str = "chat", timeout: float = DEFAULT_TIMEOUT_SECONDS, **kwargs):
+    """
+    Calls the chat model (kwargs as for client.chat.completions.create) with a deadline-aware timeout,
+    the chat circuit breaker, retries and hedging. `call` names the call site in metrics ("intent", "response").
+    Raises deadline.DeadlineExceeded / circuit_breaker.CircuitOpenError instead of waiting on a degraded service,
+    and the last error once retries are exhausted.
+    """
+    import openai
+    retryable = tuple(getattr(openai, name) for name in RETRYABLE_ERRORS)
+    circuit = circuit_breaker.breaker("openai:chat")
+    attempt = 0
+    while True:
+        if not circuit.allow():
+            raise circuit_breaker.CircuitOpenError("openai:chat")
+        try:
+            attempt_timeout = deadline.timeout_for(timeout)
+        except deadline.DeadlineExceeded:
+            circuit.release()
+            raise
+        try:
+            response = _hedged_call(call, attempt_timeout, kwargs)
+        except retryable as e:
+            # A timeout the request deadline cut short is not counted against the service
+            circuit.record_error(e, cut_short=attempt_timeout < timeout)
+            backoff = LLM_RETRY_BACKOFF_SECONDS * 2 ** attempt * random.uniform(0.5, 1.5)
+            left = deadline.remaining()
+            if attempt >= LLM_MAX_RETRIES or (left is not None and left < backoff + MIN_ATTEMPT_SECONDS):
+                raise
+            attempt += 1
+            tracing.count("llm_retries_total", call=call)
+            current = _request_usage.get()
+            if current is not None:
+                current.add(retries=1)
+            time.sleep(backoff)
+            continue
+        except openai.APIError as e:
+            # Replay misses are not a service failure
+            if isinstance(e.__cause__, transport.CassetteMiss):
+                circuit.release()
+            else:
+                circuit.record_error(e, cut_short=attempt_timeout < timeout)
+            raise
+        except Exception as e:
+            circuit.record_error(e, cut_short=attempt_timeout < timeout)
+            raise
+        circuit.record_success()
+        return response
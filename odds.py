@@ -0,0 +1,223 @@
+import time
+import cache_backends
+import football_api
+
+# Odds snapshot store.
+# /odds returns every bookmaker and market for a fixture. Here each fetch is reduced right away to
+# the SELECTED_MARKETS as {market: {outcome: {bookmaker: odd}}} and stored as a timestamped snapshot
+# in the football_api cache, together with the best price, implied probability and bookmaker margin of
+# every market (computed on an outcomes x bookmakers NumPy matrix). Odds questions are answered from the
+# latest fresh snapshot, and the list of snapshots gives the line movement before kick-off.
+# Snapshots are appended without a read-modify-write, since every worker and node shares the history: an
+# atomic counter on the cache backend ("odds:<fixture_id>") numbers them, and snapshot n is stored under
+# "odds:<fixture_id>:<n % MAX_SNAPSHOTS>", a ring of the latest MAX_SNAPSHOTS.
+
+# Markets kept in snapshots, with their API-Football bet ids (used to filter /odds server-side)
+SELECTED_MARKETS = {
+    "Match Winner": 1,
+    "Asian Handicap": 4,
+    "Goals Over/Under": 5,
+    "Both Teams Score": 8,
+    "Double Chance": 12,
+}
+
+# Snapshots kept per fixture (oldest dropped first)
+MAX_SNAPSHOTS = 48
+
+# How long the snapshot history is kept after the last update
+HISTORY_TTL_SECONDS = 14 * 24 * 3600
+
+_cache = cache_backends.default_cache()
+
+
+def snapshot_ttl(kickoff_ts, now=None) -> int:
+    """
+    Returns how long a snapshot stays fresh: odds move faster as kick-off approaches.
+    """
+    now = now or time.time()
+    if kickoff_ts is None:
+        return 600
+    to_kickoff = kickoff_ts - now
+    if to_kickoff > 24 * 3600:
+        return 3600
+    if to_kickoff > 3 * 3600:
+        return 900
+    if to_kickoff > 0:
+        return 120
+    # Pre-match odds are frozen once the match starts
+    return 3600
+
+
+def compact_odds(odds_res, markets=None) -> dict:
+    """
+    Reduces an /odds response to {market: {outcome: {bookmaker: odd}}} for the selected markets.
+    """
+    markets = set(markets or SELECTED_MARKETS)
+    compact = {}
+    for entry in odds_res.get("response", []):
+        for bookmaker in entry.get("bookmakers", []):
+            name = bookmaker.get("name")
+            for bet in bookmaker.get("bets", []):
+                market = bet.get("name")
+                if market not in markets:
+                    continue
+                outcomes = compact.setdefault(market, {})
+                for value in bet.get("values", []):
+                    try:
+                        odd = float(value.get("odd"))
+                    except (TypeError, ValueError):
+                        continue
+                    outcomes.setdefault(str(value.get("value")), {})[name] = odd
+    return compact
+
+
+def _line_of(outcome: str) -> str:
+    """
+    Returns the line an outcome belongs to ("Over 2.5" and "Under 2.5" -> "2.5"), or "" for 1X2-style markets.
+    """
+    last = outcome.rsplit(" ", 1)[-1].lstrip("+-")
+    try:
+        float(last)
+    except ValueError:
+        return ""
+    return last
+
+
+def summarize_market(outcomes: dict) -> dict:
+    """
+    Computes best price, implied probability and margins for one market on an outcomes x bookmakers matrix.
+    - best_odd / bookmaker / implied_probability per outcome (implied probability of the best price).
+    - margin per line: average bookmaker overround (sum of 1/odd - 1) over bookmakers quoting every outcome.
+    - best_price_margin per line: overround of the best prices (negative means an arbitrage).
+    """
+    import numpy as np
+    names = [outcome for outcome, prices in outcomes.items() if prices]
+    if not names:
+        return {"outcomes": {}, "margins": {}}
+    bookmakers = list(dict.fromkeys(b for outcome in names for b in outcomes[outcome]))
+    column = {b: n for n, b in enumerate(bookmakers)}
+    odds = np.full((len(names), len(bookmakers)), np.nan)
+    position = np.full(odds.shape, np.inf)     # order of the bookmaker among the outcome's prices
+    for row, outcome in enumerate(names):
+        for n, (bookmaker, odd) in enumerate(outcomes[outcome].items()):
+            odds[row, column[bookmaker]] = odd
+            position[row, column[bookmaker]] = n
+    inverse = 1 / odds
+    best_odds = np.nanmax(odds, axis=1)
+    # Ties go to the bookmaker listed first for the outcome
+    best_col = np.where(odds == best_odds[:, None], position, np.inf).argmin(axis=1)
+
+    best, lines = {}, {}
+    for row, outcome in enumerate(names):
+        odd = float(best_odds[row])
+        best[outcome] = {"best_odd": odd, "bookmaker": bookmakers[best_col[row]], "implied_probability": round(1 / odd, 4)}
+        lines.setdefault(_line_of(outcome), []).append(row)
+
+    margins = {}
+    for line, rows in lines.items():
+        # Asian Handicap lines can mix several handicaps under the same absolute value; skip those
+        if len(rows) < 2 or (line and len(rows) > 2):
+            continue
+        book_margins = inverse[rows].sum(axis=0) - 1     # NaN for bookmakers missing an outcome
+        quoted = book_margins[~np.isnan(book_margins)]
+        margins[line or "all"] = {
+            "margin": round(float(quoted.mean()), 4) if quoted.size else None,
+            "best_price_margin": round(float((1 / best_odds[rows]).sum()) - 1, 4),
+        }
+    return {"outcomes": best, "margins": margins}
+
+
+def _load_history(fixture_id: int) -> dict:
+    """
+    Returns the stored snapshot history of a fixture ({"snapshots": [...]}, oldest first), in two round trips.
+    """
+    last = _cache.counter(f"odds:{fixture_id}")
+    slots = {f"odds:{fixture_id}:{n % MAX_SNAPSHOTS}": n for n in range(max(1, last - MAX_SNAPSHOTS + 1), last + 1)}
+    # "odds:<fixture_id>" also holds histories stored in one entry before snapshots got their own keys
+    legacy_key = f"odds:{fixture_id}"
+    found = football_api.cache_get_many([legacy_key, *slots], allow_stale=True)
+    snapshots = list((found.get(legacy_key) or {}).get("snapshots", []))
+    # A slot already overwritten by a newer snapshot (a concurrent append) holds another number
+    snapshots += [found[key] for key, n in slots.items() if key in found and found[key].get("n") == n]
+    return {"snapshots": snapshots[-MAX_SNAPSHOTS:]}
+
+
+def take_snapshot(fixture_id: int, markets=None) -> dict:
+    """
+    Fetches odds (filtered server-side when a single market is requested), compacts them and
+    appends a snapshot to the fixture's history (numbered "n"). Returns the snapshot, or {"error": ...}.
+    """
+    markets = [m for m in (markets or SELECTED_MARKETS) if m in SELECTED_MARKETS]
+    bet_id = SELECTED_MARKETS[markets[0]] if len(markets) == 1 else None
+    odds_res = football_api.get_fixture_odds(fixture_id, bet_id=bet_id)
+    if "error" in odds_res:
+        return {"error": odds_res["error"], "rate_limited": odds_res.get("rate_limited", False)}
+    compact = compact_odds(odds_res, markets)
+    snapshot = {
+        "ts": time.time(),
+        "requested": markets,
+        "markets": compact,
+        "summary": {market: summarize_market(outcomes) for market, outcomes in compact.items()},
+    }
+    n = _cache.incr(f"odds:{fixture_id}")
+    if n is not None:
+        snapshot["n"] = n
+        football_api.cache_set(f"odds:{fixture_id}:{n % MAX_SNAPSHOTS}", snapshot, HISTORY_TTL_SECONDS)
+    return snapshot
+
+
+def latest_snapshot(fixture_id: int, market: str, history: dict = None):
+    """
+    Returns the most recent stored snapshot that fetched the market (even if no bookmaker offered it), or None.
+    """
+    history = history or _load_history(fixture_id)
+    for snapshot in reversed(history["snapshots"]):
+        if market in snapshot["requested"]:
+            return snapshot
+    return None
+
+
+def get_odds_summary(fixture_id: int, kickoff_ts: int = None, markets=None):
+    """
+    Returns {"updated_at": ts, "markets": {market: summary}} for the requested markets (all selected ones by default),
+    served from fresh snapshots and refreshing only the markets whose snapshot is stale.
+    On fetch failure, stale snapshots are used; returns {"error": ...} only if there is nothing to serve.
+    """
+    markets = [m for m in (markets or SELECTED_MARKETS) if m in SELECTED_MARKETS]
+    ttl = snapshot_ttl(kickoff_ts)
+    now = time.time()
+    history = _load_history(fixture_id)
+    stale = []
+    for market in markets:
+        snapshot = latest_snapshot(fixture_id, market, history)
+        if not snapshot or now - snapshot["ts"] > ttl:
+            stale.append(market)
+    error = None
+    if stale:
+        taken = take_snapshot(fixture_id, stale)
+        if "error" in taken:
+            error = taken
+        else:
+            history["snapshots"].append(taken)
+
+    summary, updated_at = {}, None
+    for market in markets:
+        snapshot = latest_snapshot(fixture_id, market, history)
+        if snapshot and market in snapshot["summary"]:
+            summary[market] = snapshot["summary"][market]
+            updated_at = max(updated_at or 0, snapshot["ts"])
+    if not summary and error:
+        return error
+    return {"updated_at": updated_at, "markets": summary}
+
+
+def line_movement(fixture_id: int, market: str):
+    """
+    Returns [(ts, {outcome: best_odd})] for the market across all stored snapshots, oldest first.
+    """
+    movement = []
+    for snapshot in _load_history(fixture_id)["snapshots"]:
+        summary = snapshot["summary"].get(market)
+        if summary:
+            movement.append((snapshot["ts"], {o: v["best_odd"] for o, v in summary["outcomes"].items()}))
+    return movement
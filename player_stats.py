@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import time
+import array
+import logging
+import argparse
+import threading
+import unicodedata
+import football_api
+import scheduler
+from warmup import current_season_year
+
+# Season player statistics table and leaderboards.
+# API-Football gives a player's season statistics as one entry per team and competition; the response model
+# used to receive all of them and do the sums itself. This module keeps the statistics of every player of the
+# football_api.LEAGUES competitions in memory, as columns of array.array (one row per player, team and
+# competition; indexes as 32-bit "i", values as "d"), and computes from them:
+#   - exact per-player totals across competitions (aggregate_statistics, also used on raw API answers);
+#   - top-k leaderboards per competition and across all of them, precomputed when the table is loaded,
+#     for questions such as "melhores marcadores da Liga". The column scans run in NumPy (bincount over
+#     zero-copy views of the columns), imported on first use.
+#
+# The table is built by a refresh job (`python player_stats.py`, e.g. daily from cron) from the paged
+# /players?league&season endpoint (20 players per page, each page cached for a day by football_api), at
+# warm-up priority through the quota scheduler. If any page cannot be fetched the build fails and the previous
+# table is kept, so leaderboards never silently miss players; a rerun only fetches the missing pages.
+# It is stored in PLAYER_STATS_FILE as a JSON header line (season, players, teams, competitions) followed by
+# the raw bytes of the columns, so loading is a few array.frombytes calls; every process reloads the file
+# when a refresh replaces it.
+
+logger = logging.getLogger(__name__)
+
+PLAYER_STATS_FILE = os.environ.get("PLAYER_STATS_FILE", "player_stats.bin")
+
+# Stats answered from the table (the ones intent extraction can ask for)
+STATS = ("goals.total", "goals.assists", "games.appearences", "games.minutes", "shots.on", "passes.key",
+         "passes.accuracy", "dribbles.success", "cards.yellow", "cards.red")
+
+# Stats that are averages, aggregated across competitions weighted by another column
+WEIGHTED_STATS = {"passes.accuracy": "passes.total"}
+
+COLUMNS = STATS + tuple(w for w in WEIGHTED_STATS.values() if w not in STATS)
+
+# Players kept per leaderboard
+LEADERBOARD_SIZE = 50
+
+# Averages only rank players with at least this many minutes
+MIN_MINUTES_FOR_AVERAGES = 450
+
+# How often a process checks whether the table file was replaced
+RELOAD_CHECK_SECONDS = 60
+
+FORMAT_VERSION = 2
+
+# Type code of the row index arrays (fixed 4-byte items, unlike "l")
+INDEX_TYPECODE = "i"
+
+LEAGUE_NAMES = {league["id"]: league["name"] for league in football_api.LEAGUES.values()}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a player name for lookups (case, accents, punctuation, whitespace).
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+def stat_value(stat: dict, path: str) -> float:
+    """
+    Value of a dotted stat path ("goals.total") in one API statistics entry; missing or null values count as 0.
+    """
+    value = stat
+    for part in path.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _combine(totals: dict, stats) -> dict:
+    """
+    Turns summed columns into stat values: weighted averages are divided by their weight, counts become ints.
+    """
+    result = {}
+    for stat in stats:
+        if stat in WEIGHTED_STATS:
+            weight = totals.get(WEIGHTED_STATS[stat], 0.0)
+            result[stat] = round(totals.get(stat, 0.0) / weight, 1) if weight else None
+        else:
+            result[stat] = int(totals.get(stat, 0.0))
+    return result
+
+
+def aggregate_statistics(statistics: list, stats=STATS) -> dict:
+    """
+    Exact totals of the given stats over a list of API statistics entries (one per team/competition).
+    """
+    columns = set(stats) | {WEIGHTED_STATS[stat] for stat in stats if stat in WEIGHTED_STATS}
+    totals = dict.fromkeys(columns, 0.0)
+    for entry in statistics:
+        for column in columns:
+            value = stat_value(entry, column)
+            if column in WEIGHTED_STATS:
+                value *= stat_value(entry, WEIGHTED_STATS[column])
+            totals[column] += value
+    return _combine(totals, stats)
+
+
+class SeasonTable:
+    """
+    Player statistics of one season: per-row columns, per-player row lists, name index and leaderboards.
+    """
+
+    def __init__(self, season: int, players: list, teams: list, leagues: list, row_player, row_team, row_league,
+                 columns: dict, built_at: float = None):
+        self.season = season
+        self.built_at = built_at
+        self.players = players          # [[player id, name, firstname, lastname]]
+        self.teams = teams              # [[team id, name]]
+        self.leagues = leagues          # [league id]
+        self.row_player = row_player    # array("i"): row -> index in players
+        self.row_team = row_team        # array("i"): row -> index in teams
+        self.row_league = row_league    # array("i"): row -> index in leagues
+        self.columns = columns          # column -> array("d"); weighted stats hold value * weight
+        self.by_player_id = {p[0]: n for n, p in enumerate(players)}
+        self.rows_of = [[] for _ in players]
+        for row, player in enumerate(row_player):
+            self.rows_of[player].append(row)
+        self.by_name = {}
+        for n, (_, name, firstname, lastname) in enumerate(players):
+            for key in {normalize_name(name), normalize_name(f"{firstname or ''} {lastname or ''}")}:
+                if key:
+                    self.by_name.setdefault(key, []).append(n)
+        self.leaderboards = {}
+        for league in (None, *leagues):
+            totals = self._totals(league)
+            for stat in STATS:
+                self.leaderboards[(league, stat)] = self._rank(totals, stat)
+
+    def __len__(self):
+        return len(self.players)
+
+    def _totals(self, league_id: int = None) -> dict:
+        """
+        Per-player column sums (NumPy arrays) over all rows, or the rows of one competition.
+        """
+        import numpy as np
+        row_player = np.frombuffer(self.row_player, dtype=np.int32)
+        included = None
+        if league_id is not None:
+            included = np.frombuffer(self.row_league, dtype=np.int32) == self.leagues.index(league_id)
+            row_player = row_player[included]
+        totals = {}
+        for column in COLUMNS:
+            values = np.frombuffer(self.columns[column], dtype=np.float64)
+            totals[column] = np.bincount(row_player, weights=values if included is None else values[included],
+                                         minlength=len(self.players))
+        return totals
+
+    def _rank(self, totals: dict, stat: str) -> list:
+        """
+        Top LEADERBOARD_SIZE (player index, value) for a stat, ties broken by fewer minutes.
+        """
+        import numpy as np
+        minutes = totals["games.minutes"]
+        if stat in WEIGHTED_STATS:
+            weight = totals[WEIGHTED_STATS[stat]]
+            values = np.divide(totals[stat], weight, out=np.zeros_like(weight), where=weight != 0)
+            candidates = np.flatnonzero((minutes >= MIN_MINUTES_FOR_AVERAGES) & (weight != 0))
+        else:
+            values = totals[stat]
+            candidates = np.flatnonzero(values > 0)
+        # Highest value first, then fewest minutes
+        top = candidates[np.lexsort((minutes[candidates], -values[candidates]))][:LEADERBOARD_SIZE]
+        return [(int(n), float(values[n])) for n in top]
+
+    def find_players(self, name: str) -> list:
+        """
+        Player indexes matching a name (full name, or first and last name; a single word matches last names).
+        """
+        key = normalize_name(name or "")
+        if not key:
+            return []
+        if key in self.by_name or " " in key:
+            return self.by_name.get(key, [])
+        return sorted({n for k, found in self.by_name.items() if k.split()[-1] == key for n in found})
+
+    def player_summary(self, index: int, stats=STATS, league_id: int = None) -> dict:
+        """
+        A player's totals across competitions (or in one) and the per-team/competition breakdown.
+        """
+        player_id, name, _, _ = self.players[index]
+        rows = [r for r in self.rows_of[index] if league_id is None or self.leagues[self.row_league[r]] == league_id]
+        breakdown = []
+        totals = dict.fromkeys(COLUMNS, 0.0)
+        for row in rows:
+            values = {column: self.columns[column][row] for column in COLUMNS}
+            for column, value in values.items():
+                totals[column] += value
+            breakdown.append({"team": self.teams[self.row_team[row]][1],
+                              "league": LEAGUE_NAMES.get(self.leagues[self.row_league[row]]), **_combine(values, stats)})
+        return {"player": name, "player_id": player_id, "totals": _combine(totals, stats), "by_competition": breakdown}
+
+    def leaderboard(self, stat: str, league_id: int = None, limit: int = 10) -> list:
+        """
+        [{"rank", "player", "team", "value"}] from the precomputed leaderboards.
+        """
+        ranked = self.leaderboards.get((league_id, stat), [])[:limit]
+        result = []
+        for rank, (n, value) in enumerate(ranked, start=1):
+            teams = dict.fromkeys(self.teams[self.row_team[r]][1] for r in self.rows_of[n])
+            result.append({"rank": rank, "player": self.players[n][1], "team": ", ".join(teams),
+                           "value": round(value, 1) if stat in WEIGHTED_STATS else int(value)})
+        return result
+
+    def save(self, path: str):
+        """
+        Writes the table atomically: JSON header line, then the raw bytes of the row arrays and columns.
+        """
+        header = {"version": FORMAT_VERSION, "season": self.season, "built_at": self.built_at,
+                  "columns": list(COLUMNS), "rows": len(self.row_player),
+                  "players": self.players, "teams": self.teams, "leagues": self.leagues}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+            for arr in (self.row_player, self.row_team, self.row_league, *(self.columns[c] for c in COLUMNS)):
+                f.write(arr.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("version") != FORMAT_VERSION or header.get("columns") != list(COLUMNS):
+                raise ValueError("unsupported player stats table format")
+            n = header["rows"]
+            arrays = []
+            for typecode in (INDEX_TYPECODE,) * 3 + ("d",) * len(COLUMNS):
+                arr = array.array(typecode)
+                arr.fromfile(f, n)
+                arrays.append(arr)
+        return cls(header["season"], header["players"], header["teams"], header["leagues"], *arrays[:3],
+                   dict(zip(COLUMNS, arrays[3:])), header.get("built_at"))
+
+
+def build_table(season: int = None) -> SeasonTable:
+    """
+    Fetches every page of /players for each LEAGUES competition and returns the season table.
+    Raises RuntimeError if a page could not be fetched (the table would be missing players).
+    """
+    season = season or current_season_year()
+    players, teams, leagues = [], [], []
+    player_index, team_index, seen = {}, {}, set()
+    row_player, row_team, row_league = (array.array(INDEX_TYPECODE) for _ in range(3))
+    columns = {column: array.array("d") for column in COLUMNS}
+    failed = []
+    with scheduler.priority(scheduler.PRIORITY_WARMUP):
+        for league in football_api.LEAGUES.values():
+            page, pages = 1, 1
+            while page <= pages:
+                res = football_api.get_league_players(league["id"], season, page)
+                if "error" in res:
+                    logger.warning("player stats: %s page %d failed: %s", league["name"], page, res["error"])
+                    failed.append(f"{league['name']} page {page}")
+                    break
+                pages = (res.get("paging") or {}).get("total") or 1
+                for item in res.get("response", []):
+                    player = item["player"]
+                    for entry in item.get("statistics", []):
+                        team_id = (entry.get("team") or {}).get("id")
+                        league_id = (entry.get("league") or {}).get("id")
+                        if league_id != league["id"] or (player["id"], team_id, league_id) in seen:
+                            continue
+                        seen.add((player["id"], team_id, league_id))
+                        if player["id"] not in player_index:
+                            player_index[player["id"]] = len(players)
+                            players.append([player["id"], player.get("name"), player.get("firstname"), player.get("lastname")])
+                        if team_id not in team_index:
+                            team_index[team_id] = len(teams)
+                            teams.append([team_id, entry["team"].get("name")])
+                        if league_id not in leagues:
+                            leagues.append(league_id)
+                        row_player.append(player_index[player["id"]])
+                        row_team.append(team_index[team_id])
+                        row_league.append(leagues.index(league_id))
+                        for column in COLUMNS:
+                            value = stat_value(entry, column)
+                            if column in WEIGHTED_STATS:
+                                value *= stat_value(entry, WEIGHTED_STATS[column])
+                            columns[column].append(value)
+                page += 1
+    if failed:
+        raise RuntimeError(f"incomplete player statistics ({', '.join(failed)} failed), the previous table was kept")
+    return SeasonTable(season, players, teams, leagues, row_player, row_team, row_league, columns, time.time())
+
+
+_table = None
+_table_mtime = None
+_next_check = 0
+_lock = threading.Lock()
+
+
+def current_table():
+    """
+    Returns the loaded SeasonTable (reloaded when the file changed), or None when there is no table.
+    """
+    global _table, _table_mtime, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return _table
+    with _lock:
+        if now < _next_check:
+            return _table
+        _next_check = now + RELOAD_CHECK_SECONDS
+        try:
+            mtime = os.stat(PLAYER_STATS_FILE).st_mtime
+        except OSError:
+            return _table
+        if mtime != _table_mtime:
+            try:
+                _table = SeasonTable.load(PLAYER_STATS_FILE)
+                _table_mtime = mtime
+            except (OSError, ValueError, EOFError) as e:
+                logger.warning("player stats table %s not loaded: %s", PLAYER_STATS_FILE, e)
+        return _table
+
+
+def refresh(season: int = None) -> SeasonTable:
+    """
+    Rebuilds and saves the table. Returns it. Raises RuntimeError, keeping the previous table, if a page failed.
+    """
+    global _next_check
+    table = build_table(season)
+    if not len(table):
+        raise RuntimeError("no player statistics fetched, the previous table was kept")
+    table.save(PLAYER_STATS_FILE)
+    _next_check = 0
+    return table
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Build the season player statistics table.")
+    parser.add_argument("--season", type=int, help="season start year (default: current season)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    try:
+        table = refresh(args.season)
+    except RuntimeError as e:
+        logger.error("player stats: %s", e)
+        sys.exit(1)
+    logger.info("player stats: %d players, %d rows written to %s in %.1fs",
+                len(table), len(table.row_player), PLAYER_STATS_FILE, time.perf_counter() - start)
@@ -0,0 +1,166 @@
+import math
+import football_api
+
+# Local fixture-difficulty model.
+# Teams get Poisson attack/defence strengths from the cached standings snapshots
+# (football_api.get_team_standings(..., cache_only=True)) and, for teams without a table
+# (cups, European competitions), from the finished results already present in the fixtures list.
+# Scoring a team's fixtures costs zero API calls and every fixture gets a probability,
+# unlike /predictions which is one call per fixture and often empty.
+
+# Average goals scored per team per game, used when no table is available
+DEFAULT_GOALS_PER_GAME = 1.35
+
+# Multiplier applied to the home side's expected goals (and divided from the away side's)
+HOME_ADVANTAGE = 1.15
+
+# Pseudo-games of league-average form blended into every team (shrinks small samples)
+PRIOR_GAMES = 5
+
+# Scorelines above this are ignored when summing Poisson probabilities
+MAX_GOALS = 10
+
+# Weight of the API-Football prediction when one is available in cache (0 disables the blend)
+API_PREDICTION_WEIGHT = 0.5
+
+
+def _team_strength(goals_for, goals_against, played, mu):
+    """
+    Returns (attack, defence) relative to the league average mu, shrunk towards 1.0 for small samples.
+    """
+    attack = (goals_for + PRIOR_GAMES * mu) / (played + PRIOR_GAMES) / mu
+    defence = (goals_against + PRIOR_GAMES * mu) / (played + PRIOR_GAMES) / mu
+    return attack, defence
+
+
+def strengths_from_standings(standings_res):
+    """
+    Builds {team_id: {"attack", "defence", "mu"}} from a /standings response (all groups flattened).
+    """
+    rows = []
+    for league in standings_res.get("response", []):
+        for group in league.get("league", {}).get("standings", []):
+            rows.extend(group)
+
+    totals = [(r["team"]["id"], r.get("all", {})) for r in rows if r.get("team")]
+    played_sum = sum(a.get("played") or 0 for _, a in totals)
+    goals_sum = sum((a.get("goals") or {}).get("for") or 0 for _, a in totals)
+    mu = goals_sum / played_sum if played_sum else DEFAULT_GOALS_PER_GAME
+
+    strengths = {}
+    for team_id, a in totals:
+        goals = a.get("goals") or {}
+        attack, defence = _team_strength(goals.get("for") or 0, goals.get("against") or 0, a.get("played") or 0, mu)
+        strengths[team_id] = {"attack": attack, "defence": defence, "mu": mu, "played": a.get("played") or 0}
+    return strengths
+
+
+def strengths_from_results(fixtures, mu=DEFAULT_GOALS_PER_GAME):
+    """
+    Builds {team_id: {"attack", "defence", "mu"}} from the finished fixtures in a list of records.FixtureRecord.
+    """
+    tally = {}
+    for f in fixtures:
+        if f.status not in football_api.FINISHED_STATUSES:
+            continue
+        home, away = f.home_id, f.away_id
+        gh, ga = f.goals_home, f.goals_away
+        if gh is None or ga is None:
+            continue
+        for team_id, scored, conceded in ((home, gh, ga), (away, ga, gh)):
+            t = tally.setdefault(team_id, [0, 0, 0])
+            t[0] += scored
+            t[1] += conceded
+            t[2] += 1
+
+    strengths = {}
+    for team_id, (gf, gc, played) in tally.items():
+        attack, defence = _team_strength(gf, gc, played, mu)
+        strengths[team_id] = {"attack": attack, "defence": defence, "mu": mu, "played": played}
+    return strengths
+
+
+def build_strengths(fixtures, season):
+    """
+    Combines cached standings for every league in the fixtures with results-based strengths.
+    Standings win over results for teams present in both, since they cover the whole table.
+    """
+    strengths = strengths_from_results(fixtures)
+    league_ids = {f.league_id for f in fixtures if f.league_id}
+    for league_id in league_ids:
+        standings_res = football_api.get_team_standings(league_id, season, cache_only=True)
+        if "error" in standings_res:
+            continue
+        for team_id, s in strengths_from_standings(standings_res).items():
+            # A team in several tables keeps the one with more games played (usually the domestic league)
+            existing = strengths.get(team_id)
+            if not existing or existing.get("source") != "standings" or s["played"] > existing["played"]:
+                strengths[team_id] = {**s, "source": "standings"}
+    return strengths
+
+
+def _poisson_pmf(lam):
+    """
+    Returns [P(X=0), ..., P(X=MAX_GOALS)] for a Poisson variable with mean lam.
+    """
+    p = math.exp(-lam)
+    pmf = [p]
+    for k in range(1, MAX_GOALS + 1):
+        p = p * lam / k
+        pmf.append(p)
+    return pmf
+
+
+def outcome_probabilities(lambda_home, lambda_away):
+    """
+    Returns (home_win, draw, away_win) probabilities for independent Poisson goal counts.
+    """
+    ph = _poisson_pmf(lambda_home)
+    pa = _poisson_pmf(lambda_away)
+    cum_away = []
+    running = 0.0
+    for p in pa:
+        running += p
+        cum_away.append(running)
+    home_win = sum(ph[i] * cum_away[i - 1] for i in range(1, MAX_GOALS + 1))
+    draw = sum(ph[i] * pa[i] for i in range(MAX_GOALS + 1))
+    away_win = max(0.0, sum(ph) * sum(pa) - home_win - draw)
+    total = home_win + draw + away_win
+    return home_win / total, draw / total, away_win / total
+
+
+def win_probabilities(fixtures, team_id, season, strengths=None):
+    """
+    Scores the win probability of team_id in every fixture in one pass.
+    Returns a list of floats aligned with fixtures (None only if team_id plays in neither side).
+    """
+    if strengths is None:
+        strengths = build_strengths(fixtures, season)
+    neutral = {"attack": 1.0, "defence": 1.0, "mu": DEFAULT_GOALS_PER_GAME}
+
+    # Fixtures with the same pair of sides share the same expected goals
+    memo = {}
+    probs = []
+    for f in fixtures:
+        home, away = f.home_id, f.away_id
+        if team_id not in (home, away):
+            probs.append(None)
+            continue
+        if (home, away) not in memo:
+            sh, sa = strengths.get(home, neutral), strengths.get(away, neutral)
+            mu = (sh["mu"] + sa["mu"]) / 2
+            lambda_home = mu * sh["attack"] * sa["defence"] * HOME_ADVANTAGE
+            lambda_away = mu * sa["attack"] * sh["defence"] / HOME_ADVANTAGE
+            memo[(home, away)] = outcome_probabilities(lambda_home, lambda_away)
+        home_win, _, away_win = memo[(home, away)]
+        probs.append(round(home_win if team_id == home else away_win, 3))
+    return probs
+
+
+def blend(model_prob, api_prob, weight=API_PREDICTION_WEIGHT):
+    """
+    Blends the model probability with the API-Football prediction when one is available.
+    """
+    if api_prob is None or model_prob is None:
+        return model_prob if model_prob is not None else api_prob
+    return (1 - weight) * model_prob + weight * api_prob
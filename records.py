@@ -0,0 +1,166 @@
+import re
+import json
+import codecs
+from typing import NamedTuple
+
+# Slim records and streaming parse for large API-Football payloads.
+# A full-season /fixtures list (or a whole day of fixtures worldwide, of which only the LEAGUES competitions
+# are kept) is mostly nested data nobody reads: logos, venue names, periods, half-time and extra-time scores.
+# parse_stream reads the response body chunk by chunk as it arrives, decodes one item of "response" at a time
+# (json.JSONDecoder.raw_decode) and keeps only what parse_item returns, e.g. a FixtureRecord, so the full
+# payload tree is never held in memory. Records are immutable: handlers compute derived values (win
+# probabilities, summaries) alongside them instead of writing into shared payloads.
+# Only the fixture list endpoints use records (football_api.fetch_from_api(parse_item=...)); single fixtures
+# with events and lineups, and head-to-head lists (a handful of matches) stay as the API's dicts.
+
+# Response bytes read per chunk when streaming
+CHUNK_BYTES = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class FixtureRecord(NamedTuple):
+    fixture_id: int
+    date: str
+    timestamp: int
+    status: str
+    elapsed: int
+    venue_id: int
+    league_id: int
+    league_name: str
+    season: int
+    round: str
+    home_id: int
+    home_name: str
+    away_id: int
+    away_name: str
+    goals_home: int
+    goals_away: int
+
+
+def fixture_record(item: dict) -> FixtureRecord:
+    """
+    FixtureRecord of one item of a /fixtures response.
+    """
+    fixture, league, teams = item["fixture"], item.get("league") or {}, item["teams"]
+    status = fixture.get("status") or {}
+    goals = item.get("goals") or {}
+    return FixtureRecord(
+        fixture["id"], fixture.get("date"), fixture.get("timestamp"), status.get("short"), status.get("elapsed"),
+        (fixture.get("venue") or {}).get("id"), league.get("id"), league.get("name"), league.get("season"),
+        league.get("round"), teams["home"]["id"], teams["home"]["name"], teams["away"]["id"], teams["away"]["name"],
+        goals.get("home"), goals.get("away"))
+
+
+class _Reader:
+    """
+    Character reader over a stream of UTF-8 byte chunks, decoding JSON values as soon as they are complete.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        """
+        Appends the next chunk to the buffer (dropping what was consumed). Returns False at the end of the stream.
+        """
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            self._buf = self._buf[self._pos:] + self._utf8.decode(b"", final=True)
+        else:
+            self._buf = self._buf[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf) or not self._fill():
+                return
+
+    def peek(self) -> str:
+        self._skip_whitespace()
+        return self._buf[self._pos:self._pos + 1]
+
+    def take(self, expected: str = None) -> str:
+        char = self.peek()
+        if not char or (expected and char not in expected):
+            raise ValueError(f"invalid JSON: expected {expected!r}, found {char!r}")
+        self._pos += 1
+        return char
+
+    def value(self):
+        """
+        Decodes the next JSON value. A value is accepted once a character follows it (or the stream ended),
+        so a number split across two chunks is never cut short.
+        """
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buf, self._pos)
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._fill()
+
+
+def parse_stream(chunks, parse_item=None) -> dict:
+    """
+    Parses an API-Football response body (a JSON object) from an iterable of byte chunks.
+    Every item of "response" is passed through parse_item as soon as it is read and dropped when it returns None;
+    the other fields (errors, results, paging...) are kept as they are.
+    """
+    reader = _Reader(chunks)
+    data = {}
+    reader.take("{")
+    if reader.peek() == "}":
+        reader.take()
+        return data
+    while True:
+        key = reader.value()
+        reader.take(":")
+        if key == "response" and reader.peek() == "[":
+            reader.take()
+            items = []
+            if reader.peek() == "]":
+                reader.take()
+            else:
+                while True:
+                    item = reader.value()
+                    if parse_item is not None:
+                        item = parse_item(item)
+                    if item is not None:
+                        items.append(item)
+                    if reader.take(",]") == "]":
+                        break
+            data[key] = items
+        else:
+            data[key] = reader.value()
+        if reader.take(",}") == "}":
+            return data
+
+
+class ByteCounter:
+    """
+    Wraps an iterable of byte chunks and counts the bytes that went through.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self.bytes = 0
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.bytes += len(chunk)
+            yield chunk
@@ -0,0 +1,264 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import unicodedata
+from typing import NamedTuple
+import football_api
+import scheduler
+from warmup import current_season_year
+
+# Coach and venue reference bundle.
+# Coaches and venues change a few times a season at most, yet answering "Quem treina o Benfica?" or
+# "Qual é a lotação do Estádio do Dragão?" took a team search plus a /coachs or /venues call and returned
+# bulky career arrays. The bundle holds, for every team of the football_api.LEAGUES competitions, the current
+# coach (trimmed fields) and the venue (name, city, capacity, surface), so these intents are answered locally.
+#
+# The bundle is built by a refresh job (`python reference.py`, e.g. weekly from cron) from /teams?league&season
+# (teams with their venues, one call per competition) and /coachs?team (one call per team, cached for a week
+# by football_api, so a rerun after a failure only fetches what is missing). Calls run at warm-up priority
+# through the quota scheduler. Teams whose coach could not be fetched keep the coach of the previous bundle.
+#
+# It is stored in REFERENCE_FILE as compact JSON: one array per team under a field list, written atomically.
+# Loading builds the indexes (team id, normalized team, venue and coach names) in a few milliseconds; every
+# process reloads the file when a refresh replaces it.
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_FILE = os.environ.get("REFERENCE_FILE", "reference.json")
+
+# How often a process checks whether the bundle file was replaced
+RELOAD_CHECK_SECONDS = 60
+
+FORMAT_VERSION = 1
+
+
+class TeamReference(NamedTuple):
+    team_id: int
+    team_name: str
+    country: str
+    coach_id: int
+    coach_name: str
+    coach_firstname: str
+    coach_lastname: str
+    coach_age: int
+    coach_nationality: str
+    venue_id: int
+    venue_name: str
+    venue_city: str
+    venue_capacity: int
+    venue_surface: str
+
+    def coach(self) -> dict:
+        """
+        Trimmed coach record as given to the response model.
+        """
+        return {"name": self.coach_name, "firstname": self.coach_firstname, "lastname": self.coach_lastname,
+                "age": self.coach_age, "nationality": self.coach_nationality,
+                "team": {"id": self.team_id, "name": self.team_name}}
+
+    def venue(self) -> dict:
+        """
+        Venue record as given to the response model.
+        """
+        return {"name": self.venue_name, "city": self.venue_city, "capacity": self.venue_capacity,
+                "surface": self.venue_surface, "team": {"id": self.team_id, "name": self.team_name}}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalizes a team, venue or coach name for lookups (case, accents, punctuation, whitespace).
+    """
+    text = unicodedata.normalize("NFKD", str(name))
+    text = "".join(c if c.isalnum() else " " for c in text if not unicodedata.combining(c))
+    return " ".join(text.lower().split())
+
+
+class ReferenceBundle:
+    """
+    Loaded bundle with its indexes.
+    """
+
+    def __init__(self, teams, season: int = None, built_at: float = None):
+        self.season = season
+        self.built_at = built_at
+        self.by_team_id = {t.team_id: t for t in teams}
+        self.by_team_name = {}
+        self.by_venue_name = {}
+        self.by_coach_name = {}
+        for t in teams:
+            self.by_team_name.setdefault(normalize_name(t.team_name), t)
+            if t.venue_name:
+                self.by_venue_name.setdefault(normalize_name(t.venue_name), []).append(t)
+            if t.coach_name:
+                for name in {t.coach_name, f"{t.coach_firstname or ''} {t.coach_lastname or ''}", t.coach_lastname or ""}:
+                    if normalize_name(name):
+                        self.by_coach_name.setdefault(normalize_name(name), []).append(t)
+
+    def __len__(self):
+        return len(self.by_team_id)
+
+    def team(self, team_id: int):
+        return self.by_team_id.get(team_id)
+
+    def find_team(self, name: str):
+        """
+        Team by exact normalized name (fuzzy matching stays with the API search).
+        """
+        return self.by_team_name.get(normalize_name(name or ""))
+
+    def find_venues(self, name: str) -> list:
+        """
+        Teams whose venue matches the name: exact normalized name first, then venues containing it.
+        """
+        key = normalize_name(name or "")
+        if not key:
+            return []
+        if key in self.by_venue_name:
+            return self.by_venue_name[key]
+        return [t for venue, teams in self.by_venue_name.items() if key in venue for t in teams]
+
+    def find_coaches(self, name: str) -> list:
+        """
+        Teams whose coach matches the name (full name, "F. Lastname" or last name).
+        """
+        key = normalize_name(name or "")
+        if not key:
+            return []
+        found = self.by_coach_name.get(key)
+        if found is None and " " in key:
+            found = self.by_coach_name.get(key.split()[-1])
+        return list({t.team_id: t for t in found or []}.values())
+
+    def to_json(self) -> str:
+        return json.dumps({"version": FORMAT_VERSION, "season": self.season, "built_at": self.built_at,
+                           "fields": list(TeamReference._fields),
+                           "teams": [list(t) for t in self.by_team_id.values()]},
+                          ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, text: str):
+        data = json.loads(text)
+        if data.get("version") != FORMAT_VERSION or data.get("fields") != list(TeamReference._fields):
+            raise ValueError("unsupported reference bundle format")
+        return cls([TeamReference(*row) for row in data["teams"]], data.get("season"), data.get("built_at"))
+
+
+_bundle = None
+_bundle_mtime = None
+_next_check = 0
+_lock = threading.Lock()
+
+
+def current_bundle():
+    """
+    Returns the loaded ReferenceBundle (reloaded when the file changed), or None when there is no bundle.
+    """
+    global _bundle, _bundle_mtime, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return _bundle
+    with _lock:
+        if now < _next_check:
+            return _bundle
+        _next_check = now + RELOAD_CHECK_SECONDS
+        try:
+            mtime = os.stat(REFERENCE_FILE).st_mtime
+        except OSError:
+            return _bundle
+        if mtime != _bundle_mtime:
+            try:
+                with open(REFERENCE_FILE, encoding="utf-8") as f:
+                    _bundle = ReferenceBundle.from_json(f.read())
+                _bundle_mtime = mtime
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning("reference bundle %s not loaded: %s", REFERENCE_FILE, e)
+        return _bundle
+
+
+def _current_coach(coaches: list, team_id: int):
+    """
+    Picks the coach whose career has an open spell at the team (the /coachs?team= answer lists former coaches too).
+    """
+    for coach in coaches:
+        for spell in coach.get("career") or []:
+            if (spell.get("team") or {}).get("id") == team_id and not spell.get("end"):
+                return coach
+    return None
+
+
+def build_bundle(season: int = None, previous: ReferenceBundle = None) -> ReferenceBundle:
+    """
+    Fetches the teams, venues and current coaches of every LEAGUES competition and returns the new bundle.
+    """
+    season = season or current_season_year()
+    teams = {}
+    with scheduler.priority(scheduler.PRIORITY_WARMUP):
+        for league in football_api.LEAGUES.values():
+            res = football_api.get_league_teams(league["id"], season)
+            if "error" in res:
+                logger.warning("reference: could not list teams of %s: %s", league["name"], res["error"])
+            for item in res.get("response", []):
+                teams.setdefault(item["team"]["id"], item)
+
+        rows = []
+        for team_id, item in teams.items():
+            team, venue = item["team"], item.get("venue") or {}
+            res = football_api.get_coach(team_id=team_id)
+            coach = _current_coach(res.get("response", []), team_id) if "error" not in res else None
+            if coach:
+                coach_fields = (coach.get("id"), coach.get("name"), coach.get("firstname"), coach.get("lastname"),
+                                coach.get("age"), coach.get("nationality"))
+            elif previous and previous.team(team_id):
+                old = previous.team(team_id)
+                coach_fields = (old.coach_id, old.coach_name, old.coach_firstname, old.coach_lastname,
+                                old.coach_age, old.coach_nationality)
+            else:
+                coach_fields = (None,) * 6
+            rows.append(TeamReference(team_id, team.get("name"), team.get("country"), *coach_fields,
+                                      venue.get("id"), venue.get("name"), venue.get("city"),
+                                      venue.get("capacity"), venue.get("surface")))
+    return ReferenceBundle(rows, season, time.time())
+
+
+def save_bundle(bundle: ReferenceBundle, path: str = None):
+    """
+    Writes the bundle atomically (readers never see a partial file).
+    """
+    path = path or REFERENCE_FILE
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(bundle.to_json())
+    os.replace(tmp, path)
+
+
+def refresh(season: int = None) -> ReferenceBundle:
+    """
+    Rebuilds and saves the bundle. Returns it.
+    """
+    global _next_check
+    bundle = build_bundle(season, previous=current_bundle())
+    if not len(bundle):
+        raise RuntimeError("no teams fetched, the previous bundle was kept")
+    save_bundle(bundle)
+    _next_check = 0
+    return bundle
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Build the coach and venue reference bundle.")
+    parser.add_argument("--season", type=int, help="season start year (default: current season)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    try:
+        bundle = refresh(args.season)
+    except RuntimeError as e:
+        logger.error("reference: %s", e)
+        sys.exit(1)
+    missing = sum(1 for t in bundle.by_team_id.values() if t.coach_name is None)
+    logger.info("reference: %d teams (%d without coach) written to %s in %.1fs",
+                len(bundle), missing, REFERENCE_FILE, time.perf_counter() - start)
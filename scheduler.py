@@ -0,0 +1,195 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+import deadline
+
+# Quota-aware scheduler for API-Football requests.
+# Every football_api request acquires a token here first. The token bucket follows the per-minute
+# quota, and the daily quota is tracked from the rate-limit response headers. Waiting requests are
+# served in priority order, so interactive user questions always go before prefetch and warm-up jobs.
+# When the daily budget runs low, background requests are refused and callers fall back to
+# cached or stale data (see football_api.fetch_cached).
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 10
+PRIORITY_BATCH = 15
+PRIORITY_WARMUP = 20
+
+# Defaults for the free plan, replaced by the real limits once the first response headers arrive
+PER_MINUTE_LIMIT = int(os.environ.get("FOOTBALL_API_PER_MINUTE", "10"))
+DAILY_LIMIT = int(os.environ.get("FOOTBALL_API_DAILY", "100"))
+
+# Share of the daily quota kept for interactive requests
+DAILY_RESERVE_FRACTION = 0.1
+
+# Maximum time a request waits in the queue for a token before degrading
+MAX_WAIT_SECONDS = {PRIORITY_INTERACTIVE: 3, PRIORITY_PREFETCH: 30, PRIORITY_BATCH: 300, PRIORITY_WARMUP: 60}
+
+_current_priority = contextvars.ContextVar("football_api_priority", default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Runs the football_api calls inside the block with the given priority.
+    Example: `with scheduler.priority(scheduler.PRIORITY_WARMUP): football_api.get_team_standings(...)`
+    """
+    token = _current_priority.set(level)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    """
+    Returns the priority of the calling context (interactive unless set by priority()).
+    """
+    return _current_priority.get()
+
+
+class QuotaScheduler:
+    """
+    Token bucket plus priority queue in front of the API-Football quota.
+    """
+
+    def __init__(self, per_minute: int = PER_MINUTE_LIMIT, daily: int = DAILY_LIMIT):
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self.minute_limit = per_minute
+        self.minute_remaining = None
+        self.daily_limit = daily
+        self.daily_remaining = None
+        self._tokens = float(per_minute)
+        self._last_refill = time.monotonic()
+        self._counters = {"granted": 0, "degraded": 0, "timed_out": 0, "rate_limited_responses": 0}
+        self._granted_by_priority = {}
+
+    def _refill(self):
+        now = time.monotonic()
+        rate = self.minute_limit / 60.0
+        self._tokens = min(float(self.minute_limit), self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    def _budget_allows(self, level: int) -> bool:
+        if self.daily_remaining is None:
+            return True
+        if self.daily_remaining <= 0:
+            return False
+        if level > PRIORITY_INTERACTIVE:
+            return self.daily_remaining > self.daily_limit * DAILY_RESERVE_FRACTION
+        return True
+
+    def acquire(self, level: int = None, max_wait: float = None) -> bool:
+        """
+        Waits for a request token, serving higher-priority (lower number) requests first.
+        Returns False if the daily budget does not allow the request or no token arrives within max_wait
+        (never waits past the request deadline).
+        """
+        level = current_priority() if level is None else level
+        max_wait = MAX_WAIT_SECONDS.get(level, MAX_WAIT_SECONDS[PRIORITY_WARMUP]) if max_wait is None else max_wait
+        deadline_left = deadline.remaining()
+        if deadline_left is not None:
+            max_wait = min(max_wait, deadline_left)
+        with self._cond:
+            if not self._budget_allows(level):
+                self._counters["degraded"] += 1
+                return False
+            ticket = (level, next(self._seq))
+            heapq.heappush(self._waiting, ticket)
+            wait_until = time.monotonic() + max_wait
+            while True:
+                self._refill()
+                if self._waiting[0] == ticket and self._tokens >= 1:
+                    heapq.heappop(self._waiting)
+                    self._tokens -= 1
+                    self._counters["granted"] += 1
+                    self._granted_by_priority[level] = self._granted_by_priority.get(level, 0) + 1
+                    self._cond.notify_all()
+                    return True
+                remaining = wait_until - time.monotonic()
+                if remaining <= 0:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._counters["timed_out"] += 1
+                    self._cond.notify_all()
+                    return False
+                next_token = (1 - self._tokens) / (self.minute_limit / 60.0) if self._tokens < 1 else 0.05
+                self._cond.wait(min(remaining, max(next_token, 0.01)))
+
+    def update_from_headers(self, headers, status_code: int = None):
+        """
+        Updates the limits from the API-Football rate-limit response headers.
+        """
+        def header_int(name):
+            try:
+                return int(headers.get(name))
+            except (TypeError, ValueError):
+                return None
+
+        with self._cond:
+            daily_limit = header_int("x-ratelimit-requests-limit")
+            daily_remaining = header_int("x-ratelimit-requests-remaining")
+            minute_limit = header_int("X-RateLimit-Limit")
+            minute_remaining = header_int("X-RateLimit-Remaining")
+            if daily_limit:
+                self.daily_limit = daily_limit
+            if daily_remaining is not None:
+                self.daily_remaining = daily_remaining
+            if minute_limit:
+                self.minute_limit = minute_limit
+            if minute_remaining is not None:
+                self.minute_remaining = minute_remaining
+                # The server knows better than our bucket (other processes share the same key)
+                self._tokens = min(self._tokens, float(minute_remaining))
+            if status_code == 429:
+                self._counters["rate_limited_responses"] += 1
+                self._tokens = 0.0
+            self._cond.notify_all()
+
+    def quota_metrics(self) -> dict:
+        """
+        Returns a snapshot of quota usage and scheduler counters.
+        """
+        with self._cond:
+            self._refill()
+            return {
+                "daily_limit": self.daily_limit,
+                "daily_remaining": self.daily_remaining,
+                "minute_limit": self.minute_limit,
+                "minute_remaining": self.minute_remaining,
+                "tokens_available": round(self._tokens, 2),
+                "queued": len(self._waiting),
+                **self._counters,
+                "granted_by_priority": dict(self._granted_by_priority),
+            }
+
+
+# Process-wide scheduler used by football_api
+_scheduler = QuotaScheduler()
+
+
+def acquire(level: int = None, max_wait: float = None) -> bool:
+    """
+    Acquires a request token from the process-wide scheduler (see QuotaScheduler.acquire).
+    """
+    return _scheduler.acquire(level, max_wait)
+
+
+def update_from_headers(headers, status_code: int = None):
+    """
+    Feeds response rate-limit headers to the process-wide scheduler.
+    """
+    _scheduler.update_from_headers(headers, status_code)
+
+
+def quota_metrics() -> dict:
+    """
+    Returns quota usage metrics of the process-wide scheduler.
+    """
+    return _scheduler.quota_metrics()
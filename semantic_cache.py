@@ -0,0 +1,274 @@
+import os
+import re
+import time
+import threading
+import football_api
+import reference
+import tracing
+
+# Semantic cache of extracted intents.
+# The exact intent cache (main.extract_intent) only helps when the same text is asked again, yet many questions
+# are paraphrases resolving to the same intent ("onde joga o Benfica?" / "qual o estádio do Benfica?").
+# guard.guard_query already embeds every user message; this index keeps the embeddings of recently answered
+# questions with their extracted intents, and a new question close enough to one of them (cosine similarity at
+# least SEMANTIC_CACHE_THRESHOLD) reuses its intent without calling the chat model.
+#
+# Similarity alone cannot tell "onde joga o Benfica?" from "onde joga o Porto?", so a match also has to pass the
+# entity guard (entities_match): every team, player, coach, venue and competition of the cached intent must be
+# named in the new question, and both questions must name the same entities, numbers (rounds, seasons, top N)
+# and relative terms ("hoje", "amanhã", "época passada"...). Entries only match within the same scope (the
+# conversation context, the date relative references were resolved against and the intent prompt version).
+#
+# The index is brute force over a NumPy matrix of unit vectors (a lookup over 5000 text-embedding-3-small
+# vectors takes about 3 ms); SEMANTIC_CACHE_INT8=1 stores them quantized to int8, a quarter of the memory. It lives in the
+# process, so it fills up in long-lived server workers; the REPL answers each message in a fresh child process.
+# NumPy is imported on first use (startup_benchmark.py checks that it is not imported at start-up).
+
+# Minimum cosine similarity for a cached intent to be reused
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+
+SEMANTIC_CACHE_TTL_SECONDS = int(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", str(6 * 3600)))
+
+# Upper bound on indexed questions (expired entries go first, then the oldest)
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+SEMANTIC_CACHE_INT8 = os.environ.get("SEMANTIC_CACHE_INT8", "0") == "1"
+
+# Set SEMANTIC_CACHE=0 to disable the semantic cache
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE", "1") != "0"
+
+# Intent fields naming entities (checked by the entity guard)
+ENTITY_FIELDS = ("team1", "team2", "player", "coach", "venue", "competition")
+
+# Words that change the intent while barely moving the embedding: relative dates and seasons, fixture types,
+# stats and events. Two questions only match if they use the same ones.
+DISTINCT_TERMS = {
+    "hoje", "amanha", "ontem", "passada", "passado", "proxima", "proximo", "anterior", "seguinte", "ultima",
+    "ultimo", "ultimas", "ultimos", "atual", "semana", "mes", "fim", "today", "tomorrow", "yesterday", "last",
+    "next", "previous", "current", "week", "dificil", "dificeis", "facil", "faceis", "hardest", "easiest",
+    "golos", "golo", "goals", "assistencias", "assists", "cartoes", "amarelos", "vermelhos", "cards", "minutos",
+    "minutes", "remates", "shots", "passes", "dribles", "substituicoes", "var", "casa", "fora", "home", "away",
+}
+
+# Name parts too common to identify an entity ("FC", "Estádio"...)
+GENERIC_NAME_TERMS = {
+    "club", "clube", "futebol", "football", "calcio", "dos", "das", "del", "los", "the", "and", "estadio",
+    "stadium", "stadion", "stade", "arena", "park", "campo", "municipal", "nacional", "sport", "sports",
+}
+
+# Rows are scored this many at a time in int8 mode (bounds the float32 copy)
+_INT8_CHUNK_ROWS = 1024
+
+_WORD = re.compile(r"\w+")
+
+
+def _terms(name) -> set:
+    """
+    Identifying terms of an entity name (normalized words, without generic ones).
+    """
+    return {t for t in reference.normalize_name(name).split() if len(t) >= 3 and t not in GENERIC_NAME_TERMS}
+
+
+def _entity_names(intent) -> list:
+    """
+    Term sets of the entities named in an intent (or a list of intents).
+    """
+    intents = intent if isinstance(intent, list) else [intent]
+    names = []
+    for i in intents:
+        for field in ENTITY_FIELDS:
+            terms = _terms(i.get(field) or "")
+            if terms and terms not in names:
+                names.append(terms)
+    return names
+
+
+_vocabulary = (None, frozenset())
+
+
+def known_name_terms() -> frozenset:
+    """
+    Terms of the competitions in football_api.LEAGUES and of the teams, venues and coaches of the reference
+    bundle (when there is one), rebuilt when the bundle is reloaded.
+    """
+    global _vocabulary
+    bundle = reference.current_bundle()
+    if _vocabulary[0] is not bundle or (bundle is None and not _vocabulary[1]):
+        terms = set()
+        for key, league in football_api.LEAGUES.items():
+            terms |= _terms(key) | _terms(league["name"])
+        if bundle is not None:
+            for t in bundle.by_team_id.values():
+                for name in (t.team_name, t.venue_name, t.coach_lastname):
+                    terms |= _terms(name or "")
+        _vocabulary = (bundle, frozenset(terms))
+    return _vocabulary[1]
+
+
+def _signature(question: str, entity_terms: set, vocabulary: frozenset) -> set:
+    """
+    What a question names: entity terms, known names, numbers, DISTINCT_TERMS and capitalized words
+    (proper nouns the vocabulary does not know; the first word of a sentence is not counted).
+    """
+    signature = set()
+    for match in _WORD.finditer(question):
+        word = match.group()
+        before = question[:match.start()].rstrip()
+        sentence_start = not before or before[-1] in ".?!¿¡"
+        for term in reference.normalize_name(word).split():
+            if (term.isdigit() or term in DISTINCT_TERMS or term in entity_terms or term in vocabulary
+                    or (word[0].isupper() and not sentence_start and term not in GENERIC_NAME_TERMS)):
+                signature.add(term)
+    return signature
+
+
+def entities_match(question: str, cached_question: str, intent) -> bool:
+    """
+    Entity guard: True if `question` can reuse the intent extracted from `cached_question`, i.e. it names every
+    entity of the intent and nothing the cached question does not (and vice versa).
+    """
+    names = _entity_names(intent)
+    words = set(reference.normalize_name(question).split())
+    if any(not (terms & words) for terms in names):
+        return False
+    entity_terms = set().union(*names)
+    vocabulary = known_name_terms()
+    return _signature(question, entity_terms, vocabulary) == _signature(cached_question, entity_terms, vocabulary)
+
+
+class SemanticIndex:
+    """
+    Brute-force nearest-neighbour index of question embeddings (unit vectors), each with its question, intent,
+    scope and expiry time. Thread-safe.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: float = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, int8: bool = SEMANTIC_CACHE_INT8):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.int8 = int8
+        self._vectors = None   # (capacity, dimensions) float32 or int8, first len(self._entries) rows used
+        self._expires = None   # (capacity,) float64
+        self._entries = []     # (question, intent, scope)
+        self._rows = {}        # (question, scope) -> row
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _unit(self, embedding):
+        import numpy as np
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def _scores(self, query):
+        """
+        Cosine similarity of the query (unit vector) to every used row.
+        """
+        import numpy as np
+        n = len(self._entries)
+        if not self.int8:
+            return self._vectors[:n] @ query
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, _INT8_CHUNK_ROWS):
+            rows = self._vectors[start:min(n, start + _INT8_CHUNK_ROWS)]
+            scores[start:start + len(rows)] = (rows.astype(np.float32) @ query) / 127
+        return scores
+
+    def lookup(self, embedding, question: str, scope=None, now: float = None):
+        """
+        Returns the intent of the most similar live entry of the same scope that passes the similarity threshold
+        and the entity guard, or None.
+        """
+        import numpy as np
+        now = now or time.time()
+        with self._lock:
+            if not self._entries:
+                return None
+            query = self._unit(embedding)
+            if query.shape[0] != self._vectors.shape[1]:
+                return None
+            scores = self._scores(query)
+            scores[self._expires[:len(self._entries)] <= now] = -1
+            candidates = np.flatnonzero(scores >= self.threshold)
+            candidates = candidates[np.argsort(-scores[candidates])]
+            entries = [self._entries[i] for i in candidates]
+        for cached_question, intent, cached_scope in entries:
+            if cached_scope == scope and entities_match(question, cached_question, intent):
+                return intent
+        return None
+
+    def add(self, embedding, question: str, intent, scope=None, now: float = None):
+        """
+        Indexes a question with its extracted intent.
+        """
+        import numpy as np
+        now = now or time.time()
+        with self._lock:
+            vector = self._unit(embedding)
+            if self._vectors is None or vector.shape[0] != self._vectors.shape[1]:
+                self._vectors = np.empty((min(256, self.max_entries), vector.shape[0]),
+                                         dtype=np.int8 if self.int8 else np.float32)
+                self._expires = np.empty(len(self._vectors))
+                self._entries, self._rows = [], {}
+            row = self._rows.get((question, scope))
+            if row is not None:
+                # Asked again: refresh the entry rather than index the same question twice
+                self._entries[row] = (question, intent, scope)
+                self._expires[row] = now + self.ttl
+                return
+            n = len(self._entries)
+            if n == self.max_entries:
+                n = self._evict(now)
+            elif n == len(self._vectors):
+                capacity = min(2 * n, self.max_entries)
+                self._vectors = np.resize(self._vectors, (capacity, self._vectors.shape[1]))
+                self._expires = np.resize(self._expires, capacity)
+            self._vectors[n] = np.round(vector * 127) if self.int8 else vector
+            self._expires[n] = now + self.ttl
+            self._entries.append((question, intent, scope))
+            self._rows[(question, scope)] = n
+
+    def _evict(self, now: float) -> int:
+        """
+        Drops the expired entries or, if none expired, the oldest tenth. Returns the number of entries kept.
+        """
+        import numpy as np
+        n = len(self._entries)
+        keep = self._expires[:n] > now
+        if keep.all():
+            keep[:max(1, n // 10)] = False
+        kept = np.flatnonzero(keep)
+        self._vectors[:len(kept)] = self._vectors[kept]
+        self._expires[:len(kept)] = self._expires[kept]
+        self._entries = [self._entries[i] for i in kept]
+        self._rows = {(question, scope): row for row, (question, _, scope) in enumerate(self._entries)}
+        return len(kept)
+
+
+index = SemanticIndex()
+
+
+def lookup(embedding, question: str, scope=None):
+    """
+    Intent of a previously answered paraphrase of the question (see SemanticIndex.lookup), or None.
+    """
+    if not SEMANTIC_CACHE_ENABLED or embedding is None:
+        return None
+    intent = index.lookup(embedding, question, scope)
+    tracing.record_cache("semantic_intent", "hit" if intent is not None else "miss")
+    return intent
+
+
+def add(embedding, question: str, intent, scope=None):
+    """
+    Indexes an answered question. Intents the model could not extract ("unknown") are not indexed.
+    """
+    intents = intent if isinstance(intent, list) else [intent]
+    if not SEMANTIC_CACHE_ENABLED or embedding is None or not intents:
+        return
+    if any(not isinstance(i, dict) or i.get("intent", "unknown") == "unknown" for i in intents):
+        return
+    index.add(embedding, question, intent, scope)
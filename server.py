@@ -0,0 +1,304 @@
+import os
+import json
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Process
+import cache_backends
+import circuit_breaker
+import live
+import llm_gateway
+import main
+import scheduler
+import session
+import tracing
+
+# Concurrent HTTP chat server.
+# Serves the process_user_input pipeline over HTTP for many users at once, as an alternative to the
+# single-user input() loop in main.py:
+#   POST /chat    {"message": "...", "session_id": "..."}  ->  {"answer": "..."}
+#                 (session_id is optional; it keeps follow-up context between messages, see session.py)
+#   GET  /health  liveness plus in-flight/queued requests, API quota and circuit breaker states
+#   GET  /metrics stage/upstream latencies (p50/p95/p99), cache hit rates, LLM tokens, quota and breakers
+#                 in the Prometheus text format (see tracing.py)
+# Each worker process runs an asyncio event loop and executes pipelines on a bounded thread pool.
+# Requests beyond the concurrency limit wait in a bounded queue; when the queue is full, or a request has
+# waited so long that too little of its time limit is left, the server answers 503 with Retry-After
+# (backpressure). Workers share the OpenAI client and in-memory caches
+# per process, and the cache backend across processes (the ./cache diskcache by default, or Redis across
+# machines, see cache_backends.py). Several workers bind the same port with SO_REUSEPORT (Linux); sessions
+# are stored on the cache backend, so follow-ups keep their context whichever worker serves them
+# (CACHE_BACKEND=memory is per process: use a single worker with it).
+#
+# Usage: python server.py --port 8080 --workers 4 --concurrency 32 --live-poller
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 16 * 1024
+MAX_MESSAGE_CHARS = 1000
+
+# Per-request time limit (the pipeline deadline is set slightly below it)
+REQUEST_TIMEOUT_SECONDS = main.TIMEOUT_SECONDS
+
+# A request still queued when less than this is left of REQUEST_TIMEOUT_SECONDS is rejected with 503
+MIN_PIPELINE_SECONDS = 5
+
+# Idle keep-alive connections are closed after this long
+KEEPALIVE_TIMEOUT_SECONDS = 30
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class ChatServer:
+    """
+    HTTP front end of one worker process.
+    """
+
+    def __init__(self, concurrency: int, queue_size: int):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="pipeline")
+        self._slots = None
+        self.sessions = session.SessionStore(cache=cache_backends.default_cache())
+        self.inflight = 0
+        self.waiting = 0
+        self.served = 0
+        self.rejected = 0
+
+    async def answer(self, message: str, session_id: str = None):
+        """
+        Runs the pipeline for one message with bounded concurrency. Returns (status, payload).
+        """
+        text = message.strip()
+        if text.lower() in ["sos", "help"]:
+            return 200, {"answer": main.HELP_MESSAGE}
+        if self.waiting >= self.queue_size:
+            self.rejected += 1
+            return 503, {"error": "O servidor está sobrecarregado. Tente novamente dentro de momentos."}
+
+        # The time spent queued counts towards REQUEST_TIMEOUT_SECONDS
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), REQUEST_TIMEOUT_SECONDS - MIN_PIPELINE_SECONDS)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            return 503, {"error": "O servidor está sobrecarregado. Tente novamente dentro de momentos."}
+        finally:
+            self.waiting -= 1
+        self.inflight += 1
+        try:
+            remaining = REQUEST_TIMEOUT_SECONDS - (loop.time() - started)
+            future = loop.run_in_executor(self._executor, self._run_pipeline, text, remaining - 2, session_id)
+        except BaseException:
+            self._pipeline_done(None)
+            raise
+        # The slot is held until the pipeline thread finishes, even when the client got its 504 earlier,
+        # so no more than `concurrency` pipelines ever run at once
+        future.add_done_callback(self._pipeline_done)
+        try:
+            answer = await asyncio.wait_for(asyncio.shield(future), remaining)
+            self.served += 1
+            return 200, {"answer": answer}
+        except asyncio.TimeoutError:
+            return 504, {"answer": main.TIMEOUT_MESSAGE}
+        except Exception:
+            logger.exception("pipeline failed")
+            return 200, {"answer": main.TIMEOUT_MESSAGE}
+
+    def _run_pipeline(self, text: str, budget: float, session_id: str = None):
+        """
+        Runs the pipeline on a pool thread, with the session loaded from and stored back to the shared cache
+        (off the event loop, since that is a disk or network round trip).
+        """
+        conversation = self.sessions.get(session_id) if session_id else None
+        answer = main.process_user_input(text, budget, conversation)
+        if conversation is not None:
+            self.sessions.save(conversation)
+        return answer
+
+    def _pipeline_done(self, future):
+        """
+        Frees the concurrency slot of a finished pipeline.
+        """
+        if future is not None and not future.cancelled() and future.exception() is not None:
+            # Retrieved here as well, so a pipeline failing after its request timed out is not reported as unhandled
+            logger.debug("pipeline failed: %r", future.exception())
+        self.inflight -= 1
+        self._slots.release()
+
+    def health(self):
+        """
+        Returns the health payload of this worker.
+        """
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "inflight": self.inflight,
+            "waiting": self.waiting,
+            "served": self.served,
+            "rejected": self.rejected,
+            "sessions": len(self.sessions),
+            "quota": scheduler.quota_metrics(),
+            "circuits": circuit_breaker.states(),
+        }
+
+    def metrics(self) -> str:
+        """
+        Returns the Prometheus metrics of this worker: tracing metrics, server counters, and server, quota and
+        breaker gauges.
+        """
+        quota = scheduler.quota_metrics()
+        circuits = circuit_breaker.states()
+        return tracing.prometheus_text(counters={
+            "served_requests_total": self.served,
+            "rejected_requests_total": self.rejected,
+        }, gauges={
+            "inflight_requests": self.inflight,
+            "waiting_requests": self.waiting,
+            "sessions": len(self.sessions),
+            "quota_daily_remaining": quota["daily_remaining"],
+            "quota_minute_remaining": quota["minute_remaining"],
+            "circuit_open": {(("name", name),): int(c["state"] != "closed") for name, c in circuits.items()},
+        })
+
+    async def route(self, method: str, path: str, body: bytes):
+        """
+        Dispatches one request. Returns (status, payload).
+        """
+        path = path.split("?", 1)[0]
+        if path == "/health":
+            return (200, self.health()) if method == "GET" else (405, {"error": "GET only"})
+        if path == "/metrics":
+            return (200, self.metrics()) if method == "GET" else (405, {"error": "GET only"})
+        if path == "/chat":
+            if method != "POST":
+                return 405, {"error": "POST only"}
+            try:
+                request = json.loads(body or b"{}")
+                message, session_id = request.get("message"), request.get("session_id")
+            except (ValueError, AttributeError):
+                return 400, {"error": "Invalid JSON body"}
+            if not isinstance(message, str) or not message.strip():
+                return 400, {"error": "Missing 'message'"}
+            if len(message) > MAX_MESSAGE_CHARS:
+                return 413, {"error": "Message too long"}
+            return await self.answer(message, str(session_id) if session_id else None)
+        return 404, {"error": "Not found"}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serves HTTP/1.1 requests on one connection (keep-alive supported).
+        """
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEPALIVE_TIMEOUT_SECONDS)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, path, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._write(writer, 400, {"error": "Bad request line"}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, {"error": "Invalid Content-Length"}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self._write(writer, 413, {"error": "Body too large"}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                status, payload = await self.route(method.upper(), path, body)
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status: int, payload, keep_alive: bool):
+        """
+        Writes a JSON response (a str payload is sent as plain text, e.g. /metrics).
+        """
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        head = [
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if status == 503:
+            head.append("Retry-After: 2")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host: str, port: int, reuse_port: bool):
+        """
+        Starts listening and serves forever.
+        """
+        self._slots = asyncio.Semaphore(self.concurrency)
+        server = await asyncio.start_server(self.handle_connection, host, port, reuse_port=reuse_port, backlog=1024)
+        logger.info("worker %d listening on %s:%d", os.getpid(), host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def run_worker(host: str, port: int, concurrency: int, queue_size: int, reuse_port: bool, warmup: bool,
+               live_poller: bool = False):
+    """
+    Entry point of one worker process.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(process)d %(levelname)s %(message)s")
+    # Background polling of live matches runs in one worker only; the other workers read its polls from the
+    # cache backend, and only poll a fixture themselves when nobody refreshed it within the interval
+    if live_poller:
+        live.tracker.start()
+    # Built before taking traffic, so the first request does not wait for the SDK import
+    llm_gateway.get_client()
+    if warmup:
+        import warmup as warmup_service
+        warmup_service.start_warmup_daemon()
+    asyncio.run(ChatServer(concurrency, queue_size).serve(host, port, reuse_port))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Football chatbot HTTP server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=1, help="worker processes sharing the port and the diskcache")
+    parser.add_argument("--concurrency", type=int, default=32, help="pipelines running at once per worker")
+    parser.add_argument("--queue", type=int, default=256, help="requests allowed to wait per worker before 503")
+    parser.add_argument("--warmup", action="store_true", help="run the matchday warm-up daemon in the first worker (below user questions in its quota scheduler)")
+    parser.add_argument("--live-poller", action="store_true", help="poll live matches in the background in the first worker")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        run_worker(args.host, args.port, args.concurrency, args.queue, False, args.warmup, args.live_poller)
+    else:
+        workers = [
+            Process(target=run_worker, args=(args.host, args.port, args.concurrency, args.queue, True,
+                                             args.warmup and n == 0, args.live_poller and n == 0))
+            for n in range(args.workers)
+        ]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
@@ -0,0 +1,232 @@
+import time
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Per-session conversational state for follow-up questions.
+# A session remembers the entities resolved in recent turns (teams with their ids, players, fixtures,
+# competition and season). A compact summary is given to extract_intent, so "e o próximo jogo deles?"
+# after a Benfica question resolves to Benfica, and the handlers reuse the resolved ids instead of
+# calling search_team / the player and fixture lookups again.
+# The current session lives in a context variable set by process_user_input (see use_session).
+# Concurrent requests of one session may run on different threads, so a Session guards its state with a lock.
+# The server keeps sessions on the shared cache backend as well (SessionStore with a cache): workers get
+# connections spread by SO_REUSEPORT, so a follow-up often lands on another worker than the question before.
+# With CACHE_BACKEND=memory there is nothing shared and sessions only work with a single worker.
+
+# Entities kept per kind (the least recently used are dropped first)
+MAX_ENTITIES_PER_KIND = 5
+
+# Sessions idle for longer than this are evicted
+IDLE_TTL_SECONDS = 30 * 60
+
+# Upper bound on sessions kept in memory per process
+MAX_SESSIONS = 10000
+
+_current = contextvars.ContextVar("conversation_session", default=None)
+
+
+def _norm(name) -> str:
+    """
+    Normalizes an entity name for lookups.
+    """
+    return str(name).strip().lower()
+
+
+def _remember(entities: OrderedDict, key, value):
+    """
+    Inserts or refreshes an entity, keeping at most MAX_ENTITIES_PER_KIND.
+    """
+    entities[key] = value
+    entities.move_to_end(key)
+    while len(entities) > MAX_ENTITIES_PER_KIND:
+        entities.popitem(last=False)
+
+
+class Session:
+    """
+    Resolved entities of one conversation.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.teams = OrderedDict()      # normalized name -> team dict (id, name, country, ...)
+        self.players = OrderedDict()    # normalized name -> player id
+        self.fixtures = OrderedDict()   # (team id, team id, season, league id) -> fixture dict
+        self.competition = None
+        self.season = None
+        self.last_intent = None
+        self.last_active = time.time()
+        self.saved_at = 0.0             # when this copy was last written to the shared store
+        self._lock = threading.RLock()
+
+    def __getstate__(self):
+        # The lock is per process: sessions are pickled for the shared store and the REPL child process
+        with self._lock:
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def resolve_team(self, name):
+        """
+        Returns the team previously resolved for this name, or None.
+        """
+        with self._lock:
+            team = self.teams.get(_norm(name)) if name else None
+            if team is not None:
+                self.teams.move_to_end(_norm(name))
+            return team
+
+    def remember_team(self, name, team: dict):
+        """
+        Remembers the team resolved for a name (and under its official name).
+        """
+        compact = {k: team.get(k) for k in ("id", "name", "code", "country") if k in team}
+        with self._lock:
+            _remember(self.teams, _norm(name), compact)
+            if team.get("name") and _norm(team["name"]) != _norm(name):
+                _remember(self.teams, _norm(team["name"]), compact)
+
+    def resolve_player(self, name):
+        """
+        Returns the player id previously resolved for this name, or None.
+        """
+        with self._lock:
+            return self.players.get(_norm(name)) if name else None
+
+    def remember_player(self, name, player_id: int):
+        """
+        Remembers the player id resolved for a name.
+        """
+        with self._lock:
+            _remember(self.players, _norm(name), player_id)
+
+    def resolve_fixture(self, key: tuple):
+        """
+        Returns the fixture previously resolved for (team id, team id, season, league id), or None.
+        """
+        with self._lock:
+            return self.fixtures.get(key)
+
+    def remember_fixture(self, key: tuple, fixture: dict):
+        """
+        Remembers the fixture resolved for (team id, team id, season, league id).
+        """
+        with self._lock:
+            _remember(self.fixtures, key, fixture)
+
+    def remember_intent(self, intent):
+        """
+        Remembers competition, season and intent type of the latest turn.
+        """
+        with self._lock:
+            for i in (intent if isinstance(intent, list) else [intent]):
+                if not isinstance(i, dict):
+                    continue
+                self.competition = i.get("competition") or self.competition
+                self.season = i.get("season") or self.season
+                self.last_intent = i.get("intent") or self.last_intent
+
+    def context_summary(self) -> str:
+        """
+        Compact description of the conversation so far, for extract_intent (empty for a new session).
+        """
+        with self._lock:
+            parts = []
+            if self.teams:
+                names = list(dict.fromkeys(t["name"] for t in reversed(self.teams.values()) if t.get("name")))
+                parts.append("equipas recentes (mais recente primeiro): " + ", ".join(names))
+            if self.players:
+                parts.append("jogadores recentes: " + ", ".join(reversed(self.players.keys())))
+            if self.competition:
+                parts.append(f"competição: {self.competition}")
+            if self.season:
+                parts.append(f"época: {self.season}")
+            if self.last_intent:
+                parts.append(f"última intenção: {self.last_intent}")
+            return "; ".join(parts)
+
+
+class SessionStore:
+    """
+    In-memory sessions with idle eviction and a size bound (least recently active evicted first).
+    With a cache (cache_backends.Cache), sessions are also kept on it for idle_ttl, so every worker sharing
+    the backend continues the same conversation: get() takes the stored copy when it was saved after the
+    local one, and save() writes a session back after each turn.
+    """
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_ttl: float = IDLE_TTL_SECONDS, cache=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.cache = cache
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return "session:" + hashlib.blake2b(session_id.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, session_id: str) -> Session:
+        """
+        Returns the session for an id, creating it if needed.
+        """
+        now = time.time()
+        stored = self.cache.get(self._key(session_id)) if self.cache is not None else None
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if stored is not None and (session is None or stored.saved_at > session.saved_at):
+                session = self._sessions[session_id] = stored
+            if session is None:
+                session = self._sessions[session_id] = Session(session_id)
+            self._sessions.move_to_end(session_id)
+            session.last_active = now
+            return session
+
+    def save(self, session: Session):
+        """
+        Writes a session to the shared cache (no-op without one).
+        """
+        if self.cache is None:
+            return
+        with session._lock:
+            session.saved_at = time.time()
+            self.cache.set(self._key(session.session_id), session, expire=self.idle_ttl)
+
+    def _evict(self, now: float):
+        """
+        Drops idle sessions and, if still full, the least recently active ones.
+        """
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) < self.max_sessions and now - oldest.last_active <= self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+@contextmanager
+def use_session(session):
+    """
+    Makes `session` the current session for the block (None disables session reuse).
+    """
+    token = _current.set(session)
+    try:
+        yield session
+    finally:
+        _current.reset(token)
+
+
+def current():
+    """
+    Returns the current session, or None.
+    """
+    return _current.get()
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+# Cold start benchmark.
+# Imports the chatbot entry modules in fresh interpreters with `python -X importtime` and reports, per module,
+# the median import time, the wall time of the whole process (interpreter start-up included: the time to the
+# REPL prompt, or to a worker process being ready) and the heaviest imports it pulls in.
+# Heavy dependencies (the openai SDK, requests, diskcache, numpy) must be imported on first use, never at
+# import time; --max-ms turns the run into a regression check (exit code 1 when over budget or when one of
+# them is imported eagerly).
+#
+# Usage: python startup_benchmark.py --runs 7 --max-ms 250
+
+DEFAULT_MODULES = ("main", "server")
+
+# Dependencies that are only allowed to load on first use
+LAZY_MODULES = ("openai", "httpx", "pydantic", "requests", "urllib3", "diskcache", "numpy")
+
+# Import time budget per entry module, in milliseconds
+DEFAULT_MAX_MS = 250
+
+
+def parse_importtime(stderr: str) -> list:
+    """
+    Returns [(module, self µs, cumulative µs, depth)] from `-X importtime` output, in import order.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(own), int(cumulative), depth))
+    return rows
+
+
+def measure(module: str, cwd: str) -> dict:
+    """
+    Imports `module` once in a fresh interpreter. Returns its import time, the process wall time and the imports.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+    rows = parse_importtime(proc.stderr)
+    total = next((cumulative for name, _, cumulative, depth in rows if name == module and depth == 0), 0)
+    return {"import_ms": total / 1000, "process_ms": wall * 1000, "rows": rows}
+
+
+def run_benchmark(modules, runs: int, top: int = 10) -> dict:
+    """
+    Measures every module `runs` times; returns the JSON report.
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    report = {"python": sys.version.split()[0], "runs": runs, "modules": {}}
+    for module in modules:
+        samples = [measure(module, cwd) for _ in range(runs)]
+        rows = samples[-1]["rows"]
+        names = {name for name, _, _, _ in rows}
+        # Direct imports (the entry module's and the interpreter's own site imports), heaviest first
+        direct = sorted(((name, cumulative) for name, _, cumulative, depth in rows if depth == 1),
+                        key=lambda r: r[1], reverse=True)
+        report["modules"][module] = {
+            "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+            "process_ms": round(statistics.median(s["process_ms"] for s in samples), 1),
+            "modules_loaded": len(rows),
+            "eager_heavy_imports": sorted(m for m in LAZY_MODULES if m in names),
+            "heaviest_imports_ms": {name: round(cumulative / 1000, 1) for name, cumulative in direct[:top]},
+        }
+    return report
+
+
+def check_thresholds(report: dict, max_ms: float = None) -> list:
+    """
+    Returns the regression check failures.
+    """
+    failures = []
+    for module, row in report["modules"].items():
+        if row["eager_heavy_imports"]:
+            failures.append(f"import {module} loads {', '.join(row['eager_heavy_imports'])} eagerly")
+        if max_ms is not None and row["import_ms"] > max_ms:
+            failures.append(f"import {module} took {row['import_ms']} ms > {max_ms} ms")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time (cold start) benchmark of the chatbot entry modules")
+    parser.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES), help="modules to import")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (the median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="heaviest direct imports listed per module")
+    parser.add_argument("--max-ms", type=float, default=DEFAULT_MAX_MS, help="fail if an import takes longer (median)")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.modules, args.runs, args.top)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    failures = check_thresholds(report, args.max_ms)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# In-process cache (no ./cache diskcache) and a placeholder key: tests never reach the real upstreams
+os.environ.setdefault("CACHE_BACKEND", "memory")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture(autouse=True)
+def _workdir(tmp_path, monkeypatch):
+    # Output files, cassettes and bundles are relative to the working directory
+    monkeypatch.chdir(tmp_path)
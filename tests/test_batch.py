@@ -0,0 +1,77 @@
+import json
+
+import batch
+import main
+
+
+def _write_questions(path, questions):
+    path.write_text("".join(json.dumps({"id": qid, "question": q}) + "\n" for qid, q in questions), encoding="utf-8")
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_resume_retries_timeout_answers(tmp_path, monkeypatch):
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    _write_questions(questions, [("q1", "Onde joga o Benfica?"), ("q2", "Quem treina o Porto?")])
+
+    def timing_out(question, budget, timings=None, status=None):
+        if "Porto" in question:
+            status["degraded"] = "timeout"
+            return main.TIMEOUT_MESSAGE
+        return "No Estádio da Luz."
+
+    monkeypatch.setattr(main, "process_user_input", timing_out)
+    stats = batch.run_batch(str(questions), str(answers), concurrency=2)
+    assert (stats["answered"], stats["failed"]) == (1, 1)
+    first = {r["id"]: r for r in _records(answers)}
+    assert "error" not in first["q1"]
+    assert first["q2"]["answer"] == main.TIMEOUT_MESSAGE and first["q2"]["error"] == "degraded answer (timeout)"
+    assert batch.answered_ids(str(answers)) == {"q1"}
+
+    monkeypatch.setattr(main, "process_user_input", lambda question, budget, timings=None, status=None: "Vítor Bruno.")
+    stats = batch.run_batch(str(questions), str(answers), concurrency=2)
+    assert (stats["skipped"], stats["answered"], stats["failed"]) == (1, 1, 0)
+    assert batch.answered_ids(str(answers)) == {"q1", "q2"}
+
+
+def test_timeout_message_without_error_field_is_retried(tmp_path):
+    answers = tmp_path / "answers.jsonl"
+    answers.write_text(json.dumps({"id": "q1", "answer": main.TIMEOUT_MESSAGE}) + "\n", encoding="utf-8")
+    assert batch.answered_ids(str(answers)) == set()
+
+
+def test_pipeline_reports_a_degraded_answer():
+    status = {}
+    answer = main.process_user_input("Onde joga o Benfica?", budget=0.001, status=status)
+    assert answer
+    assert status.get("degraded") in ("timeout", "fallback")
+
+
+def test_rate_limited_answers_are_retried_and_replaced(tmp_path, monkeypatch):
+    import football_api
+    import guard
+    import reference
+
+    questions, answers = tmp_path / "questions.jsonl", tmp_path / "answers.jsonl"
+    _write_questions(questions, [("q1", "Qual a lotação do Estádio do Dragão?")])
+    intent = {"intent": "get_venue", "team1": None, "venue": "Estadio do Dragao"}
+    monkeypatch.setattr(guard, "_embed", lambda client, inputs: (_ for _ in ()).throw(ConnectionError()))
+    monkeypatch.setattr(main, "guard_query", lambda text, client: None)
+    monkeypatch.setattr(main, "extract_intent", lambda text, context=None: dict(intent))
+    monkeypatch.setattr(reference, "current_bundle", lambda: None)
+    monkeypatch.setattr(main, "generate_response", lambda text, data, status=None: str(data))
+    monkeypatch.setattr(football_api, "get_venue", lambda **kw: {"error": "quota", "rate_limited": True})
+
+    stats = batch.run_batch(str(questions), str(answers), concurrency=1)
+    assert stats["failed"] == 1
+    assert _records(answers)[0]["error"] == "degraded answer (partial)"
+    assert batch.answered_ids(str(answers)) == set()
+
+    monkeypatch.setattr(football_api, "get_venue", lambda **kw: {"response": [{"name": "Estádio do Dragão",
+                                                                                "capacity": 50033}]})
+    stats = batch.run_batch(str(questions), str(answers), concurrency=1)
+    assert stats["answered"] == 1
+    records = _records(answers)
+    assert len(records) == 1 and "error" not in records[0] and "50033" in records[0]["answer"]
@@ -0,0 +1,102 @@
+import football_api
+
+
+def _fixture(status, timestamp):
+    return {"fixture": {"id": 1, "status": {"short": status}, "timestamp": timestamp}}
+
+
+def test_fixture_detail_ttl_by_status():
+    now = 1_700_000_000
+    assert football_api.fixture_detail_ttl(_fixture("FT", now - 7200), now) is None
+    assert football_api.fixture_detail_ttl(_fixture("2H", now - 3000), now) == 30
+    assert football_api.fixture_detail_ttl(_fixture("NS", now + 86400), now) == 600
+
+
+def test_fixture_detail_ttl_never_outlives_kickoff():
+    now = 1_700_000_000
+    assert football_api.fixture_detail_ttl(_fixture("NS", now + 200), now) == 200
+    assert football_api.fixture_detail_ttl(_fixture("NS", now + 5), now) == 30
+    assert football_api.fixture_detail_ttl(_fixture("NS", now - 60), now) == 30
+
+
+def test_single_flight_follower_with_expired_deadline_does_not_wait():
+    import threading
+    import time
+    import deadline
+
+    football_api._inflight["fixtures:slow"] = threading.Event()   # a leader that never finishes
+    try:
+        with deadline.deadline_scope(0.01):
+            time.sleep(0.02)
+            start = time.monotonic()
+            data = football_api._fetch_single_flight("fixtures:slow", "https://example.invalid/fixtures", {}, 60)
+            assert time.monotonic() - start < 1
+        assert data.get("timed_out")
+    finally:
+        football_api._inflight.pop("fixtures:slow", None)
+
+
+def test_predictions_hit_reads_the_cache_once(monkeypatch):
+    football_api.cache_set("predictions:77", {"response": [{"predictions": {}}]}, 300)
+    reads = []
+    cache_get = football_api.cache_get
+    monkeypatch.setattr(football_api, "cache_get", lambda *a, **kw: reads.append(a) or cache_get(*a, **kw))
+    assert football_api.get_fixture_predictions(77)["response"]
+    assert football_api.get_fixture_predictions(78, cache_only=True) == {"response": []}
+    assert reads == [("predictions:77",), ("predictions:78",)]
+
+
+def test_timeouts_cut_short_by_the_deadline_do_not_open_the_breaker(monkeypatch):
+    import requests
+    import circuit_breaker
+    import deadline
+    import scheduler
+    import transport
+
+    def timing_out(*args, timeout=None, **kwargs):
+        raise requests.ReadTimeout(f"read timed out ({timeout:.2f}s)")
+
+    monkeypatch.setattr(transport, "http_get", timing_out)
+    monkeypatch.setattr(scheduler, "acquire", lambda *a, **kw: True)
+    circuit = circuit_breaker.breaker("football:/deadline-test")
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        with deadline.deadline_scope(1):
+            assert football_api.fetch_from_api("/deadline-test", {}, {}, timeout=5)["error"]
+    assert circuit.state == circuit_breaker.CLOSED and circuit.failures == 0
+
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        football_api.fetch_from_api("/deadline-test", {}, {}, timeout=5)
+    assert circuit.state == circuit_breaker.OPEN
+
+
+def test_open_breaker_spends_no_quota(monkeypatch):
+    import circuit_breaker
+    import scheduler
+
+    tokens = []
+    monkeypatch.setattr(scheduler, "acquire", lambda *a, **kw: tokens.append(1) or True)
+    circuit = circuit_breaker.breaker("football:/open-test")
+    circuit.state, circuit.opened_at, circuit._trial_running = circuit_breaker.HALF_OPEN, 0, True
+    assert "Circuit open" in football_api.fetch_from_api("/open-test", {}, {})["error"]
+    assert tokens == []
+
+
+def test_quota_refusal_releases_the_half_open_trial(monkeypatch):
+    import circuit_breaker
+    import scheduler
+
+    monkeypatch.setattr(scheduler, "acquire", lambda *a, **kw: False)
+    circuit = circuit_breaker.breaker("football:/quota-test")
+    circuit.state, circuit._trial_running = circuit_breaker.HALF_OPEN, False
+    assert football_api.fetch_from_api("/quota-test", {}, {})["rate_limited"]
+    assert circuit.allow()
+
+
+def test_warmed_standings_serve_users_without_an_api_call(monkeypatch):
+    calls = []
+    table = {"response": [{"league": {"id": 94, "standings": [[{"rank": 1, "team": {"id": 211}}]]}}]}
+    monkeypatch.setattr(football_api, "fetch_from_api", lambda *a, **kw: calls.append(a) or table)
+    football_api.get_team_standings(94, 2031)         # warm-up
+    assert football_api.get_team_standings(94, "2031") == table   # user question
+    assert len(calls) == 1
+    assert football_api.get_team_standings(94, 2031, cache_only=True) == table
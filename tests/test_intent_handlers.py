@@ -0,0 +1,25 @@
+import football_api
+import intent_handlers
+import session
+
+
+def _fixture(status, goals):
+    return {"fixture": {"id": 77, "status": {"short": status}, "timestamp": 1_700_000_000},
+            "league": {"id": 94}, "teams": {"home": {"id": 1, "name": "Casa"}, "away": {"id": 2, "name": "Fora"}},
+            "goals": {"home": goals[0], "away": goals[1]}}
+
+
+def test_follow_up_sees_a_remembered_fixture_that_kicked_off():
+    conversation = session.Session("test")
+    conversation.remember_team("Casa", {"id": 1, "name": "Casa"})
+    conversation.remember_team("Fora", {"id": 2, "name": "Fora"})
+    conversation.remember_fixture((1, 2, "2025/2026", None), _fixture("NS", (None, None)))
+    football_api.cache_set("fixture:77", {**_fixture("1H", (1, 0)), "events": []}, 60)
+
+    with session.use_session(conversation):
+        fixture, err = intent_handlers.resolve_match_fixture({"team1": "Casa", "team2": "Fora"})
+
+    assert err is None
+    assert fixture["fixture"]["status"]["short"] == "1H"
+    assert fixture["goals"] == {"home": 1, "away": 0}
+    assert conversation.resolve_fixture((1, 2, "2025/2026", None))["fixture"]["status"]["short"] == "1H"
@@ -0,0 +1,46 @@
+import cache_backends
+import football_api
+import live
+
+
+def _fixture(status, events):
+    return {"fixture": {"id": 9, "status": {"short": status}}, "events": events}
+
+
+def _goal(minute, player_id=None, detail="Normal Goal"):
+    return {"time": {"elapsed": minute, "extra": None}, "team": {"id": 211}, "player": {"id": player_id},
+            "assist": {"id": None}, "type": "Goal", "detail": detail}
+
+
+class FakeDetails:
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.calls = 0
+
+    def __call__(self, fixture_ids, refresh=False):
+        self.calls += 1
+        return {"response": [self.polls.pop(0)]}
+
+
+def test_amended_events_replace_the_old_ones(monkeypatch):
+    details = FakeDetails(_fixture("1H", [_goal(12)]),
+                          _fixture("1H", [_goal(12, player_id=7)]),
+                          _fixture("2H", [_goal(12, player_id=7, detail="Goal cancelled")]))
+    monkeypatch.setattr(football_api, "get_fixtures_details", details)
+    tracker = live.LiveTracker(interval=0, cache=cache_backends.Cache(cache_backends.MemoryBackend()))
+
+    assert tracker.events(9)[0] == [_goal(12)]
+    assert tracker.events(9)[0] == [_goal(12, player_id=7)]
+    events, status, error = tracker.events(9)
+    assert events == [_goal(12, player_id=7, detail="Goal cancelled")] and status == "2H" and error is None
+
+
+def test_workers_share_polls_through_the_cache(monkeypatch):
+    details = FakeDetails(_fixture("1H", [_goal(12, player_id=7)]))
+    monkeypatch.setattr(football_api, "get_fixtures_details", details)
+    shared = cache_backends.Cache(cache_backends.MemoryBackend())
+    worker1, worker2 = live.LiveTracker(cache=shared), live.LiveTracker(cache=shared)
+
+    assert worker1.events(9)[0] == [_goal(12, player_id=7)]
+    assert worker2.events(9)[0] == [_goal(12, player_id=7)]
+    assert details.calls == 1 and worker2.polls == 0
@@ -0,0 +1,50 @@
+import threading
+
+import football_api
+import odds
+
+
+def _odds_response(home):
+    return {"response": [{"bookmakers": [
+        {"name": "Betano", "bets": [{"name": "Match Winner", "values": [
+            {"value": "Home", "odd": str(home)}, {"value": "Draw", "odd": "3.4"}, {"value": "Away", "odd": "4.0"}]}]},
+        {"name": "Placard", "bets": [{"name": "Match Winner", "values": [
+            {"value": "Home", "odd": "1.9"}, {"value": "Draw", "odd": "3.5"}]}]},
+    ]}]}
+
+
+def test_summarize_market():
+    summary = odds.summarize_market(odds.compact_odds(_odds_response(2.0))["Match Winner"])
+    assert summary["outcomes"]["Home"] == {"best_odd": 2.0, "bookmaker": "Betano", "implied_probability": 0.5}
+    assert summary["outcomes"]["Draw"]["bookmaker"] == "Placard"
+    # Placard does not quote Away, so only Betano's overround counts
+    assert summary["margins"]["all"] == {"margin": round(1 / 2.0 + 1 / 3.4 + 1 / 4.0 - 1, 4),
+                                         "best_price_margin": round(1 / 2.0 + 1 / 3.5 + 1 / 4.0 - 1, 4)}
+
+
+def test_concurrent_snapshots_are_all_kept(monkeypatch):
+    prices = iter(2.0 + n / 100 for n in range(100))
+    lock = threading.Lock()
+
+    def get_fixture_odds(fixture_id, bet_id=None):
+        with lock:
+            return _odds_response(next(prices))
+
+    monkeypatch.setattr(football_api, "get_fixture_odds", get_fixture_odds)
+    threads = [threading.Thread(target=odds.take_snapshot, args=(501,)) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    movement = odds.line_movement(501, "Match Winner")
+    assert len(movement) == 20
+    assert len({m[1]["Home"] for m in movement}) == 20
+
+
+def test_history_keeps_the_latest_snapshots_and_legacy_ones(monkeypatch):
+    monkeypatch.setattr(odds, "MAX_SNAPSHOTS", 3)
+    football_api.cache_set("odds:502", {"snapshots": [{"ts": 1, "requested": [], "markets": {}, "summary": {}}]}, 60)
+    monkeypatch.setattr(football_api, "get_fixture_odds", lambda fixture_id, bet_id=None: _odds_response(2.0))
+    taken = [odds.take_snapshot(502)["n"] for _ in range(5)]
+    history = odds._load_history(502)["snapshots"]
+    assert [s.get("n") for s in history] == taken[-3:]
@@ -0,0 +1,70 @@
+import array
+import os
+
+import pytest
+
+import football_api
+import player_stats
+
+
+def _item(player_id, name, team_id, league_id, goals, minutes, passes=0, accuracy=None):
+    return {"player": {"id": player_id, "name": name, "firstname": name, "lastname": name},
+            "statistics": [{"team": {"id": team_id, "name": f"Team {team_id}"}, "league": {"id": league_id},
+                            "goals": {"total": goals, "assists": 0}, "games": {"minutes": minutes},
+                            "passes": {"total": passes, "accuracy": accuracy}}]}
+
+
+def _pages(failing=()):
+    """
+    get_league_players stand-in: two pages for the Primeira Liga, one for the Premier League, empty elsewhere.
+    """
+    pages = {
+        (94, 1): [_item(1, "Gyokeres", 10, 94, 20, 2000, 400, 80), _item(2, "Pavlidis", 11, 94, 12, 1800)],
+        (94, 2): [_item(3, "Banza", 12, 94, 12, 1500), _item(1, "Gyokeres", 10, 94, 0, 0)],
+        (39, 1): [_item(1, "Gyokeres", 20, 39, 5, 900, 100, 70), _item(4, "Haaland", 21, 39, 25, 2500)],
+    }
+
+    def get_league_players(league_id, season, page=1):
+        if (league_id, page) in failing:
+            return {"error": "Request timed out", "response": []}
+        total = max([p for (l, p) in pages if l == league_id] or [1])
+        return {"paging": {"current": page, "total": total}, "response": pages.get((league_id, page), [])}
+    return get_league_players
+
+
+def test_leaderboards_and_totals(monkeypatch):
+    monkeypatch.setattr(football_api, "get_league_players", _pages())
+    table = player_stats.build_table(2025)
+
+    top = table.leaderboard("goals.total")
+    assert [(r["player"], r["value"]) for r in top] == [("Haaland", 25), ("Gyokeres", 25), ("Banza", 12), ("Pavlidis", 12)]
+    liga = table.leaderboard("goals.total", league_id=94)
+    # Same goals: fewer minutes first
+    assert [r["player"] for r in liga] == ["Gyokeres", "Banza", "Pavlidis"]
+    accuracy = table.leaderboard("passes.accuracy")
+    assert accuracy == [{"rank": 1, "player": "Gyokeres", "team": "Team 10, Team 20", "value": 78.0}]
+    summary = table.player_summary(table.find_players("Gyokeres")[0])
+    assert summary["totals"]["goals.total"] == 25 and summary["totals"]["games.minutes"] == 2900
+
+
+def test_save_and_load_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setattr(football_api, "get_league_players", _pages())
+    table = player_stats.build_table(2025)
+    path = str(tmp_path / "table.bin")
+    table.save(path)
+    loaded = player_stats.SeasonTable.load(path)
+    assert loaded.row_player.typecode == "i" and loaded.row_player.itemsize == 4
+    assert loaded.leaderboards == table.leaderboards
+
+
+def test_failed_page_keeps_the_previous_table(monkeypatch, tmp_path):
+    path = str(tmp_path / "table.bin")
+    monkeypatch.setattr(player_stats, "PLAYER_STATS_FILE", path)
+    monkeypatch.setattr(football_api, "get_league_players", _pages())
+    player_stats.refresh(2025)
+    before = os.stat(path).st_mtime_ns, open(path, "rb").read()
+
+    monkeypatch.setattr(football_api, "get_league_players", _pages(failing={(94, 2)}))
+    with pytest.raises(RuntimeError, match="Primeira Liga page 2"):
+        player_stats.refresh(2025)
+    assert (os.stat(path).st_mtime_ns, open(path, "rb").read()) == before
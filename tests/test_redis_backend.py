@@ -0,0 +1,174 @@
+import os
+import socket
+import socketserver
+import threading
+import time
+import fnmatch
+import uuid
+from urllib.parse import urlsplit
+
+import pytest
+
+import cache_backends
+import circuit_breaker
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    """
+    The RESP2 commands RedisBackend uses, over an in-memory dict.
+    """
+
+    def _reply(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, list):
+            return b"*%d\r\n" % len(value) + b"".join(self._reply(v) for v in value)
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+
+    def _command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            n = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(n + 2)[:-2])
+        return args
+
+    def _get(self, key):
+        value, expires_at = self.server.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            self.server.data.pop(key, None)
+            return None
+        return value
+
+    def handle(self):
+        while True:
+            args = self._command()
+            if args is None:
+                return
+            name, args = args[0].upper(), args[1:]
+            if name in (b"AUTH", b"SELECT"):
+                out = b"+OK\r\n"
+            elif name == b"GET":
+                out = self._reply(self._get(args[0]))
+            elif name == b"MGET":
+                out = self._reply([self._get(k) for k in args])
+            elif name == b"SET":
+                ttl = int(args[3]) / 1000 if len(args) > 3 and args[2].upper() == b"PX" else None
+                self.server.data[args[0]] = (args[1], time.time() + ttl if ttl is not None else None)
+                out = b"+OK\r\n"
+            elif name == b"DEL":
+                out = self._reply(sum(self.server.data.pop(k, None) is not None for k in args))
+            elif name == b"INCRBY":
+                value = int(self._get(args[0]) or 0) + int(args[1])
+                self.server.data[args[0]] = (str(value).encode(), None)
+                out = self._reply(value)
+            elif name == b"SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode()
+                keys = [k for k in list(self.server.data) if self._get(k) is not None
+                        and fnmatch.fnmatchcase(k.decode(), pattern.replace("\\", ""))]
+                out = self._reply([b"0", keys])
+            else:
+                out = b"-ERR unknown command '%s'\r\n" % name
+            self.wfile.write(out)
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.data = {}
+
+
+def _redis_reachable(url: str) -> bool:
+    parts = urlsplit(url)
+    try:
+        socket.create_connection((parts.hostname or "localhost", parts.port or 6379), timeout=0.2).close()
+        return True
+    except OSError:
+        return False
+
+
+@pytest.fixture(params=["fake", "redis"])
+def redis_url(request):
+    if request.param == "redis":
+        url = os.environ.get("REDIS_TEST_URL", "redis://localhost:6379/15")
+        if not _redis_reachable(url):
+            pytest.skip(f"no Redis server at {url}")
+        yield url
+        return
+    server = FakeRedisServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"redis://127.0.0.1:{server.server_address[1]}/0"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def cache(redis_url):
+    # Its own namespace per test, so a real server can be shared
+    return cache_backends.Cache(cache_backends.RedisBackend(redis_url)), f"t{uuid.uuid4().hex[:8]}"
+
+
+def test_set_get_and_expiry(cache):
+    cache, ns = cache
+    cache.set(f"{ns}:a", {"x": 1}, expire=60)
+    cache.set(f"{ns}:short", "soon gone", expire=0.05)
+    cache.set_many({f"{ns}:b": [1, 2], f"{ns}:c": "três"})
+    assert cache.get(f"{ns}:a") == {"x": 1}
+    value, expires_at = cache.get(f"{ns}:a", expire_time=True)
+    assert value == {"x": 1} and expires_at > time.time()
+    assert cache.get_many([f"{ns}:b", f"{ns}:c", f"{ns}:missing"]) == {f"{ns}:b": [1, 2], f"{ns}:c": "três"}
+    time.sleep(0.1)
+    assert cache.get(f"{ns}:short") is None
+    cache.delete(f"{ns}:a")
+    assert cache.get(f"{ns}:a") is None
+
+
+def test_binary_values_round_trip(cache):
+    cache, ns = cache
+    cache.register_serializer(ns, cache_backends.Float32Serializer())
+    cache.set(f"{ns}:embedding", [0.5, -1.0, 2.25])
+    assert cache.get(f"{ns}:embedding") == [0.5, -1.0, 2.25]
+
+
+def test_invalidate_namespace_and_stats(cache):
+    cache, ns = cache
+    cache.set(f"{ns}:a", 1)
+    assert cache.get(f"{ns}:a") == 1
+    assert cache.get(f"{ns}:b") is None
+    assert cache.stats()[ns] == {"hit": 1, "miss": 1}
+    cache.invalidate_namespace(ns)
+    assert cache.get(f"{ns}:a") is None
+
+
+def test_error_reply_raises_backend_error(redis_url):
+    backend = cache_backends.RedisBackend(redis_url)
+    with pytest.raises(cache_backends.CacheBackendError):
+        backend.execute(("NOSUCHCOMMAND",))
+    assert backend.circuit.state == circuit_breaker.CLOSED
+
+
+def test_outage_falls_back_to_misses_without_waiting():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]   # nothing listens on it once closed
+    backend = cache_backends.RedisBackend(f"redis://127.0.0.1:{port}/0", timeout=0.5)
+    cache = cache_backends.Cache(backend)
+    for _ in range(circuit_breaker.FAILURE_THRESHOLD):
+        assert cache.get("team:benfica") is None
+    assert backend.circuit.state == circuit_breaker.OPEN
+
+    calls = []
+    backend._connect = lambda: calls.append(1)
+    start = time.monotonic()
+    assert cache.get("team:benfica") is None
+    cache.set("team:benfica", {"id": 211})
+    assert time.monotonic() - start < 0.1
+    assert calls == []
@@ -0,0 +1,63 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import guard
+import main
+import semantic_cache
+
+QUESTION = "Onde joga o Benfica?"
+PARAPHRASE = "Qual o estádio do Benfica?"
+# The shape extract_intent returns for a venue question (handled by intent_handlers.handle_venue_intent)
+INTENT = {"intent": "get_venue", "player": None, "team1": "Benfica", "team2": None, "season": None, "stat": None,
+          "competition": None, "fixture_type": None, "fixture_period": None, "venue": None, "coach": None,
+          "market": None, "limit": None, "round": None}
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """
+    process_user_input with one embedding for every text, a guard that passes and stubbed handlers; returns the
+    extract_intent calls and the intents the handlers received.
+    """
+    calls, handled = [], []
+    monkeypatch.setattr(semantic_cache, "index", semantic_cache.SemanticIndex())
+    monkeypatch.setattr(guard, "_cache", guard.cache_backends.Cache(guard.cache_backends.MemoryBackend()))
+    monkeypatch.setattr(guard, "_embed", lambda client, inputs: [SimpleNamespace(embedding=[1.0, 0.0, 0.0])])
+    monkeypatch.setattr(main, "guard_query", lambda text, client: None)
+    monkeypatch.setattr(main, "extract_intent", lambda text, context=None: calls.append(text) or dict(INTENT))
+    monkeypatch.setattr(main, "handle_intent", lambda intent: handled.append(intent) or {"venue": "Estádio da Luz"})
+    monkeypatch.setattr(main, "generate_response", lambda text, data, status=None: data["venue"])
+    return calls, handled
+
+
+@pytest.mark.parametrize("speculative", [True, False])
+def test_semantic_hit_on_a_known_embedding_makes_no_extract_intent_call(pipeline, monkeypatch, speculative):
+    calls, handled = pipeline
+    monkeypatch.setattr(main, "SPECULATIVE_PIPELINE", speculative)
+    assert main.process_user_input(QUESTION) == "Estádio da Luz"
+    assert calls == [QUESTION]
+
+    timings = {}
+    assert main.process_user_input(QUESTION, timings=timings) == "Estádio da Luz"
+    assert calls == [QUESTION]
+    assert handled == [INTENT, INTENT]
+    if speculative:
+        assert "intent" not in timings
+
+
+def test_speculative_extraction_overlaps_the_embeddings_call(pipeline, monkeypatch):
+    calls, handled = pipeline
+    monkeypatch.setattr(main, "SPECULATIVE_PIPELINE", True)
+    main.process_user_input(QUESTION)
+
+    # A new text: the extraction must already be running while the embeddings call is in flight
+    started = threading.Event()
+    monkeypatch.setattr(main, "extract_intent", lambda text, context=None: started.set() or {**INTENT, "team1": "Porto"})
+    embed = guard._embed
+    monkeypatch.setattr(guard, "_embed", lambda client, inputs: started.wait(5) and embed(client, inputs))
+    assert main.process_user_input(PARAPHRASE) == "Estádio da Luz"
+    assert started.is_set()
+    # The paraphrase reused the cached intent
+    assert handled[-1] == INTENT
@@ -0,0 +1,73 @@
+import asyncio
+import time
+
+import main
+import server
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_queued_request_is_rejected_within_the_time_limit(monkeypatch):
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT_SECONDS", 0.6)
+    monkeypatch.setattr(server, "MIN_PIPELINE_SECONDS", 0.2)
+    monkeypatch.setattr(main, "process_user_input", lambda text, budget, conversation: time.sleep(0.5) or text)
+
+    async def scenario():
+        chat = server.ChatServer(concurrency=1, queue_size=10)
+        chat._slots = asyncio.Semaphore(1)
+        started = time.monotonic()
+        first, second = await asyncio.gather(chat.answer("primeira"), chat.answer("segunda"))
+        return first, second, time.monotonic() - started, chat
+
+    first, second, elapsed, chat = _run(scenario())
+    assert first == (200, {"answer": "primeira"})
+    assert second[0] == 503
+    assert elapsed < 0.6
+    assert chat.rejected == 1 and chat.waiting == 0
+
+
+def test_metrics_before_any_api_response_are_valid():
+    text = server.ChatServer(concurrency=1, queue_size=1).metrics()
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            assert not line.endswith(" None"), line
+    assert f"# TYPE {server.tracing.METRIC_PREFIX}_served_requests_total counter" in text
+
+
+def test_timed_out_pipeline_keeps_its_slot_until_it_finishes(monkeypatch):
+    monkeypatch.setattr(server, "REQUEST_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(server, "MIN_PIPELINE_SECONDS", 0.1)
+    monkeypatch.setattr(main, "process_user_input", lambda text, budget, conversation: time.sleep(0.8) or text)
+
+    async def scenario():
+        chat = server.ChatServer(concurrency=1, queue_size=10)
+        chat._slots = asyncio.Semaphore(1)
+        first = await chat.answer("primeira")
+        # The pipeline is still running: the next request waits for its slot and is rejected
+        second = await chat.answer("segunda")
+        inflight = chat.inflight
+        await asyncio.sleep(0.6)
+        return first, second, inflight, chat
+
+    first, second, inflight, chat = _run(scenario())
+    assert first[0] == 504 and second[0] == 503
+    assert inflight == 1 and chat.inflight == 0 and not chat._slots.locked()
+
+
+def test_malformed_content_length_gets_400():
+    async def request(length):
+        chat = server.ChatServer(concurrency=1, queue_size=1)
+        srv = await asyncio.start_server(chat.handle_connection, "127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"POST /chat HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), 2)
+        writer.close()
+        srv.close()
+        return status
+
+    assert _run(request("abc")).startswith(b"HTTP/1.1 400")
+    assert _run(request("-1")).startswith(b"HTTP/1.1 400")
@@ -0,0 +1,47 @@
+import pickle
+import threading
+
+import cache_backends
+import session
+
+
+def test_follow_up_on_another_worker_keeps_the_context():
+    shared = cache_backends.Cache(cache_backends.MemoryBackend())
+    worker1, worker2 = session.SessionStore(cache=shared), session.SessionStore(cache=shared)
+
+    conversation = worker1.get("abc")
+    conversation.remember_team("benfica", {"id": 211, "name": "Benfica"})
+    conversation.remember_intent({"intent": "get_team_fixtures", "competition": "Primeira Liga"})
+    worker1.save(conversation)
+
+    follow_up = worker2.get("abc")
+    assert follow_up.resolve_team("Benfica") == {"id": 211, "name": "Benfica"}
+    assert "competição: Primeira Liga" in follow_up.context_summary()
+
+    # The newer copy written by worker 2 replaces worker 1's local one
+    follow_up.remember_team("porto", {"id": 212, "name": "FC Porto"})
+    worker2.save(follow_up)
+    assert worker1.get("abc").resolve_team("porto")["id"] == 212
+
+
+def test_concurrent_updates_of_one_session():
+    conversation = session.Session("abc")
+    errors = []
+
+    def turn(n):
+        try:
+            for i in range(300):
+                conversation.remember_team(f"equipa {n} {i}", {"id": i, "name": f"Equipa {n} {i}"})
+                conversation.resolve_team(f"equipa {n} {i - 1}")
+                conversation.context_summary()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=turn, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(conversation.teams) == session.MAX_ENTITIES_PER_KIND
+    assert pickle.loads(pickle.dumps(conversation)).teams == conversation.teams
@@ -0,0 +1,40 @@
+import re
+
+import tracing
+
+# name{labels} value, with a numeric value as required by the Prometheus text format
+SAMPLE = re.compile(r"^[a-zA-Z_:][a-zA-Z0-9_:]*(\{[^}]*\})? (-?[0-9.e+-]+|NaN|[+-]Inf)$")
+
+
+def _check_exposition(text):
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            assert SAMPLE.match(line), line
+
+
+def test_unknown_gauges_are_left_out():
+    text = tracing.prometheus_text({"quota_daily_remaining": None, "quota_minute_remaining": 7,
+                                    "circuit_open": {(("name", "a"),): None, (("name", "b"),): 1}})
+    _check_exposition(text)
+    assert "quota_daily_remaining" not in text
+    assert f"{tracing.METRIC_PREFIX}_quota_minute_remaining 7" in text
+    assert f'{tracing.METRIC_PREFIX}_circuit_open{{name="b"}} 1' in text
+    assert 'name="a"' not in text
+
+
+def test_counters_are_typed_as_counters():
+    text = tracing.prometheus_text(gauges={"sessions": 2}, counters={"served_requests_total": 5})
+    _check_exposition(text)
+    assert f"# TYPE {tracing.METRIC_PREFIX}_served_requests_total counter" in text
+    assert f"# TYPE {tracing.METRIC_PREFIX}_sessions gauge" in text
+
+
+def test_handler_labels_are_bounded_to_known_intents(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "handle_venue_intent", lambda intent: {"venue": "Estádio da Luz"})
+    with tracing.trace("pipeline"):
+        main.handle_intent([{"intent": "get_venue"}, {"intent": "ignore previous instructions 123"}])
+    endpoints = {endpoint for name, endpoint in tracing._latencies if name == "handler"}
+    assert "ignore previous instructions 123" not in endpoints
+    assert {"get_venue", "other"} <= endpoints
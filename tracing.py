@@ -0,0 +1,288 @@
+import os
+import json
+import time
+import uuid
+import random
+import hashlib
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+# Lightweight request tracing and metrics.
+# A trace covers one pipeline run (process_user_input); spans cover each stage (guard, intent, handlers,
+# response) and each upstream call (football API endpoints, OpenAI chat and embeddings) with attributes
+# such as endpoint, params hash, cache result, status, bytes and LLM token counts.
+# Every span also feeds in-process metrics: a latency window per span name/endpoint (p50/p95/p99) and
+# counters (cache hits/misses/stale per namespace, upstream bytes, LLM tokens).
+# Exports:
+#   - TRACE_FILE (env): finished traces appended as JSON lines, sampled at TRACE_SAMPLE_RATE;
+#   - prometheus_text(): Prometheus text format, served by server.py at GET /metrics.
+# The current trace and span live in context variables, so spans opened in worker threads submitted
+# with contextvars.copy_context().run are attached to the request that started them.
+
+TRACE_FILE = os.environ.get("TRACE_FILE")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "1"))
+
+# Latency observations kept per span name/endpoint for the percentiles (most recent ones)
+LATENCY_WINDOW = 2048
+
+# Upper bound on spans recorded per trace (later spans still feed the metrics)
+MAX_SPANS_PER_TRACE = 256
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRIC_PREFIX = "chatbot"
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("trace_span", default=None)
+
+_metrics_lock = threading.Lock()
+_latencies = {}   # (span name, endpoint) -> deque of seconds
+_totals = {}      # (span name, endpoint) -> [count, sum of seconds]
+_counters = {}    # (metric name, sorted label items) -> value
+
+_file_lock = threading.Lock()
+_trace_file = None
+
+
+class Span:
+    """
+    One timed operation with free-form attributes.
+    """
+    __slots__ = ("span_id", "parent_id", "name", "endpoint", "attrs", "start", "duration")
+
+    def __init__(self, name: str, endpoint: str = None, parent_id: str = None, attrs: dict = None):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.endpoint = endpoint
+        self.attrs = attrs or {}
+        self.start = time.time()
+        self.duration = None
+
+    def set(self, **attrs):
+        """
+        Adds attributes to the span.
+        """
+        self.attrs.update(attrs)
+
+    def to_dict(self, trace_start: float) -> dict:
+        return {
+            "id": self.span_id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "offset_ms": round((self.start - trace_start) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            **({"endpoint": self.endpoint} if self.endpoint else {}),
+            **self.attrs,
+        }
+
+
+class Trace:
+    """
+    Spans of one request.
+    """
+    __slots__ = ("trace_id", "root", "spans", "sampled")
+
+    def __init__(self, root: Span, sampled: bool):
+        self.trace_id = uuid.uuid4().hex
+        self.root = root
+        self.spans = []
+        self.sampled = sampled
+
+
+def params_hash(params) -> str:
+    """
+    Short stable hash of request params (traces identify repeated calls without logging the values).
+    """
+    encoded = json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(encoded, digest_size=6).hexdigest()
+
+
+def _observe(name: str, endpoint: str, seconds: float):
+    key = (name, endpoint or "")
+    with _metrics_lock:
+        window = _latencies.get(key)
+        if window is None:
+            window = _latencies[key] = deque(maxlen=LATENCY_WINDOW)
+            _totals[key] = [0, 0.0]
+        window.append(seconds)
+        totals = _totals[key]
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def count(metric: str, value: float = 1, **labels):
+    """
+    Increments a counter, e.g. count("cache_requests_total", namespace="team", result="hit").
+    """
+    key = (metric, tuple(sorted(labels.items())))
+    with _metrics_lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+@contextmanager
+def span(name: str, endpoint: str = None, **attrs):
+    """
+    Times the block as a child span of the current span and records its latency.
+    Yields the Span, so attributes known only later (status, bytes, tokens) can be added with span.set().
+    """
+    parent = _current_span.get()
+    s = Span(name, endpoint, parent.span_id if parent else None, attrs)
+    token = _current_span.set(s)
+    start = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.set(error=type(e).__name__)
+        raise
+    finally:
+        s.duration = time.perf_counter() - start
+        _current_span.reset(token)
+        _observe(name, endpoint, s.duration)
+        trace = _current_trace.get()
+        if trace is not None and trace.sampled and len(trace.spans) < MAX_SPANS_PER_TRACE:
+            trace.spans.append(s)
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """
+    Starts a trace for the block (a plain span if a trace is already active).
+    The finished trace is written to TRACE_FILE if set and the trace is sampled.
+    """
+    if _current_trace.get() is not None:
+        with span(name, **attrs) as s:
+            yield s
+        return
+    root = Span(name, attrs=attrs)
+    t = Trace(root, sampled=bool(TRACE_FILE) and random.random() < TRACE_SAMPLE_RATE)
+    trace_token = _current_trace.set(t)
+    span_token = _current_span.set(root)
+    start = time.perf_counter()
+    try:
+        yield root
+    except BaseException as e:
+        root.set(error=type(e).__name__)
+        raise
+    finally:
+        root.duration = time.perf_counter() - start
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        _observe(name, None, root.duration)
+        if t.sampled:
+            _write_trace(t)
+
+
+def annotate(**attrs):
+    """
+    Adds attributes to the current span, if any (for code that does not hold the span, e.g. cache lookups).
+    """
+    s = _current_span.get()
+    if s is not None:
+        s.set(**attrs)
+
+
+def record_cache(key: str, result: str):
+    """
+    Counts a cache lookup ("hit", "miss" or "stale") for the key's namespace (prefix before the first ":")
+    and tags the current span with it.
+    """
+    namespace = key.split(":", 1)[0]
+    count("cache_requests_total", namespace=namespace, result=result)
+    annotate(cache=result)
+
+
+def _write_trace(t: Trace):
+    global _trace_file
+    record = {
+        "trace_id": t.trace_id,
+        "root_id": t.root.span_id,
+        "name": t.root.name,
+        "start": t.root.start,
+        "duration_ms": round(t.root.duration * 1000, 2),
+        **t.root.attrs,
+        "spans": [s.to_dict(t.root.start) for s in sorted(t.spans, key=lambda s: s.start)],
+    }
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _file_lock:
+        if _trace_file is None:
+            _trace_file = open(TRACE_FILE, "a", encoding="utf-8")
+        _trace_file.write(line)
+        _trace_file.flush()
+
+
+def counter_values(metric: str) -> dict:
+    """
+    Returns {labels dict as sorted tuple: value} for one counter, e.g. counter_values("cache_requests_total").
+    """
+    with _metrics_lock:
+        return {labels: value for (name, labels), value in _counters.items() if name == metric}
+
+
+def _quantile(ordered, q: float) -> float:
+    """
+    Nearest-rank quantile of a sorted list.
+    """
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def latency_summary() -> dict:
+    """
+    Returns {"span" or "span endpoint": {"count", "sum", "p50", "p95", "p99"}} (percentiles over the latency window).
+    """
+    with _metrics_lock:
+        snapshot = {key: (sorted(window), list(_totals[key])) for key, window in _latencies.items()}
+    summary = {}
+    for (name, endpoint), (ordered, (n, total)) in snapshot.items():
+        summary[f"{name} {endpoint}" if endpoint else name] = {
+            "count": n,
+            "sum": round(total, 4),
+            **{f"p{int(q * 100)}": round(_quantile(ordered, q), 4) for q in QUANTILES},
+        }
+    return summary
+
+
+def _labels(items) -> str:
+    if not items:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def prometheus_text(gauges: dict = None, counters: dict = None) -> str:
+    """
+    Renders latencies (as summaries), counters and the given gauges and counters ({name: value} or
+    {name: {labels tuple: value}}) in the Prometheus text exposition format. None values (not known yet,
+    e.g. the API quota before the first response) are left out.
+    """
+    with _metrics_lock:
+        latencies = {key: (sorted(window), list(_totals[key])) for key, window in _latencies.items()}
+        tracked = dict(_counters)
+
+    lines = [f"# TYPE {METRIC_PREFIX}_span_seconds summary"]
+    for (name, endpoint), (ordered, (n, total)) in sorted(latencies.items()):
+        base = [("span", name)] + ([("endpoint", endpoint)] if endpoint else [])
+        for q in QUANTILES:
+            lines.append(f"{METRIC_PREFIX}_span_seconds{_labels(base + [('quantile', q)])} {_quantile(ordered, q):.6f}")
+        lines.append(f"{METRIC_PREFIX}_span_seconds_sum{_labels(base)} {total:.6f}")
+        lines.append(f"{METRIC_PREFIX}_span_seconds_count{_labels(base)} {n}")
+
+    typed = set()
+    for (metric, labels), value in sorted(tracked.items()):
+        if metric not in typed:
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} counter")
+            typed.add(metric)
+        lines.append(f"{METRIC_PREFIX}_{metric}{_labels(labels)} {value}")
+
+    for kind, values in (("counter", counters), ("gauge", gauges)):
+        for metric, value in sorted((values or {}).items()):
+            samples = [(labels, v) for labels, v in (value.items() if isinstance(value, dict) else [((), value)])
+                       if v is not None]
+            if not samples:
+                continue
+            lines.append(f"# TYPE {METRIC_PREFIX}_{metric} {kind}")
+            for labels, v in samples:
+                lines.append(f"{METRIC_PREFIX}_{metric}{_labels(labels)} {v}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,235 @@
+import os
+import glob
+import gzip
+import json
+import time
+import atexit
+import hashlib
+import threading
+
+# Record/replay transport for the upstream services.
+# Every API-Football request (football_api.fetch_from_api) and every OpenAI call (llm_gateway.chat_completion,
+# guard._embed) goes through this module, which works in one of three modes (TRANSPORT_MODE env):
+#   passthrough  call the live services (default);
+#   record       call the live services and capture each request/response into gzip JSONL cassettes
+#                under CASSETTE_DIR, one file per service and process;
+#   replay       serve responses from the cassettes with no network, at memory speed or with the
+#                recorded latency scaled by REPLAY_LATENCY_SCALE (1 = as recorded).
+# Interactions are keyed by service, endpoint and normalised params (the API key, base URL and timeouts
+# are not part of the key), so traffic recorded in production replays against any deployment.
+# Repeated identical requests replay their recorded responses in order (the last one repeats),
+# so live-match polling sequences are reproduced too.
+# requests is imported on the first HTTP call rather than with the module (it adds ~80 ms to startup).
+
+TRANSPORT_MODE = os.environ.get("TRANSPORT_MODE", "passthrough")
+CASSETTE_DIR = os.environ.get("CASSETTE_DIR", "cassettes")
+REPLAY_LATENCY_SCALE = float(os.environ.get("REPLAY_LATENCY_SCALE", "0"))
+
+MODES = ("passthrough", "record", "replay")
+
+# Recorded interactions are written out every FLUSH_EVERY records (and at exit)
+FLUSH_EVERY = 20
+
+# Response headers kept in cassettes (quota headers drive the scheduler; nothing else is needed)
+RECORDED_HEADERS = ("content-type", "x-ratelimit-requests-limit", "x-ratelimit-requests-remaining",
+                    "x-ratelimit-limit", "x-ratelimit-remaining")
+
+
+class CassetteMiss(Exception):
+    """
+    Raised in replay mode when no recorded interaction matches a request.
+    """
+
+
+def normalize_params(params) -> dict:
+    """
+    Normalises request params for matching: values as stripped lower-case strings, None values dropped.
+    """
+    return {str(k): str(v).strip().lower() for k, v in sorted((params or {}).items()) if v is not None}
+
+
+def interaction_key(service: str, endpoint: str, params: dict) -> str:
+    """
+    Stable key of an interaction.
+    """
+    encoded = json.dumps([service, endpoint, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Cassette:
+    """
+    Recorded interactions of one service: loaded from CASSETTE_DIR/<service>-*.jsonl.gz for replay,
+    buffered and appended to CASSETTE_DIR/<service>-<pid>.jsonl.gz when recording.
+    """
+
+    def __init__(self, service: str, directory: str = None):
+        self.service = service
+        self.directory = directory or CASSETTE_DIR
+        self._interactions = None   # key -> [recorded interaction]
+        self._cursors = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def _load(self):
+        interactions = {}
+        for path in sorted(glob.glob(os.path.join(self.directory, f"{self.service}-*.jsonl.gz"))):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Last line of a cassette cut short by a crash
+                        continue
+                    interactions.setdefault(record["key"], []).append(record)
+        return interactions
+
+    def lookup(self, key: str) -> dict:
+        """
+        Returns the next recorded interaction for a key (the last one repeats). Raises CassetteMiss.
+        """
+        with self._lock:
+            if self._interactions is None:
+                self._interactions = self._load()
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded {self.service} interaction for key {key}")
+            n = self._cursors.get(key, 0)
+            self._cursors[key] = n + 1
+            return recorded[min(n, len(recorded) - 1)]
+
+    def record(self, key: str, request: dict, response: dict, elapsed: float):
+        """
+        Buffers one interaction, writing the buffer out every FLUSH_EVERY records.
+        """
+        with self._lock:
+            self._pending.append({"key": key, "ts": time.time(), "elapsed": round(elapsed, 4),
+                                  "request": request, "response": response})
+            if len(self._pending) >= FLUSH_EVERY:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        lines = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in self._pending)
+        # Each flush appends one gzip member; readers see the concatenation as one stream
+        with gzip.open(os.path.join(self.directory, f"{self.service}-{os.getpid()}.jsonl.gz"), "at", encoding="utf-8") as f:
+            f.write(lines)
+        self._pending = []
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette(service: str) -> Cassette:
+    """
+    Returns the process-wide cassette of a service.
+    """
+    with _cassettes_lock:
+        if service not in _cassettes:
+            _cassettes[service] = Cassette(service)
+        return _cassettes[service]
+
+
+@atexit.register
+def flush_all():
+    """
+    Writes out every buffered recorded interaction.
+    """
+    for c in list(_cassettes.values()):
+        c.flush()
+
+
+def mode() -> str:
+    return TRANSPORT_MODE if TRANSPORT_MODE in MODES else "passthrough"
+
+
+def replaying() -> bool:
+    return mode() == "replay"
+
+
+def _simulate_latency(recorded: dict):
+    if REPLAY_LATENCY_SCALE > 0:
+        time.sleep(recorded.get("elapsed", 0) * REPLAY_LATENCY_SCALE)
+
+
+class RecordedResponse:
+    """
+    Replayed HTTP response with the parts of requests.Response used by football_api.
+    """
+
+    def __init__(self, status_code: int, headers: dict, text: str):
+        from requests.structures import CaseInsensitiveDict
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+        self.content = text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size: int = 1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+
+def http_get(service: str, endpoint: str, url: str, headers=None, params=None, timeout=None, stream: bool = False):
+    """
+    GET through the transport. Returns a requests.Response (passthrough/record) or a RecordedResponse (replay).
+    With stream=True the body is read as the caller iterates over iter_content (recording still stores all of it).
+    Connection errors and timeouts are recorded too and re-raised as requests exceptions on replay.
+    """
+    import requests
+    current = mode()
+    if current == "passthrough":
+        return requests.get(url, headers=headers, params=params, timeout=timeout, stream=stream)
+
+    normalized = normalize_params(params)
+    key = interaction_key(service, endpoint, normalized)
+    if current == "replay":
+        recorded = cassette(service).lookup(key)
+        _simulate_latency(recorded)
+        response = recorded["response"]
+        if "exception" in response:
+            error = requests.Timeout if "Timeout" in response["exception"] else requests.ConnectionError
+            raise error(response["message"])
+        return RecordedResponse(response["status"], response["headers"], response["body"])
+
+    request = {"endpoint": endpoint, "params": normalized}
+    start = time.perf_counter()
+    try:
+        r = requests.get(url, headers=headers, params=params, timeout=timeout, stream=stream)
+    except requests.RequestException as e:
+        cassette(service).record(key, request, {"exception": type(e).__name__, "message": str(e)}, time.perf_counter() - start)
+        raise
+    kept = {name: r.headers[name] for name in RECORDED_HEADERS if name in r.headers}
+    cassette(service).record(key, request, {"status": r.status_code, "headers": kept, "body": r.text}, time.perf_counter() - start)
+    return r
+
+
+def model_call(service: str, endpoint: str, create, response_type, **kwargs):
+    """
+    Calls an SDK method (e.g. client.chat.completions.create) through the transport.
+    The request kwargs except timeout form the key; responses are stored with model_dump() and replayed
+    as response_type (a pydantic model class of the SDK). Failed calls are not recorded.
+    """
+    current = mode()
+    if current == "passthrough":
+        return create(**kwargs)
+
+    request = {k: v for k, v in kwargs.items() if k != "timeout"}
+    key = interaction_key(service, endpoint, request)
+    if current == "replay":
+        recorded = cassette(service).lookup(key)
+        _simulate_latency(recorded)
+        return response_type.model_validate(recorded["response"])
+
+    start = time.perf_counter()
+    response = create(**kwargs)
+    cassette(service).record(key, {"endpoint": endpoint, **request}, response.model_dump(mode="json"), time.perf_counter() - start)
+    return response
@@ -0,0 +1,198 @@
+import time
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import football_api
+import odds
+import scheduler
+
+# Matchday prefetch and cache warm-up service.
+# Reads the upcoming fixtures of every competition in football_api.LEAGUES from the date-wide feed and, on a
+# schedule tied to each kick-off, prefetches the data users ask about right before a match: standings, predictions,
+# odds, coaches, venues and team fixtures. Standings are fetched in the last stage before kick-off, so the
+# table is within football_api.STANDINGS_FRESH_SECONDS when users ask about it around the match. Team name
+# lookups are not warmed: they are cached under the name the user typed, which rarely is the API's name.
+#
+# Run it inside the server (`python server.py --warmup`, first worker). Only there do its requests share the
+# process's quota scheduler with user questions, run at background priority, so user questions always go
+# first. As its own process (`python warmup.py`, sharing the cache backend with the chatbot) the scheduler is
+# per process: only the daily reserve holds across processes, so it competes with users for the per-minute quota.
+
+logger = logging.getLogger(__name__)
+
+# How far ahead upcoming fixtures are scheduled
+HORIZON_HOURS = 24
+
+# How often the list of upcoming fixtures is refreshed
+FIXTURE_REFRESH_SECONDS = 3600
+
+# Warm-up stages relative to kick-off: (seconds before kick-off, what to prefetch).
+# Slow-changing data is fetched early; predictions and odds (short TTLs) again just before kick-off.
+STAGES = [
+    (3 * 3600, ("teams", "coaches", "venues", "predictions", "odds")),
+    (15 * 60, ("standings", "predictions", "odds")),
+    (2 * 60, ("predictions", "odds")),
+]
+
+# Stages closer to kick-off than this run at prefetch priority instead of warm-up priority
+PREFETCH_WINDOW_SECONDS = 20 * 60
+
+
+def current_season_year(now=None) -> int:
+    """
+    Returns the start year of the current football season (seasons start in August).
+    """
+    now = now or datetime.now()
+    return now.year if now.month >= 8 else now.year - 1
+
+
+def upcoming_fixtures(now=None):
+    """
+    Returns the fixtures of all LEAGUES competitions kicking off within HORIZON_HOURS.
+    Read from the date-wide feed: one request per day for every competition (football_api.get_fixtures_by_date).
+    """
+    now = now or datetime.now(timezone.utc)
+    local = ZoneInfo(football_api.FIXTURE_TIMEZONE)
+    first_day = now.astimezone(local).date()
+    last_day = (now + timedelta(hours=HORIZON_HOURS)).astimezone(local).date()
+    fixtures = []
+    for n in range((last_day - first_day).days + 1):
+        date = (first_day + timedelta(days=n)).strftime("%Y-%m-%d")
+        res = football_api.get_fixtures_by_date(date)
+        if "error" in res:
+            logger.warning("warm-up: could not list fixtures for %s: %s", date, res["error"])
+            continue
+        for f in res.get("response", []):
+            if f.status != "NS":
+                continue
+            kickoff = datetime.fromtimestamp(f.timestamp, timezone.utc)
+            if now <= kickoff <= now + timedelta(hours=HORIZON_HOURS):
+                fixtures.append(f)
+    return fixtures
+
+
+def warm_fixture(fixture, parts):
+    """
+    Prefetches the given parts ("standings", "teams", "coaches", "venues", "predictions", "odds") for one fixture
+    (a records.FixtureRecord). Results land in the football_api cache; nothing is returned.
+    """
+    team_ids = (fixture.home_id, fixture.away_id)
+    if "standings" in parts:
+        football_api.get_team_standings(fixture.league_id, fixture.season)
+    if "teams" in parts:
+        for team_id in team_ids:
+            football_api.get_team_fixtures(team_id, fixture.season)
+    if "coaches" in parts:
+        for team_id in team_ids:
+            football_api.get_coach(team_id=team_id)
+    if "venues" in parts and fixture.venue_id:
+        football_api.get_venue(venue_id=fixture.venue_id)
+    if "predictions" in parts:
+        football_api.get_fixture_predictions(fixture.fixture_id)
+    if "odds" in parts:
+        odds.get_odds_summary(fixture.fixture_id, fixture.timestamp)
+
+
+class WarmupDaemon:
+    """
+    Background thread that schedules and runs the warm-up stages of upcoming fixtures.
+    """
+
+    def __init__(self):
+        self._jobs = []
+        self._scheduled = set()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_refresh = 0
+
+    def schedule(self, fixture, now=None):
+        """
+        Adds the warm-up stages of a fixture to the job queue (stages already in the past are skipped,
+        except the first one, which runs immediately for fixtures discovered late).
+        """
+        now = now or time.time()
+        kickoff = fixture.timestamp
+        for n, (lead, parts) in enumerate(STAGES):
+            key = (fixture.fixture_id, lead)
+            if key in self._scheduled:
+                continue
+            run_at = kickoff - lead
+            if run_at < now and n > 0:
+                continue
+            self._scheduled.add(key)
+            heapq.heappush(self._jobs, (max(run_at, now), fixture.fixture_id, lead, fixture, parts))
+
+    def refresh_fixtures(self):
+        """
+        Reads the upcoming fixtures and schedules their warm-up stages.
+        """
+        with scheduler.priority(scheduler.PRIORITY_WARMUP):
+            fixtures = upcoming_fixtures()
+        # Forget fixtures that have kicked off (they are no longer listed as upcoming)
+        upcoming_ids = {f.fixture_id for f in fixtures}
+        self._scheduled = {key for key in self._scheduled if key[0] in upcoming_ids}
+        for f in fixtures:
+            self.schedule(f)
+        logger.info("warm-up: %d upcoming fixtures, %d jobs queued", len(fixtures), len(self._jobs))
+
+    def run_due_jobs(self, now=None):
+        """
+        Runs every job whose time has come. Returns the number of jobs run.
+        """
+        now = now or time.time()
+        ran = 0
+        while self._jobs and self._jobs[0][0] <= now and not self._stop.is_set():
+            _, fixture_id, lead, fixture, parts = heapq.heappop(self._jobs)
+            level = scheduler.PRIORITY_PREFETCH if lead <= PREFETCH_WINDOW_SECONDS else scheduler.PRIORITY_WARMUP
+            try:
+                with scheduler.priority(level):
+                    warm_fixture(fixture, parts)
+            except Exception:
+                logger.exception("warm-up: job for fixture %s failed", fixture_id)
+            ran += 1
+        return ran
+
+    def run(self):
+        """
+        Main loop: refresh the upcoming fixtures periodically and run jobs as they become due.
+        """
+        while not self._stop.is_set():
+            if time.time() >= self._next_refresh:
+                try:
+                    self.refresh_fixtures()
+                except Exception:
+                    logger.exception("warm-up: fixture refresh failed")
+                self._next_refresh = time.time() + FIXTURE_REFRESH_SECONDS
+            self.run_due_jobs()
+            next_job = self._jobs[0][0] if self._jobs else self._next_refresh
+            self._stop.wait(max(1.0, min(next_job, self._next_refresh) - time.time()))
+
+    def start(self):
+        """
+        Starts the daemon thread and returns it.
+        """
+        self._thread = threading.Thread(target=self.run, name="warmup-daemon", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        """
+        Asks the daemon thread to stop after the current job.
+        """
+        self._stop.set()
+
+
+def start_warmup_daemon():
+    """
+    Starts a warm-up daemon thread in this process and returns the WarmupDaemon.
+    """
+    daemon = WarmupDaemon()
+    daemon.start()
+    return daemon
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    WarmupDaemon().run()